@@ -16,7 +16,13 @@ git pull --ff-only origin main
 
 # === run the python script ===
 
-python hr/main.py 'vosslnx'
+# run timings/counts for node_exporter's textfile collector (alert on staleness, runtime, volume)
+METRICS_DIR="${METRICS_DIR:-/var/lib/prometheus/node-exporter}"
+# TIME_BUDGET (e.g. 5h): newest data first, the rest resumes on the next night
+python hr/main.py run --system vosslnx --metrics "${METRICS_DIR}/boost_hr.prom" ${TIME_BUDGET:+--time-budget "${TIME_BUDGET}"}
+
+# per-subject reports; only subjects with new data are re-rendered
+python hr/main.py report --system vosslnx
 
 
 # === push results to github ===
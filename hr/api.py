@@ -0,0 +1,266 @@
+"""
+Importable entry points for the QC/zone engine.
+
+    from hr.api import process_file, process_many, load_zones
+
+    zones = load_zones("BOOST HR ranges.xlsx")
+    result = process_file(path, zones["sub8000"], "Supervised")
+    for result in process_many(paths, zones, workers=4):
+        ...
+
+Nothing here reads the BOOST tree layout, configures logging, or writes
+files; `Main` (hr/main.py) adds discovery, caching and the output CSVs on
+top of the same rules, QC_Sup and extract_hr.
+"""
+import os
+import sys
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Mapping
+
+import pandas as pd
+
+# The engine's modules import each other as top-level packages (util, qc),
+# as when running hr/main.py; make that work for `import hr.api` too.
+_HR_DIR = os.path.dirname(os.path.abspath(__file__))
+if _HR_DIR not in sys.path:
+    sys.path.insert(0, _HR_DIR)
+
+from util.parse_path import parse_path  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+GROUPS = ("Supervised", "Unsupervised")
+
+
+@dataclass(frozen=True)
+class QCError:
+    """One QC finding: its error code, message and optional detail rows."""
+
+    code: str
+    message: str | None
+    details: pd.DataFrame | None = None
+
+
+@dataclass(frozen=True)
+class FileResult:
+    """
+    QC and zone results for one recording.
+
+    skipped is True when the file was dropped before zone QC (unparseable
+    week, a header without the Time / HR (bpm) columns, or a file rule such
+    as the 4 h span limit); zone_metrics is then None and `errors` says why.
+    """
+
+    path: str
+    subject: str | None
+    group: str
+    week: int | None
+    session: str | None
+    skipped: bool
+    errors: dict[str, QCError] = field(default_factory=dict)
+    zone_metrics: dict[str, Any] | None = None
+
+    def err_dict(self) -> dict[str, list]:
+        """Errors in the {code: [message, details]} form save_qc reads."""
+        return {code: [e.message, e.details] for code, e in self.errors.items()}
+
+    def qc_rows(self) -> list[dict]:
+        """This file's qc_out.csv rows."""
+        from qc.save_qc import qc_rows
+        return qc_rows(self.subject, self.path, self.err_dict())
+
+    def zone_row(self) -> dict[str, Any] | None:
+        """This file's zone_out.csv row, or None if it has no zone metrics."""
+        from qc.zone.save_zones import zone_row
+        if self.zone_metrics is None:
+            return None
+        return zone_row(self.subject, self.path, self.zone_metrics)
+
+
+def load_zones(zone_path: str | os.PathLike, subjects: Iterable[str] | None = None, snap_to: int = 5) -> dict[str, pd.DataFrame]:
+    """
+    Snapped zones per subject ("sub8000" -> one-row frame) from the HR
+    ranges workbook, read once. Without `subjects`, every BOOST ID in the
+    sheet is loaded.
+    """
+    from util.zone.extract_zones import extract_zones, read_zone_sheet
+    sheet = read_zone_sheet(zone_path)
+    if subjects is None:
+        subjects = [f"sub{int(i)}" for i in sheet["BOOST ID"].dropna().unique()]
+    return {
+        subject: extract_zones(zone_path, subject, snap_to=snap_to, sheet=sheet)
+        for subject in subjects
+    }
+
+
+def _as_errors(err: dict) -> dict[str, QCError]:
+    errors = {}
+    for code, payload in err.items():
+        message, details = None, None
+        if isinstance(payload, (list, tuple)):
+            if len(payload) >= 1:
+                message = payload[0]
+            if len(payload) >= 2 and isinstance(payload[1], pd.DataFrame):
+                details = payload[1]
+        elif isinstance(payload, str):
+            message = payload
+        errors[code] = QCError(code, message, details)
+    return errors
+
+
+def process_file(
+    path: str | os.PathLike,
+    zones: pd.DataFrame,
+    group: str | None = None,
+    engine: str = "pandas",
+    chunk_rows: int | None = None,
+) -> FileResult:
+    """
+    QC and zone-score one Polar CSV (or archive member).
+
+    Parameters
+    ----------
+    path : str | PathLike
+        The recording. Week and session come from its `_wk##_ses##` name.
+    zones : pd.DataFrame
+        The subject's snapped zone row (z1_start ... z5_end), as
+        `load_zones` or `extract_zones` return it.
+    group : str | None
+        "Supervised" or "Unsupervised"; picks the weekly plan. Defaults to
+        the group folder in `path`.
+    engine : str
+        extract_hr parse backend.
+    chunk_rows : int | None
+        Stream the recording this many rows at a time through the chunked
+        kernels in qc/online.py instead of parsing it whole (pandas only;
+        `engine` is ignored). Results are the same; memory no longer grows
+        with the recording's length.
+
+    Returns
+    -------
+    FileResult
+        The same errors and metrics `Main.main` writes for this file.
+    """
+    from util.hr.extract_hr import extract_hr
+    from util.hr.header import SchemaError, read_header
+
+    path = str(path)
+    meta = parse_path(path)
+    group = group or meta["group"]
+    if group not in GROUPS:
+        raise ValueError(f"group must be one of {', '.join(GROUPS)}, got {group!r} for {path}")
+
+    def result(skipped, err, week=None, zone_metrics=None):
+        return FileResult(
+            path=path,
+            subject=meta["subject"],
+            group=group,
+            week=week,
+            session=meta["session"],
+            skipped=skipped,
+            errors=_as_errors(err),
+            zone_metrics=zone_metrics,
+        )
+
+    if meta["week"] is not None:
+        try:
+            read_header(path)
+        except SchemaError as e:
+            return result(True, {"schema": [f"{e}; file skipped", None]}, meta["week"])
+    if chunk_rows:
+        from qc.online import UnorderedRecording, score_file
+        from util.hr.extract_hr import _get_week_from_path
+        week = _get_week_from_path(path) if path.lower().endswith(".csv") else None
+        if week is None:
+            return result(True, {"week_parse": ["could not parse week from filename; file skipped", None]})
+        try:
+            skipped, err, zone_metrics = score_file(path, chunk_rows, week, zones, group)
+            return result(skipped, err, week, zone_metrics)
+        except UnorderedRecording as e:
+            logger.info("%s in %s; scoring the whole recording instead", e, path)
+    hr, week = extract_hr(path, engine=engine)
+    if hr is None or week is None:
+        return result(True, {"week_parse": ["could not parse week from filename; file skipped", None]})
+    skipped, err, zone_metrics = score_hr(hr, week, zones, group)
+    return result(skipped, err, week, zone_metrics)
+
+
+def score_hr(
+    hr: pd.DataFrame,
+    week: int,
+    zones: pd.DataFrame,
+    group: str,
+) -> tuple[bool, dict[str, list], dict[str, Any] | None]:
+    """
+    QC and zone-score an already parsed recording (extract_hr's frame).
+
+    Returns (skipped, err, zone_metrics): skipped is True when a file rule
+    dropped the recording, err is the {code: [message, details]} dict and
+    zone_metrics is None for a skipped file.
+    """
+    from qc.rules import SessionScan, evaluate, skips_file
+    from qc.sup import QC_Sup
+
+    scan = SessionScan(hr)
+    err = evaluate(scan, "file")
+    if skips_file(err):
+        return True, err, None
+    qc = QC_Sup(hr, zones, week, group)
+    qc.err.update(err)
+    qc.err.update(evaluate(scan, "session"))
+    zone_metrics = qc.qc_zones()
+    return False, qc.err, zone_metrics
+
+
+def _subject_of(path: str) -> str | None:
+    return parse_path(path)["subject"]
+
+
+def process_many(
+    paths: Iterable[str | os.PathLike],
+    zones: Mapping[str, pd.DataFrame] | pd.DataFrame,
+    workers: int | None = None,
+    group: str | None = None,
+    engine: str = "pandas",
+    chunk_rows: int | None = None,
+) -> Iterator[FileResult]:
+    """
+    `process_file` over many recordings, yielding each result as soon as
+    it is ready (completion order, not input order).
+
+    zones is either one frame used for every file or a mapping from
+    subject ("sub8000") to its frame; the subject comes from the path.
+    `paths` is consumed lazily and at most 2 x workers files are in flight,
+    so a long or endless iterable is fine. workers=0 runs everything in
+    this process; None uses every core. chunk_rows is passed to
+    process_file.
+    """
+    def zones_for(path):
+        if isinstance(zones, pd.DataFrame):
+            return zones
+        subject = _subject_of(path)
+        if subject not in zones:
+            raise KeyError(f"No zones for {subject!r} ({path})")
+        return zones[subject]
+
+    paths = (str(p) for p in paths)
+    if workers == 0:
+        for path in paths:
+            yield process_file(path, zones_for(path), group, engine, chunk_rows)
+        return
+
+    from util.runlog import worker_options
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, **worker_options()) as pool:
+        def submit(batch):
+            return {pool.submit(process_file, p, zones_for(p), group, engine, chunk_rows) for p in batch}
+
+        pending = submit(islice(paths, 2 * workers))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending |= submit(islice(paths, len(done)))
+            for future in done:
+                yield future.result()
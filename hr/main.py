@@ -1,23 +1,53 @@
+import time
+
+# process start, for the startup_seconds metric and `status` timing
+_T0 = time.perf_counter()
+
 import os
 import sys
 import logging
 from pathlib import Path
-import pandas as pd
+
+# Heavy modules (pandas, openpyxl, numpy) are imported inside the methods
+# that need them, so `status`, `export` and --help start in well under a second.
+
+SYSTEMS = {
+    "Argon": "/Shared/vosslabhpc/Projects/BOOST/",
+    "Home": "/mnt/lss/Projects/BOOST/",
+    "vosslnx": "/mnt/nfs/lss/vosslabhpc/Projects/BOOST/",
+}
+
+# stage names in run order (see Main._stage_graph)
+STAGES = ("scan", "qc", "qc_out", "zones", "cube", "catalog", "meta")
+
+# under the BOOST project directory
+ZONE_WORKBOOK = "InterventionStudy/1-projectManagement/participants/ExerciseSessionMaterials/Intervention Materials/BOOST HR ranges.xlsx"
+POLAR_DIR = os.path.join("InterventionStudy", "3-experiment", "data", "polarhrcsv")
+
 
 class Main:
 
-    def __init__(self, system):
+    def __init__(self, system=None, shard=None, cache_dir="./.hr_cache", resample=False, stream=False, mirror=None, engine="pandas", hr_store=None, metrics=None, stage_dir="./.hr_stages",
+                 read_timeout=None, read_retries=None, hedge_after=None, root=None, time_budget=None, chunk_rows=None, command="run"):
         import os
+        from util.metrics import RunMetrics
+
+        # --time-budget: stop starting new files this many seconds after setup began
+        self.time_budget = time_budget
+        self._run_started = time.time()
+        self._deadline = None if time_budget is None else time.monotonic() + time_budget
+
+        # --metrics FILE: node_exporter textfile with this run's timings and counts
+        self.metrics = RunMetrics()
+        self.metrics_path = metrics
 
-        # Set the base path dependent on system
-        if system is None:
+        # Set the base path dependent on system; --root points anywhere else
+        if root is not None:
+            self.base_path = root
+        elif system is None:
             raise ValueError("System cannot be None")
-        if system == "Argon":
-            self.base_path = "/Shared/vosslabhpc/Projects/BOOST/"
-        elif system == "Home":
-            self.base_path = "/mnt/lss/Projects/BOOST/"
-        elif system == "vosslnx":
-            self.base_path = "/mnt/nfs/lss/vosslabhpc/Projects/BOOST/"
+        elif system in SYSTEMS:
+            self.base_path = SYSTEMS[system]
         else:
             raise ValueError(f"Unknown system: {system}")
 
@@ -27,39 +57,100 @@ class Main:
             raise FileNotFoundError(f"Base path does not exist: {self.base_path}")
 
         # add zone path to class 
-        self.zone_path = os.path.join(
-            self.base_path,
-            "InterventionStudy/1-projectManagement/participants/ExerciseSessionMaterials/Intervention Materials/BOOST HR ranges.xlsx"
-        )
+        self.zone_path = os.path.join(self.base_path, ZONE_WORKBOOK)
         if not os.path.isfile(self.zone_path):
             raise FileNotFoundError(f"Zone path does not exist: {self.zone_path}")
 
         self.out_path = "./qc_out.csv"
         self.zone_out_path = "./zone_out.csv"
+        self.cube_path = "./adherence_cube.csv"
+        self.drift_path = "./resample_drift.csv"
+        self.catalog_path = "./recording_catalog.csv"
+
+        # zone workbook and subject -> (snapped zones, zone hash), loaded on first use
+        self._sheet = None
+        self._zone_rows = {}
+
+        # duplicate copy -> original, from the fingerprint pass; None until computed
+        self._duplicates = None
+
+        # also compare each processed session against the 1 Hz grid path
+        self.resample = resample
 
+        # per-session results from earlier runs; None disables reuse
+        self.cache_dir = cache_dir
 
-        # add logging configuration
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler("main.log", mode="w", encoding="utf-8"), # mode = w will allow for logging to NOT APPEND - then we don't have crazy logs
-                logging.StreamHandler()
-            ]
+        # cached stage intermediates (see _stage_graph); None always recomputes
+        self.stage_dir = stage_dir
+
+        # every CSV parse reads under a deadline with retries and a hedged second read
+        from util.deadline import DeadlineReader, READ_TIMEOUT_S, RETRIES, HEDGE_AFTER_S
+        self.reader = DeadlineReader(
+            timeout=READ_TIMEOUT_S if read_timeout is None else read_timeout,
+            retries=RETRIES if read_retries is None else read_retries,
+            hedge_after=HEDGE_AFTER_S if hedge_after is None else hedge_after,
         )
 
+        # write each session's rows as it finishes instead of holding them all
+        self.stream = stream
+
+        # --chunk-rows N: score each recording N samples at a time instead of as one frame
+        self.chunk_rows = chunk_rows
+
+        # --hr-store DIR: columnar copy of every parsed recording, read instead of the CSV
+        self.hr_store = hr_store
+
+        # --shard i/N: only this slice of subjects, written to shards/ for `merge`
+        self.shard = None
+        if shard is not None:
+            from util.shard import parse_shard
+            self.shard = parse_shard(shard)
 
-    def main(self):
+
+        # main.log, the console and main.jsonl (<command>.log/.jsonl for commands other
+        # than run), written by one listener thread that worker processes log to as
+        # well; repeated warnings are summarized at exit
+        from util.runlog import command_log, setup_logging
+        self.runlog = setup_logging(**command_log(command))
+
+        # CSV parse backend (pandas or pyarrow); outputs are identical
+        from util.hr.extract_hr import resolve_engine
+        self.engine = resolve_engine(engine)
+        self.metrics.lap("setup")
+
+        # --mirror DIR: delta-sync the inputs to local disk and read only from there
+        self.mirror = None
+        if mirror is not None:
+            self._sync_mirror(mirror)
+            self.metrics.lap("mirror")
+
+    def _sync_mirror(self, mirror_dir):
         """
-        Main function to run the script.
+        Copy new/changed CSVs and the zone workbook to `mirror_dir`, then
+        point base_path and zone_path at the mirror. Refuses to continue if
+        the sync did not complete.
+        """
+        from util.mirror import Mirror
+        polar_rel = os.path.join("InterventionStudy", "3-experiment", "data", "polarhrcsv")
+        # _build_meta spells the experiment folder with a capital E
+        meta_rel = os.path.join("InterventionStudy", "3-Experiment", "data", "polarhrcsv")
+        zone_rel = os.path.relpath(self.zone_path, self.base_path)
+        self.mirror = Mirror(self.base_path, mirror_dir)
+        self.mirror.sync([polar_rel, meta_rel, zone_rel])
+        if not self.mirror.ready():
+            raise RuntimeError(f"Mirror sync did not complete: {mirror_dir}")
+        self.base_path = os.path.abspath(mirror_dir)
+        self.zone_path = self.mirror.path(zone_rel)
+
+
+    def _iter_files(self):
+        """
+        Yield (session, subject, file) for every CSV in the polarhrcsv tree,
+        in the same order main() has always walked it.
         """
-        err_master = {} # dict to hold all errors
-        zone_master = {} # dict to hold all zone metrics
         from util.get_files import get_files
-        from util.hr.extract_hr import extract_hr, recording_window
-        from util.zone.extract_zones import extract_zones
-        from qc.sup import QC_Sup
-        project_path = os.path.join(self.base_path, "InterventionStudy", "3-experiment", "data", "polarhrcsv")
+        from util.shard import in_shard
+        project_path = os.path.join(self.base_path, POLAR_DIR)
         if os.path.exists(project_path):
             for session in ["Supervised", "Unsupervised"]:
                 session_path = os.path.join(project_path, session)
@@ -67,97 +158,971 @@ class Main:
                 if os.path.exists(session_path):
                     # return the files dict that contains base_path and list of files for each base_path
                     files = get_files(session_path)
-                    # extract hr from each file
                     for subject, subject_files in files.items():
+                        if self.shard is not None and not in_shard(subject, *self.shard):
+                            continue
                         for file in subject_files:
                             if file.lower().endswith('.csv'):
-                                hr, week = extract_hr(file)
-                                if hr is None or week is None:
-                                    logging.warning("Skipping file with unparseable week: %s", file)
-                                    err = {"week_parse": ["could not parse week from filename; file skipped", None]}
-                                    if subject not in err_master:
-                                        err_master[subject] = [[file, err]]
-                                    else:
-                                        err_master[subject].append([file, err])
-                                    continue
-                                window = recording_window(hr)
-                                if window is not None:
-                                    start_time, end_time, duration = window
-                                    if duration > pd.Timedelta(hours=4):
-                                        logging.warning(
-                                            "Skipping file with long duration (%s): %s",
-                                            duration,
-                                            file,
-                                        )
-                                        err = {
-                                            "duration": [
-                                                "recording longer than 4 hours; file ignored",
-                                                pd.DataFrame({
-                                                    "start_time": [start_time],
-                                                    "end_time": [end_time],
-                                                    "duration": [duration],
-                                                }),
-                                            ]
-                                        }
-                                        if subject not in err_master:
-                                            err_master[subject] = [[file, err]]
-                                        else:
-                                            err_master[subject].append([file, err])
-                                        continue
-                                zones = extract_zones(self.zone_path, subject)
-                                err, zone_metrics = QC_Sup(hr, zones, week, session).main()
-
-                                if subject not in err_master:
-                                    # first time: create a list with this one error
-                                    err_master[subject] = [[file,err]]
-                                else:
-                                    # append to the existing list
-                                    err_master[subject].append([file,err])
-                                if zone_metrics is not None:
-                                    if subject not in zone_master:
-                                        zone_master[subject] = [[file, zone_metrics]]
-                                    else:
-                                        zone_master[subject].append([file, zone_metrics])
-        err_master = {
-            subject: [e for e in errs if e]
-            for subject, errs in err_master.items()
+                                yield session, subject, file
+
+    def _subject_zones(self, subject):
+        """
+        Snapped zones for `subject` plus their hash; the workbook is read
+        once per run instead of once per file.
+        """
+        from util.zone.extract_zones import extract_zones, read_zone_sheet
+        from util.cache import zone_hash
+        if subject not in self._zone_rows:
+            if self._sheet is None:
+                self._sheet = read_zone_sheet(self.zone_path)
+            zones = extract_zones(self.zone_path, subject, sheet=self._sheet)
+            self._zone_rows[subject] = (zones, zone_hash(zones))
+        return self._zone_rows[subject]
+
+    def _find_duplicates(self, files=None, unread=None):
+        """
+        Fingerprint every CSV (or `files`) and remember which ones are
+        byte-identical copies of an earlier file; files that could not be
+        read are added to `unread`.
+        """
+        from util.fingerprint import find_duplicates
+        if files is None:
+            files = [file for _, _, file in self._iter_files()]
+        self._duplicates = find_duplicates(files, unread=unread, opener=self.reader.open)
+        return self._duplicates
+
+    def _read_hr(self, subject, file, stat=None, store=None):
+        """
+        extract_hr for one file, served from the HR store when it holds the
+        same (file, stat), and added to it otherwise.
+        """
+        from util.hr.extract_hr import extract_hr
+        if store is not None:
+            hr, week = store.load(subject, file, stat)
+            if hr is not None:
+                return hr, week
+        from util.archive import source_size
+        hr, week = extract_hr(file, engine=self.engine, opener=self.reader.open)
+        self.metrics.inc("bytes_read", source_size(file), "Bytes of CSV parsed.")
+        if store is not None and hr is not None and week is not None:
+            from util.parse_path import parse_path
+            meta = parse_path(str(file))
+            store.add(subject, file, stat, hr, week, meta["group"], meta["session"])
+        return hr, week
+
+    def _score_chunked(self, session, subject, file):
+        """
+        (week, skipped, err, zone_metrics) for `file` read --chunk-rows
+        samples at a time (qc/online.py), or None when the whole-frame path
+        must take it: no week in the name, or a sample order the chunks
+        cannot reproduce (repeated timestamps, a clock stepping back other
+        than once at midnight).
+        """
+        import re
+        from util.archive import source_size
+        from qc.online import UnorderedRecording, score_file
+        # the whole-frame path reports (and logs) a missing week
+        match = re.search(r"_wk(\d+)", os.path.basename(str(file)), re.IGNORECASE)
+        if not str(file).lower().endswith(".csv") or match is None:
+            return None
+        week = int(match.group(1))
+        zones, _ = self._subject_zones(subject)
+
+        try:
+            skipped, err, zone_metrics = score_file(file, self.chunk_rows, week, zones, session, opener=self.reader.open)
+        except UnorderedRecording as e:
+            logging.info("%s in %s; scoring the whole recording instead", e, file)
+            return None
+        finally:
+            self.metrics.inc("bytes_read", source_size(file), "Bytes of CSV parsed.")
+        return week, skipped, err, zone_metrics
+
+    def _count_file(self, source=None, skipped=None):
+        """Tally one file as processed (computed or from the cache) or skipped, with the reason."""
+        if skipped is not None:
+            self.metrics.inc("files_skipped", 1, "Files dropped, by reason.", reason=skipped)
+        else:
+            self.metrics.inc("files_processed", 1, "Files scored, by where the result came from.", source=source)
+
+    def write_metrics(self, success=True):
+        """Write the metrics textfile if --metrics was given."""
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path, success)
+
+    def _stage_graph(self):
+        """
+        The run as named stages:
+
+          scan    list the CSVs, find duplicate uploads and read each header
+          qc      per-file QC and zone metrics (reuses the session cache)
+          qc_out  write qc_out.csv
+          zones   write zone_out.csv
+          cube    update the adherence cube
+          catalog write the recording catalog (header metadata)
+          meta    adherence meta and master table (Get_Data)
+
+        Shard runs write partial qc_out/zone_out/catalog files and the
+        cube's sessions under shards/, skip meta and keep their
+        intermediates apart; `merge` builds the rest.
+        """
+        from util.stages import Stage, StageGraph
+        from util.cache import CACHE_VERSION, file_stat
+        from util.shard import shard_path
+        from qc.rules import rules_hash
+
+        qc_target, zone_target, catalog_target = self.out_path, self.zone_out_path, self.catalog_path
+        stage_dir = self.stage_dir
+        if self.shard is not None:
+            # partial outputs only; the cube and the study-level meta wait for `merge`
+            qc_target = shard_path(self.out_path, *self.shard)
+            zone_target = shard_path(self.zone_out_path, *self.shard)
+            catalog_target = shard_path(self.catalog_path, *self.shard)
+            if stage_dir:
+                stage_dir = os.path.join(stage_dir, "{}-of-{}".format(*self.shard))
+
+        graph = StageGraph(stage_dir, metrics=self.metrics)
+        graph.add(Stage(
+            "scan", self._stage_scan, key=self._scan_key,
+            # a fingerprint or header that could not be read is retried next run
+            keep=lambda scan: not scan["unread"],
+        ))
+        graph.add(Stage(
+            "qc",
+            lambda scan: self._stage_qc(scan, qc_target, zone_target),
+            inputs=["scan"],
+            outputs=[self.drift_path] if self.resample else [],
+            key=lambda: [file_stat(self.zone_path), CACHE_VERSION, rules_hash(), self.resample],
+            # --stream writes qc_out/zone_out while scoring and keeps no results to cache
+            cacheable=not self.stream,
+            # files that timed out or were deferred must be read again next run
+            keep=lambda qc: not qc["read_timeouts"] and not qc.get("deferred"),
+        ))
+        graph.add(Stage(
+            "qc_out", lambda qc: self._stage_qc_out(qc, qc_target),
+            inputs=["qc"], outputs=[qc_target], key=lambda: qc_target, inline=True,
+        ))
+        graph.add(Stage(
+            "zones", lambda qc: self._stage_zones(qc, zone_target),
+            inputs=["qc"], outputs=[zone_target], key=lambda: zone_target, inline=True,
+        ))
+        if self.shard is None:
+            graph.add(Stage("cube", self._stage_cube, inputs=["qc"], outputs=[self.cube_path]))
+        else:
+            part = self._cube_part_path(*self.shard)
+            graph.add(Stage("cube", self._stage_cube_part, inputs=["qc"], outputs=[part], key=lambda: str(part)))
+        graph.add(Stage(
+            "catalog", lambda scan: self._stage_catalog(scan, catalog_target),
+            inputs=["scan"], outputs=[catalog_target], key=lambda: str(catalog_target),
+        ))
+        if self.shard is None:
+            graph.add(Stage("meta", self._stage_meta, inputs=["scan"]))
+        return graph
+
+    def _schedule_path(self):
+        """The --time-budget checkpoint; each shard keeps its own."""
+        from util.schedule import SCHEDULE_PATH
+        if self.shard is None:
+            return SCHEDULE_PATH
+        from util.shard import shard_path
+        return shard_path(SCHEDULE_PATH, *self.shard)
+
+    def _scan_key(self):
+        """List the CSVs (kept for _stage_scan) and fingerprint them by path and stat."""
+        from util.cache import file_stat
+        self._files = list(self._iter_files())
+        return [[file, list(file_stat(file))] for _, _, file in self._files]
+
+    def _stage_scan(self):
+        import re
+        from util.hr.header import index_headers
+        files = self._files
+        unread = []
+        duplicates = self._find_duplicates([file for _, _, file in files], unread=unread)
+        # only files extract_hr would parse (a _wk## name); the rest are reported as week_parse
+        headers = index_headers([
+            file for _, _, file in files
+            if file not in duplicates and re.search(r"_wk\d+", os.path.basename(file), re.IGNORECASE)
+        ], opener=self.reader.open)
+        unread += [file for file, header in headers.items() if "unread" in header]
+        return {"files": files, "duplicates": duplicates, "headers": headers, "unread": unread}
+
+    def _stage_qc(self, scan, qc_target, zone_target):
+        """
+        QC and zone-score every file; returns the error and zone tables
+        plus the per-session metrics for the adherence cube.
+        """
+        err_master = {} # dict to hold all errors
+        zone_master = {} # dict to hold all zone metrics
+        from util.cache import SessionCache, file_stat
+        from util.deadline import ReadTimeout
+        from qc.rules import RULES, SessionScan, evaluate, rules_hash, skip_reasons, skips_file
+        from qc.sup import QC_Sup
+        cache = SessionCache(self.cache_dir, rules=rules_hash()) if self.cache_dir else None
+        store = None
+        if self.hr_store:
+            from util.hr.store import HRStore
+            store = HRStore(self.hr_store)
+        # pick up workbook edits made since this instance last ran
+        self._sheet = None
+        self._zone_rows = {}
+        reused = recomputed = read_timeouts = 0
+        sessions = {} # file -> (subject, zone metrics or None) for the adherence cube
+        carried = {} # file -> subject: not scored this run, the cube keeps what it had
+        drift_rows = [] # 1 Hz grid vs irregular-delta comparison (--resample)
+
+        def add_drift(session, subject, file, hr, zones, week):
+            from qc.grid import grid_drift
+            from util.parse_path import parse_path
+            meta = parse_path(str(file))
+            for row in grid_drift(hr, zones, week, session):
+                drift_rows.append({
+                    "group": meta["group"],
+                    "subject": meta["subject"] or subject,
+                    "week": week,
+                    "session": meta["session"],
+                    **row,
+                })
+        if self.stream:
+            from qc.save_qc import QCWriter
+            from qc.zone.save_zones import ZoneWriter
+            qc_writer = QCWriter(qc_target)
+            zone_writer = ZoneWriter(zone_target)
+
+            def record_err(subject, file, err):
+                qc_writer.add(subject, file, err)
+
+            def record_zone(subject, file, zone_metrics):
+                zone_writer.add(subject, file, zone_metrics)
+        else:
+            def record_err(subject, file, err):
+                err_master.setdefault(subject, []).append([file, err])
+
+            def record_zone(subject, file, zone_metrics):
+                zone_master.setdefault(subject, []).append([file, zone_metrics])
+
+        files = scan["files"]
+        duplicates = self._duplicates = scan["duplicates"]
+        headers = scan["headers"]
+        schedule = None
+        deferred = [] # files left for the next run once the time budget ran out
+        if self.time_budget is not None:
+            from collections import Counter
+            from util.schedule import Schedule
+            schedule = Schedule(self._schedule_path())
+            ranked = schedule.order(files, self._run_started)
+            files = [(session, subject, file) for session, subject, file, _ in ranked]
+            tiers = Counter(tier for *_, tier in ranked)
+            logging.info(
+                "Scheduled %d files within a %gs budget: %d recent, %d active, %d backfill",
+                len(files), self.time_budget, tiers["recent"], tiers["active"], tiers["backfill"],
+            )
+        for session, subject, file in files:
+            if file in duplicates:
+                # same bytes as an earlier upload: report it, never parse or count it
+                logging.warning("Skipping duplicate of %s: %s", duplicates[file], file)
+                original = os.path.join(*Path(duplicates[file]).parts[-3:])
+                err = {"duplicate": [f"duplicate of {original}; file skipped", None]}
+                record_err(subject, file, err)
+                self._count_file(skipped="duplicate")
+                continue
+            if "error" in headers.get(file, {}):
+                # rejected from its header alone, before any full parse
+                err = {"schema": [f"{headers[file]['error']}; file skipped", None]}
+                record_err(subject, file, err)
+                # Get_Data counts it as a session, so the cube does too
+                sessions[file] = (subject, None)
+                self._count_file(skipped="schema")
+                continue
+            stat = file_stat(file) if cache or store else None
+            entry = cache.get(file, stat) if cache else None
+            if entry is not None and entry.get("skip"):
+                # file-level rejection (e.g. too long) does not depend on zones
+                err = entry["qc"]
+                record_err(subject, file, err)
+                sessions[file] = (subject, None)
+                reused += 1
+                self._count_file(skipped=",".join(skip_reasons(err)))
+                continue
+            if entry is not None:
+                zones, zh = self._subject_zones(subject)
+                if entry["zone_hash"] == zh:
+                    # neither the recording nor this subject's snapped bounds changed
+                    err = {**entry["qc"], **entry["zone_err"]}
+                    zone_metrics = entry["zone_metrics"]
+                    record_err(subject, file, err)
+                    if zone_metrics is not None:
+                        record_zone(subject, file, zone_metrics)
+                    sessions[file] = (subject, zone_metrics)
+                    reused += 1
+                    self._count_file(source="cache")
+                    if self.resample:
+                        # the cache holds no samples; drift needs them for every scored file
+                        try:
+                            hr, _ = self._read_hr(subject, file, stat, store)
+                        except ReadTimeout as e:
+                            # drift is incomplete, so the qc stage is not cached either
+                            logging.error("No resample drift for file that could not be read (%s): %s", e, file)
+                            read_timeouts += 1
+                            continue
+                        add_drift(session, subject, file, hr, zones, entry["week"])
+                    continue
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                # out of time: cached results above are still served, nothing new is parsed
+                deferred.append(file)
+                if entry is not None:
+                    # only the zone bounds moved: keep the last run's metrics, marked, until rescored
+                    err = {
+                        **entry["qc"],
+                        **entry["zone_err"],
+                        "stale_zones": ["zone bounds changed; zone metrics are from an earlier run, "
+                                       "rescored by the next run", None],
+                    }
+                    zone_metrics = entry["zone_metrics"]
+                    record_err(subject, file, err)
+                    if zone_metrics is not None:
+                        record_zone(subject, file, zone_metrics)
+                    sessions[file] = (subject, zone_metrics)
+                    reused += 1
+                    self._count_file(source="stale")
+                    continue
+                err = {"deferred": ["time budget reached; file left for the next run", None]}
+                record_err(subject, file, err)
+                self._count_file(skipped="deferred")
+                carried[file] = subject
+                continue
+            if "unread" in headers.get(file, {}):
+                # an I/O error, not a schema verdict: skipped like a read timeout and tried again next run
+                logging.error("Skipping file whose header could not be read (%s): %s", headers[file]["unread"], file)
+                err = {"read_timeout": [f"header could not be read ({headers[file]['unread']}); file skipped", None]}
+                record_err(subject, file, err)
+                self._count_file(skipped="read_timeout")
+                read_timeouts += 1
+                carried[file] = subject
+                continue
+            chunked = None
+            try:
+                if self.chunk_rows:
+                    chunked = self._score_chunked(session, subject, file)
+                if chunked is None:
+                    hr, week = self._read_hr(subject, file, stat, store)
+            except ReadTimeout as e:
+                # neither this file nor the qc stage is cached, so the next run tries it again
+                logging.error("Skipping file that could not be read (%s): %s", e, file)
+                err = {"read_timeout": [f"{e}; file skipped", None]}
+                record_err(subject, file, err)
+                self._count_file(skipped="read_timeout")
+                read_timeouts += 1
+                carried[file] = subject
+                continue
+            if chunked is not None:
+                week, skipped, err, zone_metrics = chunked
+            else:
+                if hr is None or week is None:
+                    logging.warning("Skipping file with unparseable week: %s", file)
+                    err = {"week_parse": ["could not parse week from filename; file skipped", None]}
+                    record_err(subject, file, err)
+                    self._count_file(skipped="week_parse")
+                    continue
+                scan = SessionScan(hr)
+                err = evaluate(scan, "file")
+                skipped = skips_file(err)
+            if skipped:
+                logging.warning(
+                    "Skipping file (%s): %s",
+                    "; ".join(payload[0] for payload in err.values()),
+                    file,
+                )
+                record_err(subject, file, err)
+                if cache:
+                    cache.put(file, stat, {"week": week, "skip": True, "qc": err})
+                sessions[file] = (subject, None)
+                self._count_file(skipped=",".join(skip_reasons(err)))
+                continue
+            zones, zh = self._subject_zones(subject)
+            if chunked is not None:
+                # score_chunks already ran the file, session and zone rules
+                qc_err = {k: v for k, v in err.items() if k in RULES and RULES[k].kind != "zone"}
+            else:
+                qc = QC_Sup(hr, zones, week, session)
+                if entry is not None:
+                    # only the zone bounds moved; gaps and NaN runs are still valid
+                    qc.err = dict(entry["qc"])
+                else:
+                    qc.err.update(err)
+                    qc.err.update(evaluate(scan, "session"))
+                qc_err = dict(qc.err)
+                zone_metrics = qc.qc_zones()
+                err = qc.err
+            if cache:
+                cache.put(file, stat, {
+                    "week": week,
+                    "skip": False,
+                    "qc": qc_err,
+                    "zone_hash": zh,
+                    "zone_err": {k: v for k, v in err.items() if k not in qc_err},
+                    "zone_metrics": zone_metrics,
+                })
+            sessions[file] = (subject, zone_metrics)
+            recomputed += 1
+            self._count_file(source="computed")
+            if self.resample:
+                add_drift(session, subject, file, hr, zones, week)
+
+            record_err(subject, file, err)
+            if zone_metrics is not None:
+                record_zone(subject, file, zone_metrics)
+        if cache:
+            logging.info("Session cache: %d reused, %d recomputed", reused, recomputed)
+        if schedule is not None:
+            if deferred:
+                logging.warning("Time budget reached: %d files left for the next run", len(deferred))
+            schedule.save(self._run_started, deferred)
+        self._log_reads()
+        if self.resample:
+            from qc.grid import save_drift
+            save_drift(drift_rows, self.drift_path)
+        qc_rows = zone_rows = None
+        if self.stream:
+            qc_rows = qc_writer.close()
+            zone_rows = zone_writer.close()
+        return {
+            "err_master": {
+                subject: [e for e in errs if e]
+                for subject, errs in err_master.items()
+            },
+            "zone_master": zone_master,
+            "sessions": sessions,
+            "carried": carried,
+            "qc_rows": qc_rows,
+            "zone_rows": zone_rows,
+            "read_timeouts": read_timeouts,
+            "deferred": len(deferred),
         }
+
+    def _log_reads(self):
+        """Log and export this run's per-file read latency percentiles."""
+        summary = self.reader.summary()
+        if "p50" in summary:
+            logging.info(
+                "Read latency over %d file reads (headers, fingerprints, parses): p50 %.3fs, p90 %.3fs, p99 %.3fs, max %.3fs "
+                "(%d hedged, %d retried, %d timed out)",
+                summary["reads"], summary["p50"], summary["p90"], summary["p99"], summary["max"],
+                summary["hedged"], summary["retried"], summary["timeouts"],
+            )
+            for q, quantile in (("p50", "0.5"), ("p90", "0.9"), ("p99", "0.99"), ("max", "1")):
+                self.metrics.set("read_latency_seconds", summary[q], "Time spent reading one opened CSV (header, fingerprint or parse).", quantile=quantile)
+        for name in ("hedged", "retried", "timeouts"):
+            self.metrics.set(f"reads_{name}", summary[name], f"CSV reads {name} (see --read-timeout).")
+
+    def _stage_qc_out(self, qc, qc_target):
         from qc.save_qc import save_qc
-        save_qc(err_master, self.out_path)
+        if qc["qc_rows"] is not None:
+            # already written by the --stream spool
+            return qc["qc_rows"]
+        return len(save_qc(qc["err_master"], qc_target))
+
+    def _stage_zones(self, qc, zone_target):
         from qc.zone.save_zones import save_zones
-        save_zones(zone_master, self.zone_out_path)
+        if qc["zone_rows"] is not None:
+            return qc["zone_rows"]
+        return len(save_zones(qc["zone_master"], zone_target))
+
+    def _cube(self):
+        """The adherence cube, its state kept in the session cache dir (none under --no-cache)."""
+        from plot.cube import AdherenceCube, STATE_FILE
+        state_path = os.path.join(self.cache_dir, STATE_FILE) if self.cache_dir else None
+        return AdherenceCube(self.cube_path, state_path)
+
+    def _stage_cube(self, qc):
+        self._cube().update(qc["sessions"], qc["carried"])
+        return None
+
+    def _cube_part_path(self, index, count):
+        """Where a shard leaves its sessions for `merge` to build the cube from."""
+        from util.shard import shard_path
+        return shard_path(Path(self.cube_path).with_suffix(".pkl"), index, count)
+
+    def _stage_cube_part(self, qc):
+        import pickle
+        path = self._cube_part_path(*self.shard)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as fh:
+            pickle.dump({"sessions": qc["sessions"], "carried": qc["carried"]}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        logging.info("Cube sessions written: %s (%d files)", path, len(qc["sessions"]) + len(qc["carried"]))
+        return None
+
+    def _stage_catalog(self, scan, catalog_target):
+        from util.hr.header import save_catalog
+        return len(save_catalog(scan["headers"], catalog_target))
+
+    def _stage_meta(self, scan):
+        self._duplicates = scan["duplicates"]
+        return self._build_meta()
+
+    def main(self, stages=None, start=None):
+        """
+        Main function to run the script.
+
+        stages / start pick which stages to bring up to date (a list of
+        names, or everything from one stage on); by default all of them.
+        Stages whose inputs are unchanged are served from their cached
+        intermediates. Returns the values of the stages that were run or
+        loaded, keyed by stage name.
+        """
+        self.metrics.lap()
+        self.metrics.inc("bytes_read", 0, "Bytes of CSV parsed.")
+        graph = self._stage_graph()
+        values = graph.run(graph.select(stages, start))
+        for name, target in (("qc_out", graph.stages["qc_out"].outputs[0]), ("zones", graph.stages["zones"].outputs[0])):
+            if values.get(name) is not None:
+                self.metrics.set("rows_written", values[name], "Rows in the output CSVs.", file=os.path.basename(target))
+        return values
+
+    def _build_meta(self):
         from plot.get_data import Get_Data
         path = os.path.join(self.base_path, "InterventionStudy", "3-Experiment", "data", "polarhrcsv")
-        gd = Get_Data(sup_path=os.path.join(path, "Supervised"), unsup_path=os.path.join(path, "Unsupervised"), study="InterventionStudy")
+        if self._duplicates is None:
+            self._find_duplicates()
+        gd = Get_Data(
+            sup_path=os.path.join(path, "Supervised"),
+            unsup_path=os.path.join(path, "Unsupervised"),
+            study="InterventionStudy",
+            exclude=self._duplicates,
+        )
         meta = gd.get_meta()
         df_master = gd.build_master_df()
         #gd.save_for_rust("./rust-ols-adherence-cli/data.csv")
+        return meta, df_master
 
+    def merge(self, count: int):
+        """
+        Combine the outputs of `--shard 1/N` ... `--shard N/N` into the
+        qc_out.csv/zone_out.csv/recording_catalog.csv a single unsharded run
+        would write, update the adherence cube from the shards' sessions and
+        rebuild the meta.
+        """
+        import pickle
+        from util.shard import merge_shards
+        from util.hr.header import CATALOG_SORT_KEYS
+        from qc.save_qc import QC_SORT_KEYS
+        from qc.zone.save_zones import ZONE_SORT_KEYS
+        parts = []
+        for index in range(1, count + 1):
+            path = self._cube_part_path(index, count)
+            if not path.is_file():
+                raise FileNotFoundError(f"Missing shard output: {path}")
+            with open(path, "rb") as fh:
+                parts.append(pickle.load(fh))
+        merge_shards(self.out_path, count, QC_SORT_KEYS)
+        merge_shards(self.zone_out_path, count, ZONE_SORT_KEYS)
+        merge_shards(self.catalog_path, count, CATALOG_SORT_KEYS)
+        sessions, carried = {}, {}
+        for part in parts:
+            sessions.update(part["sessions"])
+            carried.update(part["carried"])
+        self._cube().update(sessions, carried)
+        self._build_meta()
 
+    def report(self, workers: int | None = None, out_dir: str = "./reports"):
+        """
+        Render per-subject HTML reports (HR traces over zone bands plus a
+        weekly metrics table) from the last run's zone_out.csv. Subjects whose
+        recordings, zone row and metrics are unchanged are not re-rendered.
+        """
+        import pandas as pd
+        from util.cache import file_stat
+        from util.parse_path import parse_path
+        from util.hr.header import index_headers
+        from plot.report import build_reports
+        from qc.zone.save_zones import ZONE_SORT_KEYS
 
-        return err_master
+        metrics = {}
+        if os.path.isfile(self.zone_out_path):
+            zone_out = pd.read_csv(self.zone_out_path, dtype={"session": str}, float_precision="round_trip")
+            zone_out = zone_out.astype(object).where(zone_out.notna(), None)
+            for row in zone_out.to_dict("records"):
+                key = tuple(row[k] for k in ZONE_SORT_KEYS)
+                metrics[key] = {k: v for k, v in row.items() if k not in ZONE_SORT_KEYS}
 
+        # same files the qc stage scores: no duplicate uploads, no schema rejects
+        files = [(subject, file) for _, subject, file in self._iter_files() if parse_path(str(file))["week"] is not None]
+        duplicates = self._find_duplicates([file for _, file in files])
+        headers = index_headers([file for _, file in files if file not in duplicates], opener=self.reader.open)
+        jobs = {}
+        for subject, file in files:
+            if file in duplicates or "error" in headers.get(file, {}):
+                continue
+            meta = parse_path(str(file))
+            if subject not in jobs:
+                zones, zh = self._subject_zones(subject)
+                bounds = {
+                    i: (int(zones[f"z{i}_start"].iat[0]), int(zones[f"z{i}_end"].iat[0]))
+                    for i in range(1, 6)
+                    if f"z{i}_start" in zones.columns
+                }
+                jobs[subject] = {
+                    "subject": subject,
+                    "zones": bounds,
+                    "zone_hash": zh,
+                    "engine": self.engine,
+                    "hr_store": self.hr_store,
+                    # workers build their own DeadlineReader from these
+                    "read": {
+                        "timeout": self.reader.timeout,
+                        "retries": self.reader.retries,
+                        "hedge_after": self.reader.hedge_after,
+                    },
+                    "sessions": [],
+                }
+            key = (meta["group"], meta["subject"] or subject, meta["week"], meta["session"])
+            jobs[subject]["sessions"].append({
+                "file": file,
+                "stat": file_stat(file),
+                "group": meta["group"],
+                "week": meta["week"],
+                "session": meta["session"],
+                "metrics": metrics.get(key),
+            })
+        for job in jobs.values():
+            job["sessions"].sort(key=lambda s: (s["group"] or "", s["week"], float(s["session"] or 0)))
+        return build_reports(list(jobs.values()), out_dir, workers)
 
-if __name__ == '__main__':
-    if sys.argv[1]:
-        if sys.argv[1] in ["Argon", "Home", "vosslnx"]:
-            Main(system=sys.argv[1]).main()
-        else:
-            raise ValueError("""First Argument is not one of the desired systems: 
-            The argument must be one of the following:
-            vosslnx = the vosslab linux machine used for automation
-            Argon = the Argon HPC
-            Home = My (Zak) personal linux machine mount
-            """)
+    def sweep(self, grid: dict | None = None, out_path: str = "./sweep_out.csv"):
+        """
+        Recompute the zone metrics for every combination in `grid`
+        (cap_min, snap_to, bounded_min), reading and preprocessing each
+        session once. Same skip rules as main(); no QC output is written.
+        """
+        from util.cache import file_stat
+        from util.deadline import ReadTimeout
+        from util.zone.extract_zones import read_zone_sheet, raw_zones
+        from qc.rules import SessionScan, evaluate, skips_file
+        from util.parse_path import parse_path
+        from qc.zone.sweep import sweep_session, save_sweep
+
+        store = None
+        if self.hr_store:
+            from util.hr.store import HRStore
+            store = HRStore(self.hr_store)
+        sheet = read_zone_sheet(self.zone_path)
+        rows = []
+        for session, subject, file in self._iter_files():
+            stat = file_stat(file) if store else None
+            try:
+                hr, week = self._read_hr(subject, file, stat, store)
+            except ReadTimeout as e:
+                logging.error("Skipping file that could not be read (%s): %s", e, file)
+                continue
+            if hr is None or week is None:
+                logging.warning("Skipping file with unparseable week: %s", file)
+                continue
+            if skips_file(evaluate(SessionScan(hr), "file")):
+                logging.warning("Skipping file rejected by file rules: %s", file)
+                continue
+            zones = raw_zones(sheet, subject)
+            meta = parse_path(str(file))
+            for row in sweep_session(hr, zones, week, session, grid):
+                rows.append({
+                    "group": meta["group"],
+                    "subject": meta["subject"] or subject,
+                    "week": week,
+                    "session": meta["session"],
+                    **row,
+                })
+        return save_sweep(rows, out_path)
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _time_budget(value: str) -> float:
+    import argparse
+    from util.schedule import parse_budget
+    try:
+        return parse_budget(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+# pipeline subcommands and the stages each one brings up to date (None: all, or --stages/--from)
+PIPELINE_COMMANDS = {"run": None, "qc": ["qc_out"], "zones": ["zones"], "meta": ["meta"]}
+# the positional form `main.py <system> [command]` these scripts used before subcommands
+LEGACY_COMMANDS = ("run", "sweep", "merge", "report")
+
+
+def _legacy_argv(argv: list[str]) -> list[str]:
+    """`vosslnx report --workers 4` -> `report --system vosslnx --workers 4`."""
+    if not argv or argv[0] not in SYSTEMS:
+        return argv
+    rest = argv[1:]
+    command = next((a for a in rest if a in LEGACY_COMMANDS), "run")
+    if command in rest:
+        rest.remove(command)
+    return [command, "--system", argv[0], *rest]
+
+
+def _parser():
+    import argparse
+
+    location = argparse.ArgumentParser(add_help=False)
+    where = location.add_mutually_exclusive_group()
+    where.add_argument(
+        "--system", choices=sorted(SYSTEMS),
+        help="""vosslnx = the vosslab linux machine used for automation,
+        Argon = the Argon HPC,
+        Home = My (Zak) personal linux machine mount""",
+    )
+    where.add_argument("--root", default=None,
+                       help="BOOST project directory to read from instead of a --system mount")
+    location.add_argument("--mirror", default=None,
+                          help="sync polarhrcsv and the zone workbook to this local directory first and read from it")
+
+    reading = argparse.ArgumentParser(add_help=False)
+    reading.add_argument("--engine", choices=["pandas", "pyarrow"], default="pandas",
+                         help="CSV parse backend; pyarrow is optional and parses multithreaded")
+    reading.add_argument("--hr-store", default=None,
+                         help="keep every parsed recording in this columnar store and read from it instead of the CSVs")
+    reading.add_argument("--read-timeout", type=float, default=None,
+                         help="seconds one CSV read may take before it is retried (default 120)")
+    reading.add_argument("--read-retries", type=int, default=None,
+                         help="extra attempts after a timed-out or failed read (default 2); then read_timeout is reported")
+    reading.add_argument("--hedge-after", type=float, default=None,
+                         help="start a second read of a file still unread after this many seconds (default 15, 0 = off)")
+
+    pipeline = argparse.ArgumentParser(add_help=False)
+    pipeline.add_argument("--shard", default=None,
+                          help="process only shard i of N (1-based, e.g. $SGE_TASK_ID/8) into shards/")
+    pipeline.add_argument("--no-cache", action="store_true",
+                          help="ignore and do not update the per-session cache or stage intermediates")
+    pipeline.add_argument("--resample", action="store_true",
+                          help="also score sessions on a 1 Hz grid and write resample_drift.csv")
+    pipeline.add_argument("--metrics", default=None,
+                          help="write run timings and counts as a node_exporter textfile (e.g. .../textfile/boost_hr.prom)")
+    pipeline.add_argument("--stream", action="store_true",
+                          help="spool each session's output rows as it finishes (flat memory)")
+    pipeline.add_argument("--chunk-rows", type=int, default=None,
+                          help="score each recording this many samples at a time (flat memory for very long "
+                               "recordings); not with --hr-store or --resample")
+    pipeline.add_argument("--time-budget", type=_time_budget, default=None,
+                          help="stop starting new files after this long (e.g. 5400, 90m, 2h); recent subjects and "
+                               "active weeks go first and the next run resumes the rest")
+
+    parser = argparse.ArgumentParser(
+        description="BOOST HR QC and zone adherence pipeline",
+        epilog="The older form `main.py <system> [run|sweep|merge|report] ...` still works.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    run = commands.add_parser("run", parents=[location, reading, pipeline], help="every stage (default of the old form)")
+    stage_choice = run.add_mutually_exclusive_group()
+    stage_choice.add_argument("--stages", type=lambda v: [s.strip() for s in v.split(",") if s.strip()], default=None,
+                              help=f"only these stages, comma-separated ({','.join(STAGES)}); "
+                                   "out-of-date inputs are rebuilt, the rest come from .hr_stages/")
+    stage_choice.add_argument("--from", dest="start", choices=STAGES, default=None,
+                              help="this stage and everything downstream of it")
+    commands.add_parser("qc", parents=[location, reading, pipeline], help="write qc_out.csv")
+    commands.add_parser("zones", parents=[location, reading, pipeline], help="write zone_out.csv")
+    commands.add_parser("meta", parents=[location, reading, pipeline], help="adherence meta and master table")
+
+    export = commands.add_parser("export", help="data.csv for rust-ols-adherence-cli from the adherence cube (no mounts)")
+    export.add_argument("--cube", default="./adherence_cube.csv")
+    export.add_argument("--out", default="./rust-ols-adherence-cli/data.csv")
+
+    status = commands.add_parser("status", help="stages, outputs and catalog from the last run's files (no mounts)")
+    status.add_argument("--stage-dir", default="./.hr_stages")
+    status.add_argument("--metrics", default=None, help="the --metrics textfile of the last run")
+    status.add_argument("--subject", default=None, help="also list this subject's recordings (e.g. sub8000)")
+
+    equivalence = commands.add_parser(
+        "equivalence", help="check alternative engines against the reference QC on random recordings (no mounts)",
+    )
+    equivalence.add_argument("--cases", type=int, default=200, help="recordings to generate")
+    equivalence.add_argument("--seed", type=int, default=0)
+    equivalence.add_argument("--candidates", type=lambda v: [s.strip() for s in v.split(",") if s.strip()], default=None,
+                             help="comma-separated (default: all of pyarrow,hr_store,sweep,process_many,chunked)")
+    equivalence.add_argument("--rtol", type=float, default=0.0, help="relative tolerance for float metrics (default exact)")
+    equivalence.add_argument("--atol", type=float, default=0.0, help="absolute tolerance for float metrics (default exact)")
+    equivalence.add_argument("--out", default="./equivalence_out.csv")
+
+    quicklook = commands.add_parser(
+        "quicklook", help="approximate zone metrics with error bounds for one subject or recording in under a second",
+    )
+    quick_where = quicklook.add_mutually_exclusive_group(required=True)
+    quick_where.add_argument("--system", choices=sorted(SYSTEMS))
+    quick_where.add_argument("--root", default=None, help="BOOST project directory")
+    quicklook.add_argument("target", help="a subject (sub8000 or 8000) or one recording's CSV path")
+    quicklook.add_argument("--week", type=int, default=None, help="only this week")
+    quicklook.add_argument("--session", default=None, help="only this session")
+    quicklook.add_argument("--step", type=int, default=10,
+                           help="read every Nth sample (default 10); 1 reads them all and only the last delta is a guess")
+    quicklook.add_argument("--zone-out", default="./zone_out.csv",
+                           help="exact values for sessions this (newer) zone_out.csv already has")
+    quicklook.add_argument("--json", action="store_true", help="print JSON rows instead of a table")
+
+    sweep = commands.add_parser("sweep", parents=[location, reading], help="zone metrics over a parameter grid")
+    sweep.add_argument("--cap-min", type=_int_list, default=None,
+                       help="comma-separated session caps in minutes (default 45)")
+    sweep.add_argument("--snap-to", type=_int_list, default=None,
+                       help="comma-separated midpoint_snap values (default 5)")
+    sweep.add_argument("--bounded-min", type=_int_list, default=None,
+                       help="comma-separated bounded bout targets in minutes (default: weekly plan)")
+    sweep.add_argument("--sweep-out", default="./sweep_out.csv")
+
+    merge = commands.add_parser("merge", parents=[location], help="combine --shard outputs")
+    merge.add_argument("--shards", type=int, required=True, help="number of shards to combine")
+
+    report = commands.add_parser("report", parents=[location, reading], help="per-subject HTML reports")
+    report.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    return parser
+
+
+def _status(args) -> int:
+    from util import status
+    catalog = "./recording_catalog.csv"
+    outputs = ["./qc_out.csv", "./zone_out.csv", "./adherence_cube.csv", catalog]
+    print(status.render(
+        status.stage_status(args.stage_dir, STAGES),
+        status.output_status(outputs),
+        catalog=status.catalog_summary(catalog, args.subject),
+        metrics=status.metrics_status(args.metrics),
+    ))
+    return 0
+
+
+def _export(args) -> int:
+    from plot.cube import AdherenceCube
+    if not os.path.isfile(args.cube):
+        print(f"No adherence cube at {args.cube}; run the pipeline first", file=sys.stderr)
+        return 1
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    print(AdherenceCube(args.cube).save_for_rust(args.out))
+    return 0
+
+
+def _equivalence(args) -> int:
+    from qc.equivalence import run_equivalence
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mismatches = run_equivalence(args.cases, args.seed, args.candidates, args.rtol, args.atol, args.out)
+    return 1 if len(mismatches) else 0
+
+
+def _quicklook(args) -> int:
+    from qc.quicklook import quick_look, render
+    from util.parse_path import parse_path
+    base = os.path.abspath(args.root if args.root is not None else SYSTEMS[args.system])
+    if os.path.isfile(args.target):
+        files = [os.path.abspath(args.target)]
+        subject = parse_path(files[0])["subject"]
     else:
-        raise ValueError("""First Argument does not exist.
-        The argument must be one of the following:
-        vosslnx = the vosslab linux machine used for automation
-        Argon = the Argon HPC
-        Home = My (Zak) personal linux machine mount
-        """)
+        subject = "sub" + args.target.lower().removeprefix("sub")
+        files = []
+        for group in ("Supervised", "Unsupervised"):
+            subject_dir = os.path.join(base, POLAR_DIR, group, subject)
+            if os.path.isdir(subject_dir):
+                files += sorted(
+                    os.path.join(subject_dir, f) for f in os.listdir(subject_dir)
+                    if f.lower().endswith(".csv") and not f.startswith(".")
+                )
+    metas = {f: parse_path(f) for f in files}
+    files = sorted(
+        (
+            f for f, meta in metas.items()
+            if (args.week is None or meta["week"] == args.week)
+            and (args.session is None or meta["session"] == args.session)
+        ),
+        key=lambda f: (metas[f]["group"] or "", metas[f]["week"] or 0, float(metas[f]["session"] or 0), f),
+    )
+    if subject is None or not files:
+        print(f"No recordings for {args.target}", file=sys.stderr)
+        return 1
+    from util.deadline import DeadlineReader
+    rows = quick_look(
+        files, os.path.join(base, ZONE_WORKBOOK), subject, step=args.step, zone_out=args.zone_out,
+        opener=DeadlineReader().open,
+    )
+    if args.json:
+        import json
+        print(json.dumps(rows, indent=1))
+    else:
+        print(render(rows))
+    return 0
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = _parser()
+    args = parser.parse_args(_legacy_argv(list(sys.argv[1:] if argv is None else argv)))
+
+    # answered from files in the working directory; no mounts, no logging setup
+    if args.command == "status":
+        return _status(args)
+    if args.command == "export":
+        return _export(args)
+    if args.command == "equivalence":
+        return _equivalence(args)
+    if args.command == "quicklook":
+        return _quicklook(args)
 
+    if args.system is None and args.root is None:
+        parser.error(f"{args.command} needs --system or --root")
+    location = {"system": args.system, "root": args.root, "mirror": args.mirror, "command": args.command}
 
+    if args.command == "sweep":
+        grid = {
+            key: value
+            for key, value in {
+                "cap_min": args.cap_min,
+                "snap_to": args.snap_to,
+                "bounded_min": args.bounded_min,
+            }.items()
+            if value
+        }
+        Main(
+            **location, engine=args.engine, hr_store=args.hr_store,
+            read_timeout=args.read_timeout, read_retries=args.read_retries, hedge_after=args.hedge_after,
+        ).sweep(grid, args.sweep_out)
+    elif args.command == "report":
+        Main(
+            **location, engine=args.engine, hr_store=args.hr_store,
+            read_timeout=args.read_timeout, read_retries=args.read_retries, hedge_after=args.hedge_after,
+        ).report(workers=args.workers)
+    elif args.command == "merge":
+        Main(**location).merge(args.shards)
+    else:
+        stages = PIPELINE_COMMANDS[args.command] or getattr(args, "stages", None)
+        if args.shard is not None and stages and "meta" in stages:
+            parser.error("meta is not computed per shard; run it after `merge`")
+        if args.chunk_rows is not None:
+            if args.chunk_rows < 1:
+                parser.error("--chunk-rows must be at least 1")
+            if args.hr_store or args.resample:
+                parser.error("--chunk-rows cannot be combined with --hr-store or --resample; both need the whole recording")
+        runner = Main(
+            **location,
+            engine=args.engine,
+            hr_store=args.hr_store,
+            metrics=args.metrics,
+            read_timeout=args.read_timeout,
+            read_retries=args.read_retries,
+            hedge_after=args.hedge_after,
+            shard=args.shard,
+            cache_dir=None if args.no_cache else "./.hr_cache",
+            stage_dir=None if args.no_cache else "./.hr_stages",
+            resample=args.resample,
+            stream=args.stream,
+            time_budget=args.time_budget,
+            chunk_rows=args.chunk_rows,
+        )
+        runner.metrics.set("startup_seconds", time.perf_counter() - _T0, "Process start until the pipeline was set up.")
+        finished = False
+        try:
+            runner.main(stages=stages, start=getattr(args, "start", None))
+            finished = True
+        finally:
+            # a failed run still reports run_success 0 and keeps the last success time
+            runner.write_metrics(finished)
+    return 0
 
 
-        
+if __name__ == '__main__':
+    sys.exit(cli())
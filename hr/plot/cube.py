@@ -0,0 +1,226 @@
+import os
+import pickle
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from util.parse_path import parse_path
+
+logger = logging.getLogger(__name__)
+
+# 30 planned sessions per group spread over 6 weeks
+SESSIONS_PER_WEEK = 5
+
+# kept in the session cache directory (Main.cache_dir)
+STATE_FILE = "cube_sessions.pkl"
+
+CUBE_KEYS = ["group", "subject", "week"]
+CUBE_COLUMNS = CUBE_KEYS + [
+    "files",
+    "sessions",
+    "expected_sessions",
+    "observed_prop",
+    "sessions_scored",
+    "mean_compliance",
+    "mean_mazd",
+    "bounded_met_rate",
+    "max_session",
+]
+
+
+class AdherenceCube:
+    """
+    Subject x week adherence table that is updated in place after each run.
+
+    A small state file remembers which recording fed which (group, subject,
+    week) cell and with what metrics. On update only the cells whose
+    recordings were added, removed or re-scored are recomputed; every other
+    row is carried over from the previous cube untouched, so nothing is
+    rescanned from disk or from zone_out.csv. A recording this run did not
+    get to (read timeout, time budget) keeps its previous contribution.
+    Without a state path (--no-cache) nothing is remembered: the cube is
+    rebuilt from this run's recordings alone.
+
+    Columns:
+      files             recordings with a parsable week, including skipped and
+                        schema-rejected ones (parts like _ses3.1 count separately)
+      sessions          distinct session numbers (parts folded into their session)
+      expected_sessions planned sessions for the week
+      observed_prop     sessions / expected_sessions
+      sessions_scored   recordings with zone metrics (not skipped)
+      mean_compliance   mean zone_compliance over scored recordings
+      mean_mazd         mean MAZD over scored recordings
+      bounded_met_rate  share of scored recordings with bounded_met
+      max_session       largest whole session number seen that week
+    """
+
+    def __init__(
+        self,
+        out_csv: str | os.PathLike = "./adherence_cube.csv",
+        state_path: str | os.PathLike | None = None,
+    ):
+        self.out_csv = Path(out_csv)
+        self.state_path = Path(state_path) if state_path is not None else None
+        self.cube = pd.DataFrame(columns=CUBE_COLUMNS)
+
+    def _load_state(self) -> dict[str, tuple]:
+        if self.state_path is None or not self.state_path.is_file() or not self.out_csv.is_file():
+            return {}
+        try:
+            with open(self.state_path, "rb") as fh:
+                return pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError) as exc:
+            logger.warning("Rebuilding adherence cube; unreadable state %s: %s", self.state_path, exc)
+            return {}
+
+    def _load_cells(self) -> dict[tuple, dict[str, Any]]:
+        if not self.out_csv.is_file():
+            return {}
+        df = pd.read_csv(
+            self.out_csv,
+            dtype={"group": str, "subject": str},
+            float_precision="round_trip",
+        )
+        return {
+            (row["group"], row["subject"], int(row["week"])): row
+            for row in df.to_dict("records")
+        }
+
+    def update(
+        self,
+        sessions: dict[str, tuple[str, dict | None]],
+        carried: dict[str, str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Bring the cube in line with this run's sessions.
+
+        Parameters
+        ----------
+        sessions : dict
+            { file_path: (subject, zone_metrics or None) } for every recording
+            with a parsable week seen in the run; None marks a skipped file.
+        carried : dict, optional
+            { file_path: subject } for recordings that exist but were not
+            scored this run. They keep their previous entry, or count as an
+            unscored file when they have none.
+        """
+        old = self._load_state()
+        new: dict[str, tuple] = {}
+        for file, (subject, metrics) in sessions.items():
+            meta = parse_path(str(file))
+            if meta["week"] is None:
+                continue
+            cell = (meta["group"], meta["subject"] or subject, meta["week"])
+            new[file] = (cell, meta["session"], metrics)
+        for file, subject in (carried or {}).items():
+            if file in old:
+                new[file] = old[file]
+                continue
+            meta = parse_path(str(file))
+            if meta["week"] is not None:
+                new[file] = ((meta["group"], meta["subject"] or subject, meta["week"]), meta["session"], None)
+
+        dirty = set()
+        for file in old.keys() | new.keys():
+            if old.get(file) != new.get(file):
+                if file in old:
+                    dirty.add(old[file][0])
+                if file in new:
+                    dirty.add(new[file][0])
+
+        # without state the previous cube's cells can't be checked against their recordings
+        cells = self._load_cells() if self.state_path is not None else {}
+        by_cell: dict[tuple, list] = {}
+        for cell, session, metrics in new.values():
+            if cell in dirty:
+                by_cell.setdefault(cell, []).append((session, metrics))
+        for cell in dirty:
+            if cell in by_cell:
+                cells[cell] = self._summarize(cell, by_cell[cell])
+            else:
+                cells.pop(cell, None)
+
+        self.cube = pd.DataFrame(list(cells.values()), columns=CUBE_COLUMNS)
+        if not self.cube.empty:
+            self.cube["week"] = pd.array(self.cube["week"], dtype="Int64")
+            self.cube["max_session"] = pd.array(self.cube["max_session"], dtype="Int64")
+            self.cube.sort_values(by=CUBE_KEYS, inplace=True, kind="mergesort")
+
+        self.out_csv.parent.mkdir(parents=True, exist_ok=True)
+        self.cube.to_csv(self.out_csv, index=False)
+        if self.state_path is not None:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(".tmp")
+            with open(tmp, "wb") as fh:
+                pickle.dump(new, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.state_path)
+        logger.info(
+            "Adherence cube written: %s (%d cells, %d updated)",
+            self.out_csv,
+            len(self.cube),
+            len(dirty),
+        )
+        return self.cube
+
+    @staticmethod
+    def _summarize(cell: tuple, entries: list[tuple[str, dict | None]]) -> dict[str, Any]:
+        group, subject, week = cell
+        session_ids = set()
+        whole_sessions = []
+        for session, _ in entries:
+            if session is None:
+                continue
+            session_ids.add(int(float(session)))
+            if session.isdigit():
+                whole_sessions.append(int(session))
+        scored = [m for _, m in entries if m is not None]
+        compliance = [m["zone_compliance"] for m in scored if m.get("zone_compliance") is not None]
+        mazd = [m["mazd"] for m in scored if m.get("mazd") is not None]
+        bounded = [bool(m["bounded_met"]) for m in scored if m.get("bounded_met") is not None]
+        return {
+            "group": group,
+            "subject": subject,
+            "week": week,
+            "files": len(entries),
+            "sessions": len(session_ids),
+            "expected_sessions": SESSIONS_PER_WEEK,
+            "observed_prop": len(session_ids) / SESSIONS_PER_WEEK,
+            "sessions_scored": len(scored),
+            "mean_compliance": sum(compliance) / len(compliance) if compliance else None,
+            "mean_mazd": sum(mazd) / len(mazd) if mazd else None,
+            "bounded_met_rate": sum(bounded) / len(bounded) if bounded else None,
+            "max_session": max(whole_sessions) if whole_sessions else None,
+        }
+
+    def save_for_rust(self, out_csv: str = "data.csv") -> str:
+        """
+        Same schema and rules as Get_Data.save_for_rust (sup_prop, unsup_prop,
+        unsup_den), answered from the cube instead of listing directories.
+
+        The counts follow the pipeline's file list rather than the directory
+        listing, so they differ from Get_Data in two places: a CSV without a
+        _wk## week has no cell and is not counted, and members of zip/tar
+        exports are counted.
+        """
+        cube = self.cube if not self.cube.empty else pd.read_csv(self.out_csv)
+        rows = []
+        for subject, sub in cube.groupby("subject", sort=True):
+            sup = sub[sub["group"] == "Supervised"]
+            unsup = sub[sub["group"] == "Unsupervised"]
+            sup_n = int(sup["files"].sum())
+            unsup_n = int(unsup["files"].sum())
+            if unsup_n < 6:
+                continue
+            sup_den = int(sup["max_session"].max()) if sup["max_session"].notna().any() else 0
+            unsup_den = int(unsup["max_session"].max()) if unsup["max_session"].notna().any() else 0
+            sup_den_eff = sup_den if sup_den > 0 else max(sup_n, 1)
+            unsup_den_eff = unsup_den if unsup_den > 0 else max(unsup_n, 1)
+            rows.append({
+                "sup_prop": sup_n / float(sup_den_eff),
+                "unsup_prop": unsup_n / float(unsup_den_eff),
+                "unsup_den": unsup_den,
+            })
+        pd.DataFrame(rows, columns=["sup_prop", "unsup_prop", "unsup_den"]).to_csv(out_csv, index=False)
+        return out_csv
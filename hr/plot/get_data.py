@@ -8,7 +8,11 @@ logger = logging.getLogger(__name__)
 
 _SES_RE = re.compile(r"_ses(\d+)\.csv$", re.IGNORECASE)
 
-def _max_session(dir_path: str) -> int:
+def _file_key(path: str) -> tuple:
+    """(group, subject, filename): matches a file across differently spelled roots."""
+    return tuple(os.path.normpath(path).split(os.sep)[-3:])
+
+def _max_session(dir_path: str, exclude: frozenset = frozenset()) -> int:
     """
     Scan a directory and return the largest session number from files
     named like '*_wkXX_sesNN.CSV'. Returns 0 if none found.
@@ -16,7 +20,8 @@ def _max_session(dir_path: str) -> int:
     try:
         return max(
             (int(m.group(1)) for fn in os.listdir(dir_path)
-             if (m := _SES_RE.search(fn)) is not None),
+             if (m := _SES_RE.search(fn)) is not None
+             and _file_key(os.path.join(dir_path, fn)) not in exclude),
             default=0,
         )
     except FileNotFoundError:
@@ -29,15 +34,17 @@ class Get_Data:
       - unsup_den = (# unsupervised CSVs actually observed; <= 30)
       - unsup_prop= (# unsupervised CSVs) / max(unsup_den, 1)
     Notes:
-      - We treat each *.csv file as a completed session.
+      - We treat each *.csv file as a completed session, except paths in
+        `exclude` (duplicate uploads found by util.fingerprint).
       - If you prefer unsupervised adherence out of 30 planned, add a column:
           unsup_prop_30 = unsup_n / 30.0
     """
 
-    def __init__(self, sup_path: str, unsup_path: str, study: str = "InterventionStudy"):
+    def __init__(self, sup_path: str, unsup_path: str, study: str = "InterventionStudy", exclude=None):
         self.sup_path = sup_path
         self.unsup_path = unsup_path
         self.study = study
+        self.exclude = frozenset(_file_key(p) for p in (exclude or ()))
         self.master = pd.DataFrame()
 
     @staticmethod
@@ -47,12 +54,12 @@ class Get_Data:
             if not d.startswith(".") and os.path.isdir(os.path.join(path, d))
         ]
 
-    @staticmethod
-    def _count_csvs(path: str) -> int:
+    def _count_csvs(self, path: str) -> int:
         try:
             return sum(
                 1 for f in os.listdir(path)
                 if f.lower().endswith(".csv") and not f.startswith(".")
+                and _file_key(os.path.join(path, f)) not in self.exclude
             )
         except FileNotFoundError:
             return 0
@@ -73,6 +80,7 @@ class Get_Data:
                 files = [
                     f for f in os.listdir(subject_path)
                     if f.lower().endswith(".csv") and not f.startswith(".")
+                    and _file_key(os.path.join(subject_path, f)) not in self.exclude
                 ]
 
                 # Session 30 present?
@@ -105,8 +113,8 @@ class Get_Data:
             unsup_n = self._count_csvs(unsup_dir)
 
             # Denominator = max session index observed in filenames
-            sup_den = _max_session(sup_dir)
-            unsup_den = _max_session(unsup_dir)
+            sup_den = _max_session(sup_dir, self.exclude)
+            unsup_den = _max_session(unsup_dir, self.exclude)
 
             logger.debug(
                 f"Subject {subj}: sup_n={sup_n}, sup_den={sup_den}, "
@@ -0,0 +1,253 @@
+import os
+import json
+import html
+import hashlib
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes so every subject is re-rendered
+REPORT_VERSION = 1
+MANIFEST = ".manifest.json"
+
+# Traces are decimated to at most this many points per session
+MAX_POINTS = 800
+WIDTH, HEIGHT = 720, 170
+MARGIN = {"top": 10, "right": 10, "bottom": 24, "left": 40}
+ZONE_COLORS = {1: "#dbeafe", 2: "#dcfce7", 3: "#fef9c3", 4: "#ffedd5", 5: "#fee2e2"}
+
+
+def report_key(job: dict[str, Any]) -> str:
+    """
+    Hash of everything a subject's report is drawn from: each session's
+    fingerprint (path, size, mtime) and metrics plus the subject's zone row.
+    """
+    payload = {
+        "version": REPORT_VERSION,
+        "zone_hash": job["zone_hash"],
+        "sessions": [
+            [s["file"], s["stat"], s["group"], s["week"], s["session"], s["metrics"]]
+            for s in job["sessions"]
+        ],
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()
+
+
+def _trace_svg(hr: pd.DataFrame, zones: dict[int, tuple[int, int]], allowed: list[int]) -> str:
+    """Inline SVG of one session's HR trace over its zone bands."""
+    times = hr["time"].reset_index(drop=True)
+    # same day-rollover handling as recording_window
+    day_offsets = (times.diff() < pd.Timedelta(0)).cumsum()
+    adjusted = times + pd.to_timedelta(day_offsets, unit="D")
+    minutes = ((adjusted - adjusted.iloc[0]).dt.total_seconds() / 60).to_numpy()
+    values = hr["hr"].to_numpy(dtype=float)
+    stride = max(1, int(np.ceil(len(values) / MAX_POINTS)))
+    minutes, values = minutes[::stride], values[::stride]
+
+    lo = min([b[0] for b in zones.values()] + [np.nanmin(values) if np.isfinite(values).any() else 0]) - 5
+    hi = max([b[1] for b in zones.values()] + [np.nanmax(values) if np.isfinite(values).any() else 0]) + 5
+    span = max(minutes[-1], 1.0) if len(minutes) else 1.0
+    inner_w = WIDTH - MARGIN["left"] - MARGIN["right"]
+    inner_h = HEIGHT - MARGIN["top"] - MARGIN["bottom"]
+
+    def sx(m):
+        return MARGIN["left"] + m / span * inner_w
+
+    def sy(v):
+        return MARGIN["top"] + (hi - v) / (hi - lo) * inner_h
+
+    parts = [f'<svg width="{WIDTH}" height="{HEIGHT}" role="img">']
+    for z, (start, end) in zones.items():
+        opacity = 1.0 if z in allowed else 0.35
+        parts.append(
+            f'<rect x="{MARGIN["left"]}" y="{sy(end):.1f}" width="{inner_w}" '
+            f'height="{max(sy(start) - sy(end), 1):.1f}" fill="{ZONE_COLORS.get(z, "#eee")}" '
+            f'opacity="{opacity}"><title>Zone {z}: {start}-{end} bpm</title></rect>'
+        )
+    # NaN samples break the line instead of being interpolated over
+    segment = []
+    for m, v in zip(minutes, values):
+        if np.isnan(v):
+            if len(segment) > 1:
+                parts.append(f'<polyline fill="none" stroke="#1e40af" stroke-width="1" points="{" ".join(segment)}"/>')
+            segment = []
+            continue
+        segment.append(f"{sx(m):.1f},{sy(v):.1f}")
+    if len(segment) > 1:
+        parts.append(f'<polyline fill="none" stroke="#1e40af" stroke-width="1" points="{" ".join(segment)}"/>')
+    for tick in range(0, int(span) + 1, 10):
+        parts.append(
+            f'<text x="{sx(tick):.1f}" y="{HEIGHT - 8}" font-size="10" text-anchor="middle">{tick}m</text>'
+        )
+    for bpm in (lo + 5, hi - 5):
+        parts.append(f'<text x="{MARGIN["left"] - 4}" y="{sy(bpm) + 3:.1f}" font-size="10" text-anchor="end">{int(bpm)}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _weekly_table(sessions: list[dict[str, Any]]) -> str:
+    rows = [
+        {"group": s["group"], "week": s["week"], **s["metrics"]}
+        for s in sessions
+        if s["metrics"] is not None
+    ]
+    if not rows:
+        return "<p>No scored sessions.</p>"
+    df = pd.DataFrame(rows)
+    total = df["time_in_allowed_s"] + df["time_above_s"] + df["time_below_s"]
+    df["compliance"] = (df["time_in_allowed_s"] / total).where(total > 0)
+    df["bounded_met"] = df["bounded_met"].astype(float)
+    weekly = (
+        df.groupby(["group", "week"], sort=True)
+        .agg(
+            sessions=("week", "size"),
+            in_zone_min=("time_in_allowed_s", "mean"),
+            above_min=("time_above_s", "mean"),
+            below_min=("time_below_s", "mean"),
+            compliance=("compliance", "mean"),
+            bounded_met_rate=("bounded_met", "mean"),
+            mazd=("mazd", "mean"),
+        )
+        .reset_index()
+    )
+    for col in ["in_zone_min", "above_min", "below_min"]:
+        weekly[col] = weekly[col] / 60
+    return weekly.to_html(index=False, float_format=lambda v: f"{v:.2f}", na_rep="", border=0)
+
+
+def render_subject(job: dict[str, Any], out_path: str) -> tuple[str, int]:
+    """
+    Render one subject's report to `out_path`; returns the path and how
+    many sessions could not be read (shown as such on the page). Runs
+    inside a worker process, so it only takes plain data and imports what
+    it needs.
+    """
+    from util.deadline import DeadlineReader
+    from util.hr.extract_hr import extract_hr
+    from qc.zone.zone_qc import SUPERVISED_PLAN, UNSUPERVISED_PLAN
+
+    zones = {int(z): tuple(b) for z, b in job["zones"].items()}
+    subject = html.escape(job["subject"])
+    body = [
+        f"<h1>{subject}</h1>",
+        "<h2>Weekly metrics</h2>",
+        _weekly_table(job["sessions"]),
+        "<h2>Sessions</h2>",
+    ]
+    reader = DeadlineReader(**job.get("read", {}))
+    unread = 0
+    store = None
+    if job.get("hr_store"):
+        from util.hr.store import HRStore
+        store = HRStore(job["hr_store"])
+    for s in job["sessions"]:
+        plans = SUPERVISED_PLAN if s["group"] == "Supervised" else UNSUPERVISED_PLAN
+        allowed = plans.get(s["week"], {}).get("zones", [])
+        title = html.escape(f"{s['group']} week {s['week']} session {s['session']}")
+        hr = None
+        try:
+            if store is not None:
+                # memory-mapped samples from the last run, no CSV parse
+                hr, _ = store.load(job["subject"], s["file"], s["stat"])
+            if hr is None:
+                hr, _ = extract_hr(s["file"], engine=job.get("engine", "pandas"), opener=reader.open)
+        except Exception as e:
+            # one bad recording must not cost the subject its whole report
+            logger.warning("Could not read %s for the report: %s", s["file"], e)
+            body.append(f"<h3>{title}</h3><p>Could not read this recording.</p>")
+            unread += 1
+            continue
+        if hr is None or hr.empty:
+            body.append(f"<h3>{title}</h3><p>No HR data.</p>")
+            continue
+        note = "" if s["metrics"] is not None else " (not scored)"
+        body.append(f"<h3>{title}{note}</h3>")
+        body.append(_trace_svg(hr, zones, allowed))
+
+    page = (
+        "<!doctype html>\n<meta charset=\"utf-8\">\n"
+        f"<title>{subject} HR report</title>\n"
+        "<style>body{font-family:sans-serif} td,th{padding:2px 8px;text-align:right}</style>\n"
+        "<body>\n" + "\n".join(body) + "\n</body>\n"
+    )
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(page)
+    os.replace(tmp, out_path)
+    return out_path, unread
+
+
+def build_reports(
+    jobs: list[dict[str, Any]],
+    out_dir: str | os.PathLike = "./reports",
+    workers: int | None = None,
+) -> list[str]:
+    """
+    Render every subject whose inputs changed since the last run.
+
+    Parameters
+    ----------
+    jobs : list of dict
+        One per subject: subject, zones ({zone: (start, end)}), zone_hash,
+        engine (extract_hr backend), hr_store (HRStore root or None), read
+        (DeadlineReader arguments) and sessions (file, stat, group, week,
+        session, metrics).
+    out_dir : str | PathLike
+        Reports go to `<out_dir>/<subject>.html`; the manifest of input
+        hashes lives next to them.
+    workers : int | None
+        Process pool size (None = os.cpu_count()).
+
+    Returns
+    -------
+    list[str]
+        Paths of the reports rendered in this call.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST
+    manifest = {}
+    if manifest_path.is_file():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    todo = []
+    for job in jobs:
+        key = report_key(job)
+        out_path = out_dir / f"{job['subject']}.html"
+        if manifest.get(job["subject"]) == key and out_path.is_file():
+            continue
+        todo.append((job, str(out_path), key))
+    logger.info("Reports: %d to render, %d up to date", len(todo), len(jobs) - len(todo))
+
+    rendered = []
+    if todo:
+        from util.runlog import worker_options
+        with ProcessPoolExecutor(max_workers=workers, **worker_options()) as pool:
+            futures = {pool.submit(render_subject, job, path): (job, key) for job, path, key in todo}
+            for future in as_completed(futures):
+                job, key = futures[future]
+                try:
+                    path, unread = future.result()
+                except Exception:
+                    # leave the old key so the subject is retried next run
+                    logger.exception("Report failed for %s", job["subject"])
+                    continue
+                rendered.append(path)
+                if unread:
+                    # the page is written, but a read failure may not happen again: re-render next run
+                    logger.warning("Report for %s is missing %d unread session(s); it is re-rendered next run", job["subject"], unread)
+                    manifest.pop(job["subject"], None)
+                    continue
+                manifest[job["subject"]] = key
+
+    tmp = manifest_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    return rendered
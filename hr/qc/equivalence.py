@@ -0,0 +1,423 @@
+import os
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from qc.zone.zone_qc import SUPERVISED_PLAN, UNSUPERVISED_PLAN
+from util.zone.midpoint import midpoint_snap
+
+log = logging.getLogger(__name__)
+
+ZONE_METRICS = [
+    "time_in_allowed_s",
+    "time_above_s",
+    "time_below_s",
+    "longest_bounded_bout_s",
+    "bounded_met",
+    "zone_compliance",
+    "mazd",
+]
+
+# Edge cases a generated recording can carry; case i < len(FEATURES) is
+# guaranteed to have FEATURES[i], the rest draw each with FEATURE_P
+FEATURES = ("nan_runs", "gaps", "rollover", "hour24", "boundaries", "jitter", "repeats", "long")
+FEATURE_P = 0.35
+
+EQUIVALENCE_PATH = "./equivalence_out.csv"
+MISMATCH_COLUMNS = ["case", "candidate", "check", "reference", "candidate_value", "diff", "features"]
+
+# Candidate name -> callable(cases) -> {case name: outcome}. An outcome is a
+# dict with any of "frame" (extract_hr's frame), "skipped", "errors"
+# ({code: [message, details]}) and "metrics" (QC_Zone's dict); only the keys
+# a candidate returns are compared against the reference. {"fallback": True}
+# marks a case the candidate handed to another path; it is counted apart
+# and not compared.
+CANDIDATES: dict[str, Callable[[list[dict]], dict[str, dict]]] = {}
+
+
+def register(name: str):
+    """Decorator adding an alternative engine or batch path to the harness."""
+    def wrap(fn):
+        CANDIDATES[name] = fn
+        return fn
+    return wrap
+
+
+def _zones(rng: np.random.Generator) -> pd.DataFrame:
+    """Unsnapped zone row like raw_zones returns (gaps between zones, odd midpoints)."""
+    start = int(rng.integers(85, 115))
+    row = {"boost_id": 0}
+    for i in range(1, 6):
+        end = start + int(rng.integers(8, 20))
+        row[f"z{i}_start"], row[f"z{i}_end"] = start, end
+        start = end + int(rng.integers(1, 5))
+    return pd.DataFrame([row])
+
+
+def _clock(seconds: np.ndarray, hour24: bool) -> list[str]:
+    """HH:MM:SS of seconds since midnight; past midnight either wraps or keeps counting (24:00:05)."""
+    out = []
+    for s in seconds.astype(np.int64):
+        h, rem = divmod(int(s), 3600)
+        if not hour24:
+            h %= 24
+        out.append(f"{h:02d}:{rem // 60:02d}:{rem % 60:02d}")
+    return out
+
+
+def make_case(rng: np.random.Generator, index: int) -> dict[str, Any]:
+    """
+    One randomized Polar recording with its zones, week and group.
+
+    Returns name, group, week, session, features, zones (unsnapped row),
+    snapped (midpoint_snap, what QC sees) and text (the CSV).
+    """
+    features = {f for f in FEATURES if rng.random() < FEATURE_P}
+    if index < len(FEATURES):
+        features.add(FEATURES[index])
+    if "hour24" in features:
+        features.add("rollover")
+    group = "Supervised" if rng.random() < 0.5 else "Unsupervised"
+    week = int(rng.choice(list(SUPERVISED_PLAN if group == "Supervised" else UNSUPERVISED_PLAN)))
+    zones = _zones(rng)
+    snapped = midpoint_snap(zones.drop(columns="boost_id"), snap_to=5)
+
+    n = int(rng.integers(1800, 3600 if "long" not in features else 5 * 3600))
+    steps = np.ones(n - 1)
+    if "jitter" in features:
+        steps = rng.choice([1.0, 1.0, 1.0, 2.0, 3.0], size=n - 1)
+    if "gaps" in features:
+        for at in rng.integers(0, n - 1, size=int(rng.integers(1, 4))):
+            steps[at] += float(rng.integers(31, 300))
+    if "repeats" in features:
+        steps[rng.integers(0, n - 1, size=int(rng.integers(1, 6)))] = 0.0
+    if "rollover" in features:
+        start = 24 * 3600 - float(rng.integers(60, 1800))
+    else:
+        start = float(rng.integers(6 * 3600, 20 * 3600))
+    seconds = start + np.concatenate(([0.0], np.cumsum(steps)))
+    times = _clock(seconds, "hour24" in features)
+
+    hr = np.clip(np.cumsum(rng.normal(0, 1.5, n)) + rng.integers(100, 160), 60, 210).round()
+    if "boundaries" in features:
+        edges = np.array([snapped[c].iat[0] for c in snapped.columns], dtype=float)
+        edges = np.concatenate((edges, edges - 1, edges + 1))
+        pick = rng.random(n) < 0.3
+        hr[pick] = rng.choice(edges, size=int(pick.sum()))
+    cells = [str(int(h)) for h in hr]
+    if "nan_runs" in features:
+        for at in rng.integers(0, n, size=int(rng.integers(1, 4))):
+            length = int(rng.integers(5, 90))
+            cells[at:at + length] = [""] * len(cells[at:at + length])
+
+    duration = int(seconds[-1] - seconds[0])
+    lines = [
+        "Name,Sport,Date,Start time,Duration,Total distance (km),Average heart rate (bpm)",
+        f"Equivalence,RUNNING,01-02-2025,{times[0]},{duration // 3600:02d}:{duration % 3600 // 60:02d}:{duration % 60:02d},,130",
+        "Sample rate,Time,HR (bpm),Speed (km/h)",
+    ]
+    lines.extend(f"1,{t},{h}," for t, h in zip(times, cells))
+    session = index + 1
+    return {
+        "name": f"sub9{index:03d}_wk{week:02d}_ses{session:02d}",
+        "group": group,
+        "week": week,
+        "session": str(session),
+        "features": sorted(features),
+        "zones": zones,
+        "snapped": snapped,
+        "text": "\n".join(lines) + "\n",
+    }
+
+
+def write_cases(cases: list[dict], root: str | os.PathLike) -> None:
+    """Write each case as <group>/<subject>/<name>.csv under `root` and set case["path"]."""
+    for case in cases:
+        subject = case["name"].split("_")[0]
+        path = Path(root) / case["group"] / subject / f"{case['name']}.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(case["text"], encoding="utf-8")
+        case["path"] = str(path)
+
+
+def reference(cases: list[dict]) -> dict[str, dict]:
+    """
+    The baseline pipeline frozen in qc/baseline.py (pandas read, the legacy
+    gap/NaN checks and QC_Zone), independent of everything being tested.
+    """
+    from qc import baseline
+
+    out = {}
+    for case in cases:
+        hr = baseline.extract_hr(case["path"], case["week"])
+        skipped, err, metrics = baseline.score(hr, case["snapped"], case["week"], case["group"])
+        out[case["name"]] = {"frame": hr, "skipped": skipped, "errors": err, "metrics": metrics}
+    return out
+
+
+def _engine(name: str) -> Callable[[list[dict]], dict[str, dict]]:
+    def run(cases):
+        from util.hr.extract_hr import extract_hr, resolve_engine
+        from api import score_hr
+
+        if resolve_engine(name) != name:
+            return {}
+        out = {}
+        for case in cases:
+            hr, week = extract_hr(case["path"], engine=name)
+            skipped, err, metrics = score_hr(hr, week, case["snapped"], case["group"])
+            out[case["name"]] = {"frame": hr, "skipped": skipped, "errors": err, "metrics": metrics}
+        return out
+    return run
+
+
+register("pyarrow")(_engine("pyarrow"))
+
+
+@register("hr_store")
+def _hr_store(cases):
+    """Round trip through the columnar store, then the same QC."""
+    from util.hr.extract_hr import extract_hr
+    from util.hr.store import HRStore
+    from api import score_hr
+
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HRStore(tmp)
+        for case in cases:
+            hr, week = extract_hr(case["path"])
+            subject = case["name"].split("_")[0]
+            store.add(subject, case["path"], (0, 0), hr, week, case["group"], case["session"])
+            hr, week = store.load(subject, case["path"])
+            skipped, err, metrics = score_hr(hr, week, case["snapped"], case["group"])
+            out[case["name"]] = {"frame": hr, "skipped": skipped, "errors": err, "metrics": metrics}
+    return out
+
+
+@register("sweep")
+def _sweep(cases):
+    """SessionTimeline (qc/zone/sweep.py) at the default grid; metrics only."""
+    from util.hr.extract_hr import extract_hr
+    from qc.rules import SessionScan, evaluate, skips_file
+    from qc.zone.sweep import sweep_session
+
+    out = {}
+    for case in cases:
+        hr, week = extract_hr(case["path"])
+        if skips_file(evaluate(SessionScan(hr), "file")):
+            continue
+        rows = sweep_session(hr, case["zones"].drop(columns="boost_id"), week, case["group"])
+        metrics = {row["metric"]: row["value"] for row in rows} or None
+        if metrics is not None:
+            metrics["bounded_met"] = bool(metrics["bounded_met"])
+        out[case["name"]] = {"metrics": metrics}
+    return out
+
+
+@register("process_many")
+def _process_many(cases, workers: int = 2):
+    """The library's batch path (process pool, completion order)."""
+    from api import process_many
+
+    by_path = {case["path"]: case for case in cases}
+    zones = {case["name"].split("_")[0]: case["snapped"] for case in cases}
+    out = {}
+    for result in process_many(list(by_path), zones, workers=workers):
+        case = by_path[result.path]
+        out[case["name"]] = {
+            "skipped": result.skipped,
+            "errors": result.err_dict(),
+            "metrics": result.zone_metrics,
+        }
+    return out
+
+
+@register("chunked")
+def _chunked(cases, chunk_rows: int = 257):
+    """qc/online.py's kernels over iter_hr_chunks; recordings they hand back are fallbacks."""
+    from qc.online import UnorderedRecording, score_file
+
+    out = {}
+    for case in cases:
+        try:
+            skipped, err, metrics = score_file(case["path"], chunk_rows, case["week"], case["snapped"], case["group"])
+        except UnorderedRecording:
+            out[case["name"]] = {"fallback": True}
+            continue
+        out[case["name"]] = {"skipped": skipped, "errors": err, "metrics": metrics}
+    return out
+
+
+def _same(a, b, rtol: float, atol: float) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, (bool, np.bool_)) or isinstance(b, (bool, np.bool_)):
+        return bool(a) == bool(b)
+    a, b = float(a), float(b)
+    if np.isnan(a) or np.isnan(b):
+        return np.isnan(a) and np.isnan(b)
+    return abs(a - b) <= atol + rtol * abs(a)
+
+
+def _frame_checks(ref: pd.DataFrame | None, got: pd.DataFrame | None) -> list[tuple[str, Any, Any, Any]]:
+    if ref is None or got is None:
+        return [] if ref is None and got is None else [("frame", ref is not None, got is not None, None)]
+    if len(ref) != len(got):
+        return [("frame.rows", len(ref), len(got), len(got) - len(ref))]
+    out = []
+    for col in ("time", "hr"):
+        if ref[col].dtype != got[col].dtype:
+            out.append((f"frame.{col}.dtype", str(ref[col].dtype), str(got[col].dtype), None))
+        a, b = ref[col].to_numpy(), got[col].to_numpy()
+        equal = (a == b) | (pd.isna(a) & pd.isna(b))
+        if not equal.all():
+            i = int(np.flatnonzero(~equal)[0])
+            out.append((f"frame.{col}[{i}]", a[i], b[i], f"{int((~equal).sum())} rows differ"))
+    return out
+
+
+def _error_checks(ref: dict, got: dict) -> list[tuple[str, Any, Any, Any]]:
+    out = []
+    for code in sorted(set(ref) | set(got)):
+        if code not in ref or code not in got:
+            out.append((f"errors.{code}", code in ref, code in got, None))
+            continue
+        (ref_msg, ref_details), (got_msg, got_details) = ref[code][:2], got[code][:2]
+        if ref_msg != got_msg:
+            out.append((f"errors.{code}.message", ref_msg, got_msg, None))
+        if (ref_details is None) != (got_details is None) or (
+            ref_details is not None and not _details(code, ref_details).equals(_details(code, got_details))
+        ):
+            out.append((f"errors.{code}.details", _rows(ref_details), _rows(got_details), None))
+    return out
+
+
+def _details(code: str, details: pd.DataFrame) -> pd.DataFrame:
+    """An error's details as qc_out.csv sees them (save_qc's columns, ns times)."""
+    from qc.save_qc import _norm_df
+    df = _norm_df(code, details).reset_index(drop=True)
+    for col in ("start_time", "end_time"):
+        df[col] = df[col].astype("datetime64[ns]")
+    df["duration_s"] = df["duration_s"].astype(float)
+    df["length"] = df["length"].astype("Float64")
+    return df
+
+
+def _rows(details: pd.DataFrame | None) -> int | None:
+    return None if details is None else len(details)
+
+
+def compare(ref: dict, got: dict, rtol: float = 0.0, atol: float = 0.0) -> list[tuple[str, Any, Any, Any]]:
+    """(check, reference, candidate, diff) for every disagreement in the keys `got` has."""
+    out = []
+    if "frame" in got:
+        out.extend(_frame_checks(ref["frame"], got["frame"]))
+    if "skipped" in got and got["skipped"] != ref["skipped"]:
+        out.append(("skipped", ref["skipped"], got["skipped"], None))
+    if "errors" in got:
+        out.extend(_error_checks(ref["errors"], got["errors"]))
+    if "metrics" in got:
+        ref_m, got_m = ref["metrics"], got["metrics"]
+        if (ref_m is None) != (got_m is None):
+            out.append(("metrics", ref_m is not None, got_m is not None, None))
+        elif ref_m is not None:
+            for name in ZONE_METRICS:
+                a, b = ref_m.get(name), got_m.get(name)
+                if not _same(a, b, rtol, atol):
+                    diff = None
+                    if isinstance(a, float) and isinstance(b, float):
+                        diff = b - a
+                    out.append((f"metrics.{name}", a, b, diff))
+    return out
+
+
+def run_equivalence(
+    cases: int = 200,
+    seed: int = 0,
+    candidates: list[str] | None = None,
+    rtol: float = 0.0,
+    atol: float = 0.0,
+    out_csv: str | os.PathLike = EQUIVALENCE_PATH,
+    keep_dir: str | os.PathLike | None = "./equivalence_cases",
+) -> pd.DataFrame:
+    """
+    Generate `cases` recordings from `seed`, run them through the reference
+    and every candidate, and write one row per disagreement to `out_csv`.
+
+    Tolerances default to exact equality (|a - b| <= atol + rtol * |a|
+    for float metrics; frames, flags and QC messages are always exact).
+    Recordings behind a mismatch are copied to `keep_dir` for reproduction.
+    Returns the mismatch table (empty when every candidate agrees).
+    """
+    candidates = list(CANDIDATES) if candidates is None else candidates
+    unknown = [name for name in candidates if name not in CANDIDATES]
+    if unknown:
+        raise ValueError(f"Unknown candidate(s): {', '.join(unknown)} (choose from {', '.join(CANDIDATES)})")
+
+    rng = np.random.default_rng(seed)
+    generated = [make_case(rng, i) for i in range(cases)]
+    # every hour24 case would log extract_hr's normalization warning once per candidate
+    parse_log = logging.getLogger("util.hr.extract_hr")
+    level = parse_log.level
+    parse_log.setLevel(logging.ERROR)
+    try:
+        rows = _run(generated, candidates, rtol, atol, keep_dir)
+    finally:
+        parse_log.setLevel(level)
+
+    df_out = pd.DataFrame(rows, columns=MISMATCH_COLUMNS)
+    out_csv = Path(out_csv)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    df_out.to_csv(out_csv, index=False)
+    log.info("Equivalence report written: %s (%d rows)", out_csv, len(df_out))
+    return df_out
+
+
+def _run(generated, candidates, rtol, atol, keep_dir) -> list[dict]:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        write_cases(generated, tmp)
+        ref = reference(generated)
+        features = {case["name"]: ",".join(case["features"]) for case in generated}
+        for name in candidates:
+            results = CANDIDATES[name](generated)
+            if not results:
+                log.warning("Candidate %s produced no results (not installed?); skipped", name)
+                continue
+            bad = fallbacks = 0
+            for case in generated:
+                got = results.get(case["name"])
+                if got is None:
+                    continue
+                if got.get("fallback"):
+                    fallbacks += 1
+                    continue
+                found = compare(ref[case["name"]], got, rtol, atol)
+                bad += bool(found)
+                for check, a, b, diff in found:
+                    rows.append({
+                        "case": case["name"], "candidate": name, "check": check,
+                        "reference": a, "candidate_value": b, "diff": diff,
+                        "features": features[case["name"]],
+                    })
+            log.info(
+                "Candidate %s: %d/%d cases compared, %d disagree%s",
+                name, len(results) - fallbacks, len(generated), bad,
+                f", {fallbacks} fell back to another path (not compared)" if fallbacks else "",
+            )
+
+        mismatched = {row["case"] for row in rows}
+        if mismatched and keep_dir:
+            for case in generated:
+                if case["name"] in mismatched:
+                    dest = Path(keep_dir) / Path(case["path"]).relative_to(tmp)
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(case["path"], dest)
+                    case["zones"].to_csv(dest.with_suffix(".zones.csv"), index=False)
+            log.warning("Recordings behind %d mismatching case(s) kept in %s", len(mismatched), keep_dir)
+    return rows
@@ -0,0 +1,182 @@
+import logging
+from pathlib import Path
+import os
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from qc.rules import RULES, SessionScan, evaluate
+from qc.zone.zone_qc import QC_Zone, SESSION_CAP_MIN, SUPERVISED_PLAN, UNSUPERVISED_PLAN
+from qc.zone.sweep import zone_classes
+from util.hr.preproc import Grid1Hz, resample_1hz
+
+logger = logging.getLogger(__name__)
+
+DRIFT_METRICS = [
+    "missing_count",
+    "missing_s",
+    "nan_run_count",
+    "time_in_allowed_s",
+    "time_above_s",
+    "time_below_s",
+    "longest_bounded_bout_s",
+    "zone_compliance",
+    "mazd",
+]
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(start, end_exclusive) index pairs of the True runs in `mask`."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def grid_missing_periods(grid: Grid1Hz, max_gap_s: float) -> pd.DataFrame:
+    """
+    Gaps of more than `max_gap_s` between consecutive usable seconds
+    (gap_start, gap_end, duration), the grid's version of the "missing" rule.
+    """
+    idx = np.flatnonzero(~grid.missing)
+    step = np.diff(idx)
+    gaps = step > max_gap_s
+    return pd.DataFrame({
+        "gap_start": grid.time_at(idx[:-1][gaps]),
+        "gap_end": grid.time_at(idx[1:][gaps]),
+        "duration": pd.to_timedelta(step[gaps], unit="s"),
+    })
+
+
+def grid_nan_runs(grid: Grid1Hz, min_run: float) -> pd.DataFrame:
+    """
+    Runs of more than `min_run` recorded-but-blank seconds, in the shape of
+    the "nan" rule's details (start_time, end_time, duration, length).
+    """
+    starts, ends = _runs(grid.observed & np.isnan(grid.hr))
+    keep = (ends - starts) > min_run
+    starts, ends = starts[keep], ends[keep]
+    return pd.DataFrame({
+        "start_time": grid.time_at(starts),
+        "end_time": grid.time_at(ends - 1),
+        "duration": pd.to_timedelta(ends - 1 - starts, unit="s"),
+        "length": ends - starts,
+    })
+
+
+def grid_zone_metrics(
+    grid: Grid1Hz,
+    zones: pd.DataFrame,
+    week: int,
+    session_type: str,
+    cap_min: int = SESSION_CAP_MIN,
+) -> dict[str, Any] | None:
+    """
+    Zone metrics on the 1 Hz grid: every usable second counts one second,
+    missing seconds count nowhere and break bounded bouts. Supervised
+    sessions are cut to the first `cap_min` minutes, unsupervised MAZD is
+    windowed to them, as in QC_Zone.
+    """
+    supervised = session_type.lower().startswith("super")
+    plan = (SUPERVISED_PLAN if supervised else UNSUPERVISED_PLAN).get(int(week))
+    if plan is None or grid is None:
+        return None
+    cap = cap_min * 60
+    hr = grid.hr[:cap] if supervised else grid.hr
+    classes = zone_classes(hr, zones, plan["zones"])
+    if classes is None:
+        return None
+    usable = ~np.isnan(hr)
+
+    time_in = float(np.count_nonzero(classes["in_allowed"] & usable))
+    time_above = float(np.count_nonzero(classes["above"] & usable))
+    time_below = float(np.count_nonzero(classes["below"] & usable))
+    starts, ends = _runs(classes["good"])
+    longest = float((ends - starts).max()) if len(starts) else 0.0
+
+    window = classes["valid"][:cap]
+    mazd = float(classes["deviation"][:cap][window].mean()) if window.any() else None
+    total = time_in + time_above + time_below
+    return {
+        "week": int(week),
+        "time_in_allowed_s": time_in,
+        "time_above_s": time_above,
+        "time_below_s": time_below,
+        "longest_bounded_bout_s": longest,
+        "bounded_met": bool(longest >= plan["bounded_min"] * 60),
+        "zone_compliance": time_in / total if total > 0 else None,
+        "mazd": mazd,
+    }
+
+
+def grid_drift(hr: pd.DataFrame, zones: pd.DataFrame, week: int, session_type: str) -> list[dict[str, Any]]:
+    """
+    Compare the irregular-delta QC (the registered rules / QC_Zone) with the
+    1 Hz grid for one recording. Returns one row per metric: metric,
+    irregular, grid, diff.
+    """
+    grid = resample_1hz(hr)
+    if grid is None:
+        return []
+
+    scan = SessionScan(hr)
+    err = evaluate(scan, "session")
+    missing = err["missing"][1] if "missing" in err else pd.DataFrame(columns=["duration"])
+    # counted whether or not "missing" silences it in qc_out, like grid_nan_runs
+    nan_runs = scan.details(RULES["nan"])
+    if nan_runs is None:
+        nan_runs = pd.DataFrame(columns=["duration"])
+    zone_qc = QC_Zone(hr, zones, week)
+    if session_type.lower().startswith("super"):
+        ref = zone_qc.supervised()
+    else:
+        ref = zone_qc.unsupervised()
+
+    # the registered thresholds, so an edited rule moves both sides of the comparison
+    grid_missing = grid_missing_periods(grid, RULES["missing"].threshold)
+    values = {
+        "missing_count": (len(missing), len(grid_missing)),
+        "missing_s": (
+            missing["duration"].dt.total_seconds().sum() if not missing.empty else 0.0,
+            grid_missing["duration"].dt.total_seconds().sum() if not grid_missing.empty else 0.0,
+        ),
+        "nan_run_count": (len(nan_runs), len(grid_nan_runs(grid, RULES["nan"].threshold))),
+    }
+    metrics = grid_zone_metrics(grid, zones, week, session_type)
+    if ref is not None and metrics is not None:
+        for name in DRIFT_METRICS[3:]:
+            values[name] = (ref.get(name), metrics.get(name))
+
+    rows = []
+    for name in DRIFT_METRICS:
+        if name not in values:
+            continue
+        irregular, gridded = values[name]
+        diff = None
+        if irregular is not None and gridded is not None:
+            diff = float(gridded) - float(irregular)
+        rows.append({"metric": name, "irregular": irregular, "grid": gridded, "diff": diff})
+    return rows
+
+
+def save_drift(rows: list[dict[str, Any]], out_csv: str | os.PathLike) -> pd.DataFrame:
+    """
+    Write per-session drift rows and log the mean absolute drift per metric.
+    Columns: group, subject, week, session, metric, irregular, grid, diff.
+    """
+    df_out = pd.DataFrame(rows, columns=[
+        "group", "subject", "week", "session", "metric", "irregular", "grid", "diff",
+    ])
+    if not df_out.empty:
+        df_out["week"] = pd.array(df_out["week"], dtype="Int64")
+        for col in ["irregular", "grid", "diff"]:
+            df_out[col] = pd.to_numeric(df_out[col], errors="coerce")
+        df_out.sort_values(by=["group", "subject", "week", "session", "metric"], inplace=True, kind="mergesort")
+        summary = df_out.assign(abs_diff=df_out["diff"].abs()).groupby("metric")["abs_diff"].mean()
+        for metric, value in summary.items():
+            logger.info("1 Hz grid drift: mean |%s| = %.4f", metric, value)
+
+    out_csv = Path(out_csv)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    df_out.to_csv(out_csv, index=False)
+    logger.info("Resample drift written: %s (%d rows)", out_csv, len(df_out))
+    return df_out
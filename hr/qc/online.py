@@ -0,0 +1,471 @@
+import logging
+from collections import Counter
+from contextlib import nullcontext
+from typing import Any, Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from qc.rules import RULES, _KINDS, Rule, evaluate, skips_file, zone_errors
+from qc.zone.sweep import zone_classes
+from qc.zone.zone_qc import SESSION_CAP_MIN, SUPERVISED_PLAN, UNSUPERVISED_PLAN
+from util.archive import open_source
+from util.hr.extract_hr import iter_hr_chunks
+
+logger = logging.getLogger(__name__)
+
+# Chunked ("online") versions of the raw-data rules and QC_Zone's metrics.
+# Each kernel carries only what crosses a chunk boundary (the pending last
+# sample, the open NaN run / bounded bout, a histogram of sample deltas for
+# the median fill) and gives the whole-frame results exactly: durations are
+# whole or half seconds, so every sum is exact in any order. The whole-frame
+# path sorts by time of day (unstably, so repeated timestamps may swap; see
+# qc/equivalence.py); a chunk stream cannot sort, so the kernels need
+# strictly increasing sample times. A recording that crosses midnight once
+# is sorted by a rotation (the samples after midnight, then those before),
+# which score_chunks feeds by reading the part before midnight a second
+# time. Anything else is left to the whole-frame path.
+
+
+class UnorderedRecording(ValueError):
+    """The clock repeats or steps back other than at one midnight; only the whole-frame sort orders it."""
+
+
+class _Clock:
+    """
+    A recording's sample times in file order: its span as recording_window
+    measures it (a day added at every backwards step), and whether one
+    rotation at a midnight rollover puts it in time-of-day order.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.first = self.last = None
+        self.rollovers = 0
+        # file row of the first sample after the first backwards step
+        self.rollover_at: int | None = None
+        # strictly increasing between backwards steps
+        self.increasing = True
+
+    def update(self, times: np.ndarray) -> int | None:
+        """Take the next chunk; returns the index in it of a first rollover found here."""
+        if not len(times):
+            return None
+        steps = np.diff(times if self.last is None else np.concatenate(([self.last], times)))
+        back = np.flatnonzero(steps < np.timedelta64(0, "ns"))
+        if (steps == np.timedelta64(0, "ns")).any():
+            self.increasing = False
+        cut = None
+        if back.size and self.rollovers == 0:
+            # with a carried last sample, steps[i] lands on times[i]; without one, on times[i + 1]
+            cut = int(back[0]) + (self.last is None)
+            self.rollover_at = self.rows + cut
+        if self.first is None:
+            self.first = times[0]
+        self.last = times[-1]
+        self.rollovers += int(back.size)
+        self.rows += len(times)
+        return cut
+
+    @property
+    def rotation(self) -> int | None:
+        """rollover_at when time-of-day order is the part after it, then the part before it."""
+        if self.rollovers != 1 or not self.increasing or not self.last < self.first:
+            return None
+        return self.rollover_at
+
+    @property
+    def span(self) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta] | None:
+        if self.first is None:
+            return None
+        start = pd.Timestamp(self.first)
+        end = pd.Timestamp(self.last) + pd.Timedelta(days=self.rollovers)
+        return start, end, end - start
+
+
+class _DeltaCounts:
+    """Next-sample deltas as a histogram, for the median QC_Zone gives the final sample."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.n = 0
+
+    def add(self, deltas: np.ndarray) -> None:
+        if not len(deltas):
+            return
+        values, counts = np.unique(deltas, return_counts=True)
+        self.counts.update(dict(zip(values.tolist(), counts.tolist())))
+        self.n += len(deltas)
+
+    def median(self, extra: float | None = None) -> float:
+        """Median of the deltas (plus `extra`); 0 when there are none, like the NaN fill."""
+        counts = self.counts if extra is None else self.counts + Counter({extra: 1})
+        n = self.n + (extra is not None)
+        if n == 0:
+            return 0.0
+        lo, hi = (n - 1) // 2, n // 2
+        seen, low = 0, None
+        for value in sorted(counts):
+            seen += counts[value]
+            if low is None and seen > lo:
+                low = value
+            if seen > hi:
+                return max((low + value) / 2, 0.0)
+        raise AssertionError("unreachable")
+
+
+class OnlineScan:
+    """
+    SessionScan's rule inputs gathered chunk by chunk: gaps between
+    consecutive non-NaN samples and NaN runs over the samples in time
+    order, and the recording span from `clock` (file order, day rollovers
+    as in recording_window). Only gaps and runs over the smallest
+    registered threshold are kept, so memory does not grow with the
+    recording. `evaluate(scan, stage)` works on it as on a SessionScan.
+    """
+
+    def __init__(self, clock: _Clock, rules: dict[str, Rule] | None = None):
+        self.clock = clock
+        rules = list((RULES if rules is None else rules).values())
+        gap = [r.threshold for r in rules if r.kind == "gap"]
+        nan = [r.threshold for r in rules if r.kind == "nan_run"]
+        self._gap_min = np.timedelta64(int(min(gap) * 1e9), "ns") if gap else None
+        self._nan_min = min(nan) if nan else None
+
+        self.rows = 0
+        # strictly increasing times so far; otherwise `disorder` says why not
+        self.ordered = True
+        self.disorder: str | None = None
+        self._last = None
+        self._last_valid = None
+        self._gaps: list[tuple[np.ndarray, np.ndarray]] = []
+        # open NaN run carried across chunks: (start time, last time, length)
+        self._run: tuple[np.datetime64, np.datetime64, int] | None = None
+        self._runs: list[tuple[np.datetime64, np.datetime64, int]] = []
+
+    def update(self, times: np.ndarray, hr: np.ndarray) -> None:
+        """
+        Feed the next chunk in time order: times (datetime64, as extract_hr
+        parsed them) and HR (float). The gap and NaN-run details are in ns,
+        as SessionScan reports them.
+        """
+        if not len(times):
+            return
+        steps = np.diff(times if self._last is None else np.concatenate(([self._last], times)))
+        backwards = (steps < np.timedelta64(0, "ns")).any()
+        self._last = times[-1]
+        self.rows += len(times)
+        if self.ordered and (backwards or (steps == np.timedelta64(0, "ns")).any()):
+            self.ordered = False
+            self.disorder = "time steps backwards" if backwards else "repeated timestamps"
+        if not self.ordered:
+            return
+        times = times.astype("datetime64[ns]")
+        self._update_gaps(times, hr)
+        self._update_nan_runs(times, hr)
+
+    def _update_gaps(self, times: np.ndarray, hr: np.ndarray) -> None:
+        valid = times[~np.isnan(hr)]
+        if self._gap_min is None or not len(valid):
+            return
+        if self._last_valid is not None:
+            valid = np.concatenate(([self._last_valid], valid))
+        self._last_valid = valid[-1]
+        hit = np.diff(valid) > self._gap_min
+        if hit.any():
+            self._gaps.append((valid[:-1][hit], valid[1:][hit]))
+
+    def _update_nan_runs(self, times: np.ndarray, hr: np.ndarray) -> None:
+        if self._nan_min is None:
+            return
+        edges = np.diff(np.concatenate(([0], np.isnan(hr).astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        if self._run is not None and not (len(starts) and starts[0] == 0):
+            # the carried run ended with the previous chunk
+            self._close_run()
+        for start, end in zip(starts, ends):
+            run_start, length = times[start], int(end - start)
+            if start == 0 and self._run is not None:
+                run_start, length = self._run[0], self._run[2] + length
+            self._run = (run_start, times[end - 1], length)
+            if end < len(hr):
+                self._close_run()
+
+    def _close_run(self) -> None:
+        if self._run is not None and self._run[2] > self._nan_min:
+            self._runs.append(self._run)
+        self._run = None
+
+    def finish(self) -> "OnlineScan":
+        """Close the run still open at the end of the recording."""
+        if self._run is not None:
+            self._close_run()
+        return self
+
+    @property
+    def span(self) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta] | None:
+        return self.clock.span
+
+    @property
+    def valid_gaps(self) -> tuple[np.ndarray, np.ndarray]:
+        if not self._gaps:
+            empty = np.array([], dtype="datetime64[ns]")
+            return empty, empty
+        return (
+            np.concatenate([prev for prev, _ in self._gaps]),
+            np.concatenate([nxt for _, nxt in self._gaps]),
+        )
+
+    def details(self, rule: Rule) -> pd.DataFrame | None:
+        """What `rule` found in this recording, in SessionScan's columns."""
+        if rule.kind != "nan_run":
+            return _KINDS[rule.kind](rule, self)
+        runs = [run for run in self._runs if run[2] > rule.threshold]
+        if not runs:
+            return None
+        start_time = pd.to_datetime(np.array([run[0] for run in runs], dtype="datetime64[ns]"))
+        end_time = pd.to_datetime(np.array([run[1] for run in runs], dtype="datetime64[ns]"))
+        return pd.DataFrame({
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration": end_time - start_time,
+            "length": np.array([run[2] for run in runs], dtype=np.int64),
+        })
+
+
+class OnlineZones:
+    """
+    QC_Zone's zone metrics for a recording fed in time order, chunk by chunk.
+
+    Every sample lasts until the next one and the final sample gets the
+    median delta, so each sample is scored once its successor arrives and
+    the last one at `finish`. Supervised sessions stop at the cap the way
+    QC_Zone._cap_hr_to_minutes trims them (the sample reaching the cap
+    becomes the final one, or is cut with a synthetic row at the cap);
+    unsupervised sessions keep every sample and only MAZD is windowed.
+    """
+
+    def __init__(self, zones: pd.DataFrame, week: int, session_type: str, cap_min: float = SESSION_CAP_MIN):
+        self.week = int(week)
+        self.supervised = session_type.lower().startswith("super")
+        self.plan = (SUPERVISED_PLAN if self.supervised else UNSUPERVISED_PLAN).get(self.week)
+        self.zones = zones
+        self.max_seconds = cap_min * 60
+        self.rows = 0
+        self.done = False
+        self._deltas = _DeltaCounts()
+        self._pending: tuple[int, float] | None = None
+        self._elapsed = 0.0
+        self._totals = dict.fromkeys(("in_allowed", "above", "below", "mazd_time", "mazd_dev"), 0.0)
+        self._bout = 0.0
+        self._longest = 0.0
+
+    def update(self, times: np.ndarray, hr: np.ndarray) -> None:
+        """Feed the next chunk: times (datetime64, strictly increasing) and HR (float)."""
+        if self.done or self.plan is None or not len(times):
+            return
+        self.rows += len(times)
+        ns = times.astype("datetime64[ns]").astype(np.int64)
+        if self._pending is not None:
+            ns = np.concatenate(([self._pending[0]], ns))
+            hr = np.concatenate(([self._pending[1]], hr))
+        self._pending = (int(ns[-1]), float(hr[-1]))
+        deltas = np.diff(ns) / 1e9
+        if not len(deltas):
+            return
+        known = hr[:-1]
+        if self.supervised:
+            cum_end = self._elapsed + np.cumsum(deltas)
+            reach = np.flatnonzero(cum_end >= self.max_seconds)
+            if reach.size:
+                j = int(reach[0])
+                self._deltas.add(deltas[:j])
+                self._score(known[:j], deltas[:j])
+                self._cap(float(known[j]), cum_end[j] > self.max_seconds)
+                return
+        self._deltas.add(deltas)
+        self._score(known, deltas)
+
+    def _cap(self, hr: float, past_cap: bool) -> None:
+        """Score the sample that reaches the cap as the trimmed frame's last row(s)."""
+        if past_cap:
+            remaining = self.max_seconds - self._elapsed
+            fill = self._deltas.median(extra=remaining)
+            self._score(np.array([hr, hr]), np.array([remaining, fill]))
+        else:
+            self._score(np.array([hr]), np.array([self._deltas.median()]))
+        self.done = True
+        self._pending = None
+
+    def _score(self, hr: np.ndarray, deltas: np.ndarray) -> None:
+        """Add samples whose durations are final."""
+        if not len(hr):
+            return
+        classes = zone_classes(hr, self.zones, self.plan["zones"])
+        cum_end = self._elapsed + np.cumsum(deltas)
+        if self.supervised:
+            window = deltas
+        else:
+            window = np.clip(np.minimum(cum_end, self.max_seconds) - (cum_end - deltas), 0, None)
+        self._elapsed = float(cum_end[-1])
+
+        totals = self._totals
+        totals["in_allowed"] += deltas[classes["in_allowed"]].sum()
+        totals["above"] += deltas[classes["above"]].sum()
+        totals["below"] += deltas[classes["below"]].sum()
+        valid = classes["valid"]
+        totals["mazd_time"] += window[valid].sum()
+        totals["mazd_dev"] += (classes["deviation"][valid] * window[valid]).sum()
+
+        # bounded bouts: runs of `good`, the first one continuing the carried bout
+        good = classes["good"]
+        starts = np.concatenate(([0], np.flatnonzero(good[1:] != good[:-1]) + 1))
+        sums = np.add.reduceat(deltas, starts)
+        if good[0]:
+            sums[0] += self._bout
+        if good[starts].any():
+            self._longest = max(self._longest, float(sums[good[starts]].max()))
+        self._bout = float(sums[-1]) if good[-1] else 0.0
+
+    def finish(self) -> tuple[dict[str, Any] | None, dict[str, list]]:
+        """(zone_metrics, err) as QC_Zone leaves them in zone_metrics / err."""
+        if self.plan is None:
+            kind = "supervised" if self.supervised else "unsupervised"
+            return None, {"zone_summary": [f"no {kind} plan for week {self.week}", None]}
+        if not self.rows or zone_classes(np.zeros(0), self.zones, self.plan["zones"]) is None:
+            return None, {"zone_summary": ["hr data missing for zone QC", None]}
+        if self._pending is not None:
+            hr = self._pending[1]
+            fill = self._deltas.median()
+            if self.supervised and self._elapsed + fill > self.max_seconds:
+                self._cap(hr, True)
+            else:
+                self._score(np.array([hr]), np.array([fill]))
+            self._pending = None
+
+        totals = self._totals
+        time_in_allowed, time_above, time_below = totals["in_allowed"], totals["above"], totals["below"]
+        longest_bout = self._longest
+        bounded_met = longest_bout >= self.plan["bounded_min"] * 60
+        total_time = time_in_allowed + time_above + time_below
+        zone_metrics = {
+            "week": self.week,
+            "time_in_allowed_s": float(time_in_allowed),
+            "time_above_s": float(time_above),
+            "time_below_s": float(time_below),
+            "longest_bounded_bout_s": float(longest_bout),
+            "bounded_met": bool(bounded_met),
+            "zone_compliance": float(time_in_allowed / total_time) if total_time > 0 else None,
+            "mazd": float(totals["mazd_dev"] / totals["mazd_time"]) if totals["mazd_time"] > 0 else None,
+        }
+        summary_msg = (
+            f"time_in_allowed_s={time_in_allowed:.1f}; "
+            f"time_above_s={time_above:.1f}; "
+            f"time_below_s={time_below:.1f}; "
+            f"longest_bounded_bout_s={longest_bout:.1f}; "
+            f"bounded_met={bounded_met}"
+        )
+        err = {"zone_summary": [summary_msg, None]}
+        err.update(zone_errors(zone_metrics))
+        return zone_metrics, err
+
+
+def _arrays(chunk: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    return chunk["time"].to_numpy(), chunk["hr"].to_numpy(dtype=float)
+
+
+def _feed(kernels: tuple[OnlineScan, OnlineZones], times: np.ndarray, hr: np.ndarray) -> None:
+    scan, zone = kernels
+    scan.update(times, hr)
+    if scan.ordered:
+        zone.update(times, hr)
+
+
+def score_chunks(
+    chunks: Iterable[pd.DataFrame],
+    week: int,
+    zones: pd.DataFrame,
+    group: str,
+    reopen: Callable[[], Iterable[pd.DataFrame]] | None = None,
+) -> tuple[bool, dict[str, list], dict[str, Any] | None]:
+    """
+    api.score_hr over a recording given as (time, hr) chunks in file order,
+    e.g. extract_hr.iter_hr_chunks. Returns the same (skipped, err,
+    zone_metrics).
+
+    A recording that crosses midnight once is scored in time-of-day order
+    as the whole-frame path scores it: the samples after the rollover go
+    to the kernels as they arrive, then `reopen()` (the same chunks from
+    the start) supplies the samples before it.
+
+    Raises UnorderedRecording when no file rule drops the recording and
+    its time-of-day order cannot be streamed (repeated timestamps, a clock
+    stepping back more than once or into the part already recorded, or a
+    rollover without `reopen`); score that file with score_hr (the span
+    rule keeps only recordings under 4 h, so the whole frame is small).
+    """
+    clock = _Clock()
+    # kernels for the recording as read, and for the part after a rollover
+    head = (OnlineScan(clock), OnlineZones(zones, week, group))
+    tail = None
+    for chunk in chunks:
+        times, hr = _arrays(chunk)
+        cut = clock.update(times)
+        if cut is not None:
+            _feed(head, times[:cut], hr[:cut])
+            tail = (OnlineScan(clock), OnlineZones(zones, week, group))
+            _feed(tail, times[cut:], hr[cut:])
+        elif clock.rollovers == 0:
+            _feed(head, times, hr)
+        elif clock.rollovers == 1:
+            _feed(tail, times, hr)
+        # past a second rollover no rotation orders the recording; the clock still tracks its span
+    scan, zone = head
+    scan.finish()
+    err = evaluate(scan, "file")
+    if skips_file(err):
+        # a file rule that fires on the part before a rollover fires on the whole recording
+        return True, err, None
+    if clock.rollovers:
+        start = clock.rotation
+        if start is None or reopen is None:
+            raise UnorderedRecording("repeated timestamps" if not clock.increasing else "time steps backwards")
+        scan, zone = tail
+        read = 0
+        for chunk in reopen():
+            times, hr = _arrays(chunk)
+            times, hr = times[:start - read], hr[:start - read]
+            read += len(times)
+            _feed(tail, times, hr)
+            if read >= start:
+                break
+        scan.finish()
+        err = evaluate(scan, "file")
+    if not scan.ordered:
+        raise UnorderedRecording(scan.disorder)
+    err.update(evaluate(scan, "session"))
+    zone_metrics, zone_err = zone.finish()
+    err.update(zone_err)
+    return False, err, zone_metrics
+
+
+def score_file(
+    path: str,
+    chunk_rows: int,
+    week: int,
+    zones: pd.DataFrame,
+    group: str,
+    opener=open_source,
+) -> tuple[bool, dict[str, list], dict[str, Any] | None]:
+    """
+    score_chunks over one Polar CSV read `chunk_rows` samples at a time
+    through a single handle from `opener` (e.g. DeadlineReader.open); the
+    second pass a midnight rollover needs seeks back to the start instead
+    of opening the file again. Raises UnorderedRecording as score_chunks.
+    """
+    with opener(path) as fh:
+        def chunks():
+            fh.seek(0)
+            return iter_hr_chunks(path, chunk_rows, opener=lambda _: nullcontext(fh))
+
+        return score_chunks(chunks(), week, zones, group, reopen=chunks)
@@ -0,0 +1,379 @@
+"""
+Quick look: approximate zone metrics for one subject or recording straight
+from the Polar CSVs, for a dashboard or a study visit.
+
+    from qc.quicklook import quick_look
+    rows = quick_look(files, workbook, "sub8000")
+
+Only every `step`-th timestamp is parsed, and each kept sample stands for
+the stride up to the next one (the last keeps the median per-sample delta,
+like QC_Zone); the estimate classifies each stride by its first sample. No
+pandas, no QC_Sup, no cache: a subject's 25 sessions take a fraction of a
+second.
+
+Every metric also gets [lo, hi] bounds on the exact value. Every row's HR
+is converted (cheap next to parsing the timestamps), so each stride knows its
+lowest and highest HR: one that stays in a single category (below / in /
+above the allowed zones, a zone level for MAZD) counts whole, the others
+may hold any mix of the categories they touch. The bounds are the extremes
+over those mixes. A file out of time order has every timestamp read.
+
+Sessions the last full run scored (zone_out.csv newer than the recording)
+are answered with the exact values instead, with lo == hi.
+"""
+import os
+import csv
+import logging
+from typing import Any, Iterable
+
+import numpy as np
+
+from qc.zone.classes import classify, zone_deviation
+from qc.zone.plan import SESSION_CAP_MIN, SUPERVISED_PLAN, UNSUPERVISED_PLAN
+from util.archive import open_source
+from util.deadline import ReadTimeout
+from util.parse_path import parse_path
+from util.zone.midpoint import snap_bounds
+
+log = logging.getLogger(__name__)
+
+DEFAULT_STEP = 10
+# the "duration" file rule (qc/rules.py): the pipeline skips longer recordings
+MAX_SPAN_S = 4 * 3600
+QUICK_METRICS = ["zone_compliance", "time_in_allowed_s", "time_above_s", "time_below_s", "mazd"]
+QUICK_COLUMNS = ["group", "subject", "week", "session", "source"] + [
+    f"{m}{suffix}" for m in QUICK_METRICS for suffix in ("", "_lo", "_hi")
+] + ["file"]
+
+
+def read_zone_bounds(workbook: str, subject: str, snap_to: int = 5) -> dict[int, tuple[int, int]]:
+    """
+    A subject's snapped {zone: (start, end)} bounds from the HR ranges
+    workbook, the values extract_zones + midpoint_snap give, read with
+    openpyxl alone.
+    """
+    from openpyxl import load_workbook
+
+    target = int(subject.lower().removeprefix("sub"))
+    book = load_workbook(workbook, read_only=True, data_only=True)
+    try:
+        rows = book["Sheet1"].iter_rows(values_only=True)
+        id_col = list(next(rows)).index("BOOST ID")
+        for row in rows:
+            try:
+                match = row[id_col] is not None and int(row[id_col]) == target
+            except (TypeError, ValueError):
+                continue
+            if match:
+                # zone columns follow BOOST ID and a..d: z1_start, z1_end, ... z5_end
+                cells = [int(v) for v in row[5:15]]
+                starts, ends = snap_bounds(cells[0::2], cells[1::2], snap_to)
+                return {i + 1: bounds for i, bounds in enumerate(zip(starts, ends))}
+    finally:
+        book.close()
+    raise ValueError(f"No rows matching ID {target}")
+
+
+def _clock_seconds(value: str) -> float:
+    # HH:MM:SS(.f); hour >= 24 wraps like extract_hr's parse_times
+    hours, minutes, seconds = value.strip().split(":")
+    return (int(hours) % 24) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def read_samples(path: str, step: int = DEFAULT_STEP, opener=open_source) -> dict[str, np.ndarray] | None:
+    """
+    The timestamps of every `step`-th sample of a Polar CSV plus its last
+    one (seconds since midnight) and, for each of those strides, the first,
+    lowest and highest HR, whether any is blank and whether its first row
+    ties with the row before. Every row is split into its fields, but only
+    the HR field is converted for all of them; timestamps are parsed for
+    the kept rows alone. None when the header lacks Time or HR (bpm).
+    """
+    with opener(path) as fh:
+        lines = fh.read().decode("utf-8-sig", errors="replace").splitlines()
+    header = next(csv.reader(lines[2:3]), [])
+    if "Time" not in header or "HR (bpm)" not in header:
+        return None
+    time_col, hr_col = header.index("Time"), header.index("HR (bpm)")
+
+    data = [cells for cells in csv.reader(line for line in lines[3:] if line.strip())]
+    hr = np.array([float(c[hr_col]) if len(c) > hr_col and c[hr_col].strip() else np.nan for c in data])
+    keep = np.arange(0, len(data), max(int(step), 1))
+    if len(data) and keep[-1] != len(data) - 1:
+        keep = np.append(keep, len(data) - 1)
+    if not len(keep):
+        return {"seconds": np.zeros(0)}
+    blank = np.isnan(hr)
+    return {
+        "seconds": np.array([_clock_seconds(data[i][time_col]) for i in keep]),
+        "rows": keep,
+        # same timestamp as the row before: QC_Zone's (unstable) sort may swap the two
+        "tied": np.array([i > 0 and data[i][time_col] == data[i - 1][time_col] for i in keep]),
+        "hr": hr[keep],
+        "hr_min": np.fmin.reduceat(hr, keep),
+        "hr_max": np.fmax.reduceat(hr, keep),
+        "blank": np.logical_or.reduceat(blank, keep),
+    }
+
+
+def _ratio_range(num: float, den: float, weights: np.ndarray, low: np.ndarray, high: np.ndarray) -> tuple[float | None, float | None]:
+    """
+    Extremes of (num + sum s_i x_i) / (den + sum s_i) over every share s_i
+    in [0, w_i] of each block and x_i in [low_i, high_i]. Attained by taking
+    the blocks with the smallest (largest) x whole, so a prefix scan over
+    the sorted blocks finds them.
+    """
+    def extreme(values, pick):
+        order = np.argsort(values if pick is min else -values, kind="stable")
+        w = weights[order]
+        totals = den + np.cumsum(w)
+        sums = num + np.cumsum(w * values[order])
+        candidates = [s / t for s, t in zip(sums, totals) if t > 0]
+        if den > 0:
+            candidates.append(num / den)
+        return float(pick(candidates)) if candidates else None
+
+    return extreme(low, min), extreme(high, max)
+
+
+def _category(classes: dict[str, np.ndarray]) -> np.ndarray:
+    # ordered by HR: 0 below (and blank), 1 in the allowed zones, 2 above
+    return classes["in_allowed"].astype(int) + 2 * classes["above"].astype(int)
+
+
+def estimate(
+    samples: dict[str, np.ndarray],
+    zone_bounds: dict[int, tuple[int, int]],
+    plan: dict,
+    supervised: bool,
+    cap_min: int = SESSION_CAP_MIN,
+) -> dict[str, Any]:
+    """
+    Metric estimates and [lo, hi] bounds from read_samples' strides; see
+    the module docstring.
+    """
+    seconds, rows = samples["seconds"], samples["rows"]
+    # the median per-sample delta, as QC_Zone gives the last sample
+    per_row = np.diff(seconds) / np.maximum(np.diff(rows), 1)
+    fill = max(float(np.median(per_row)), 0.0) if len(per_row) else 0.0
+    # a stride spans the rows between two kept samples only while the file is in
+    # time order (or every sample was kept)
+    ordered = bool(np.all(np.diff(seconds) >= 0) or np.all(np.diff(rows) == 1))
+    order = np.argsort(seconds, kind="stable")
+    seconds = seconds[order]
+    stride_rows = np.append(np.diff(rows), 1)[order]
+    d = np.clip(np.append(np.diff(seconds), fill), 0, None)
+
+    cap = cap_min * 60
+    cum_end = np.cumsum(d)
+    start = cum_end - d
+    window = np.clip(np.minimum(cum_end, cap) - start, 0, None)
+    # the stride holding the last counted row, and how far off its length may be:
+    # QC_Zone gives that row the median delta (which `fill` estimates), and a
+    # supervised session cut at the cap may end on a row inside the stride
+    tail, tail_slack = len(d) - 1, fill
+    if supervised:
+        # trimmed to the cap; the cap row repeats the sample it cuts
+        weights = window.copy()
+        inside = np.flatnonzero(start < cap)
+        if len(inside) and cum_end[inside[-1]] > cap:
+            weights[inside[-1]] += fill
+        last = inside[-1] if len(inside) else None
+        if last is not None and (cum_end[last] == cap or (cum_end[last] > cap and stride_rows[last] > 1)):
+            tail, tail_slack = last, fill + d[last]
+    else:
+        weights = d
+
+    hr_min, hr_max, blank = samples["hr_min"][order], samples["hr_max"][order], samples["blank"][order]
+    # a tie at a stride's start may bring the previous stride's last row into it
+    tied = samples["tied"][order]
+    tied[1:] |= np.diff(seconds) == 0
+    at = np.flatnonzero(tied[1:]) + 1
+    hr_min[at] = np.fmin(hr_min[at], hr_min[at - 1])
+    hr_max[at] = np.fmax(hr_max[at], hr_max[at - 1])
+    blank[at] |= blank[at - 1]
+
+    allowed = plan["zones"]
+    first = classify(samples["hr"][order], zone_bounds, allowed)
+    low = classify(hr_min, zone_bounds, allowed)
+    high = classify(hr_max, zone_bounds, allowed)
+    category = _category(first)
+    lowest = np.where(blank, 0, _category(low))
+    highest = _category(high)
+    if not ordered:
+        lowest, highest = np.zeros_like(lowest), np.full_like(highest, 2)
+    total = float(weights.sum())
+
+    out = {}
+    span = {}
+    for code, name in ((1, "time_in_allowed_s"), (2, "time_above_s"), (0, "time_below_s")):
+        certain = float(weights[(lowest == code) & (highest == code)].sum())
+        possible = float(weights[(lowest <= code) & (highest >= code)].sum())
+        span[code] = (certain, possible)
+        out[name] = float(weights[category == code].sum())
+        out[f"{name}_lo"] = max(certain - tail_slack, 0.0)
+        out[f"{name}_hi"] = possible + tail_slack
+    if total > 0:
+        # in / (in + out) is lowest with the least time in and the most out, and vice versa
+        in_lo, in_hi = out["time_in_allowed_s_lo"], out["time_in_allowed_s_hi"]
+        out_hi = total - span[1][0] + tail_slack
+        out_lo = max(total - span[1][1] - tail_slack, 0.0)
+        out["zone_compliance"] = out["time_in_allowed_s"] / total
+        out["zone_compliance_lo"] = in_lo / (in_lo + out_hi) if in_lo + out_hi > 0 else 0.0
+        out["zone_compliance_hi"] = in_hi / (in_hi + out_lo) if in_hi + out_lo > 0 else 1.0
+    else:
+        out["zone_compliance"] = out["zone_compliance_lo"] = out["zone_compliance_hi"] = None
+
+    mazd_weights = weights if supervised else window
+    out["mazd"], out["mazd_lo"], out["mazd_hi"] = _mazd_range(
+        first, low, high, blank | (not ordered), mazd_weights, tail, tail_slack, zone_bounds, allowed,
+    )
+    return out
+
+
+def _mazd_range(first, low, high, unknown, weights, tail, tail_slack, zone_bounds, allowed_zones):
+    valid = first["valid"]
+    valid_time = float(weights[valid].sum())
+    value = float((first["deviation"] * weights)[valid].sum() / valid_time) if valid_time > 0 else None
+
+    levels = zone_deviation(np.arange(0, max(zone_bounds) + 2), allowed_zones)
+    lo_zone, hi_zone = low["zone"], high["zone"]
+    # strides whose HR stays in one zone level count whole; the tail's length is a guess
+    fixed = low["valid"] & high["valid"] & (lo_zone == hi_zone) & ~unknown
+    fixed[tail] = False
+    dmin, dmax = [], []
+    for i in np.flatnonzero(~fixed):
+        if low["valid"][i] and high["valid"][i] and not unknown[i]:
+            span = levels[int(lo_zone[i]):int(hi_zone[i]) + 1]
+        else:
+            # blank HR or out of order: any level, or none
+            span = levels
+        dmin.append(span.min())
+        dmax.append(span.max())
+    changing = weights.copy()
+    changing[tail] += tail_slack
+    changing = changing[~fixed]
+    lo, hi = _ratio_range(
+        float((low["deviation"] * weights)[fixed].sum()), float(weights[fixed].sum()),
+        changing, np.asarray(dmin, dtype=float), np.asarray(dmax, dtype=float),
+    )
+    return value, lo, hi
+
+
+def read_exact(zone_out: str) -> dict[tuple, dict[str, Any]]:
+    """zone_out.csv rows keyed by (group, subject, week, session)."""
+    exact = {}
+    if not os.path.isfile(zone_out):
+        return exact
+    with open(zone_out, newline="") as fh:
+        for row in csv.DictReader(fh):
+            if not row.get("week"):
+                continue
+            exact[(row["group"], row["subject"], int(row["week"]), row["session"])] = row
+    return exact
+
+
+def _exact_metrics(row: dict[str, str]) -> dict[str, Any]:
+    def number(key):
+        return float(row[key]) if row.get(key) not in (None, "") else None
+
+    values = {m: number(m) for m in QUICK_METRICS if m != "zone_compliance"}
+    parts = [values["time_in_allowed_s"], values["time_above_s"], values["time_below_s"]]
+    total = sum(p for p in parts if p is not None)
+    values["zone_compliance"] = values["time_in_allowed_s"] / total if total > 0 else None
+    out = {}
+    for m in QUICK_METRICS:
+        out[m] = out[f"{m}_lo"] = out[f"{m}_hi"] = values[m]
+    return out
+
+
+def quick_look(
+    files: Iterable[str],
+    workbook: str,
+    subject: str,
+    step: int = DEFAULT_STEP,
+    zone_out: str | None = "./zone_out.csv",
+    snap_to: int = 5,
+    opener=open_source,
+) -> list[dict[str, Any]]:
+    """
+    One row per recording (QUICK_COLUMNS): source is "exact" (from
+    zone_out.csv), "approx" (with bounds), or why the session has no
+    metrics ("week_parse", "no_plan", "schema", "empty", "duration" for the
+    4 h span rule, "read_timeout" when `opener`, e.g. DeadlineReader.open,
+    gave up on the file). The workbook is only opened when something needs
+    estimating.
+    """
+    exact = read_exact(zone_out) if zone_out else {}
+    exact_mtime = os.path.getmtime(zone_out) if exact else None
+    zone_bounds = None
+
+    out = []
+    for path in files:
+        meta = parse_path(path)
+        row = dict.fromkeys(QUICK_COLUMNS)
+        row.update(group=meta["group"], subject=meta["subject"] or subject, week=meta["week"], session=meta["session"], file=path)
+        out.append(row)
+        if meta["week"] is None:
+            row["source"] = "week_parse"
+            continue
+        plans = SUPERVISED_PLAN if meta["group"] == "Supervised" else UNSUPERVISED_PLAN
+        plan = plans.get(meta["week"])
+        if plan is None:
+            row["source"] = "no_plan"
+            continue
+
+        scored = exact.get((row["group"], row["subject"], row["week"], row["session"]))
+        if scored is not None and os.path.getmtime(path) <= exact_mtime:
+            row.update(_exact_metrics(scored), source="exact")
+            continue
+
+        try:
+            samples = read_samples(path, step, opener)
+        except ReadTimeout:
+            row["source"] = "read_timeout"
+            continue
+        if samples is None:
+            row["source"] = "schema"
+            continue
+        seconds = samples["seconds"]
+        if not len(seconds):
+            row["source"] = "empty"
+            continue
+        if step > 1 and np.any(np.diff(seconds) < 0):
+            # out of time order (or past midnight): sorted strides would mix rows, so read every timestamp
+            try:
+                samples = read_samples(path, 1, opener)
+            except ReadTimeout:
+                row["source"] = "read_timeout"
+                continue
+            seconds = samples["seconds"]
+        span = seconds[-1] - seconds[0] + 86400 * int((np.diff(seconds) < 0).sum())
+        if span > MAX_SPAN_S:
+            row["source"] = "duration"
+            continue
+        if zone_bounds is None:
+            zone_bounds = read_zone_bounds(workbook, subject, snap_to)
+        row.update(estimate(samples, zone_bounds, plan, meta["group"] == "Supervised"), source="approx")
+    return out
+
+
+def render(rows: list[dict[str, Any]]) -> str:
+    """A fixed-width table: each metric as value [lo, hi] (one value when exact)."""
+    def cell(row, metric):
+        value, lo, hi = row[metric], row[f"{metric}_lo"], row[f"{metric}_hi"]
+        if value is None:
+            return "-"
+        digits = 3 if metric in ("zone_compliance", "mazd") else 0
+        text = f"{value:.{digits}f}"
+        if row["source"] == "approx" and lo is not None and hi is not None:
+            text += f" [{lo:.{digits}f}, {hi:.{digits}f}]"
+        return text
+
+    header = ["group", "subject", "week", "session", "source"] + QUICK_METRICS
+    table = [header] + [
+        [str(row[k]) if row[k] is not None else "-" for k in header[:5]] + [cell(row, m) for m in QUICK_METRICS]
+        for row in rows
+    ]
+    widths = [max(len(line[i]) for line in table) for i in range(len(header))]
+    return "\n".join("  ".join(v.ljust(w) for v, w in zip(line, widths)).rstrip() for line in table)
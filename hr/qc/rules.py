@@ -0,0 +1,243 @@
+import json
+import hashlib
+import logging
+from functools import cached_property
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class Rule:
+    """
+    One declarative QC check.
+
+    kind
+      "span"    recording span (first to last sample, day rollovers handled) > threshold seconds
+      "gap"     time between consecutive non-NaN samples > threshold seconds
+      "nan_run" more than `threshold` consecutive NaN samples
+      "zone"    zone metric `metric` differs from `expect` (evaluated after zone QC)
+    stage
+      "file"    evaluated first; a firing rule with skip_file=True drops the recording
+      "session" raw-data checks on a kept recording
+      "zone"    checks on QC_Zone's metrics
+    unless
+      names of rules that, when they fire, silence this one
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        message: str,
+        threshold: float | None = None,
+        stage: str = "session",
+        skip_file: bool = False,
+        unless: tuple[str, ...] = (),
+        metric: str | None = None,
+        expect: Any = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.message = message
+        self.threshold = threshold
+        self.stage = stage
+        self.skip_file = skip_file
+        self.unless = tuple(unless)
+        self.metric = metric
+        self.expect = expect
+
+
+# Evaluated in registration order; later rules can be silenced by earlier ones
+RULES: dict[str, Rule] = {}
+
+
+def register(rule: Rule) -> Rule:
+    if rule.kind not in _KINDS:
+        raise ValueError(f"Unknown rule kind: {rule.kind}")
+    RULES[rule.name] = rule
+    return rule
+
+
+def rules_hash() -> str:
+    """
+    Hash of the registry (every rule's settings, in evaluation order).
+    Cached QC results are only reused while it is unchanged.
+    """
+    payload = [
+        [r.name, r.kind, r.message, r.threshold, r.stage, r.skip_file, list(r.unless), r.metric, r.expect]
+        for r in RULES.values()
+    ]
+    return hashlib.sha1(json.dumps(payload, default=str).encode("utf-8")).hexdigest()
+
+
+class SessionScan:
+    """
+    The shared per-session arrays every raw-data rule reads. Each piece is
+    computed once on first use, so adding rules of an existing kind only
+    adds a threshold comparison.
+    """
+
+    def __init__(self, hr: pd.DataFrame):
+        self.hr = hr
+
+    @cached_property
+    def ordered(self) -> tuple[np.ndarray, np.ndarray]:
+        """Sample times (datetime64[ns]) and HR sorted by time, as in QC_Sup."""
+        df = self.hr.copy()
+        df["time"] = pd.to_datetime(df["time"])
+        df = df.sort_values("time")
+        return df["time"].to_numpy(dtype="datetime64[ns]"), df["hr"].to_numpy(dtype=float)
+
+    @cached_property
+    def valid_gaps(self) -> tuple[np.ndarray, np.ndarray]:
+        """(previous valid time, next valid time) for every pair of consecutive non-NaN samples."""
+        times, hr = self.ordered
+        valid_times = times[~np.isnan(hr)]
+        return valid_times[:-1], valid_times[1:]
+
+    @cached_property
+    def nan_runs(self) -> tuple[np.ndarray, np.ndarray]:
+        """(start, end_exclusive) sample indices of NaN runs in time order."""
+        _, hr = self.ordered
+        edges = np.diff(np.concatenate(([0], np.isnan(hr).astype(np.int8), [0])))
+        return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    @cached_property
+    def span(self) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta] | None:
+        from util.hr.extract_hr import recording_window
+        return recording_window(self.hr)
+
+    def details(self, rule: Rule) -> pd.DataFrame | None:
+        """What `rule` found in this session (None if it did not fire)."""
+        return _KINDS[rule.kind](rule, self)
+
+
+def _eval_span(rule: Rule, scan: SessionScan) -> pd.DataFrame | None:
+    window = scan.span
+    if window is None:
+        return None
+    start_time, end_time, duration = window
+    if duration <= pd.Timedelta(seconds=rule.threshold):
+        return None
+    return pd.DataFrame({
+        "start_time": [start_time],
+        "end_time": [end_time],
+        "duration": [duration],
+    })
+
+
+def _eval_gap(rule: Rule, scan: SessionScan) -> pd.DataFrame | None:
+    prev_time, next_time = scan.valid_gaps
+    delta = next_time - prev_time
+    hit = delta > np.timedelta64(int(rule.threshold * 1e9), "ns")
+    if not hit.any():
+        return None
+    return pd.DataFrame({
+        "start_time": pd.to_datetime(prev_time[hit]),
+        "end_time": pd.to_datetime(next_time[hit]),
+        "duration": pd.to_timedelta(delta[hit]),
+    })
+
+
+def _eval_nan_run(rule: Rule, scan: SessionScan) -> pd.DataFrame | None:
+    times, _ = scan.ordered
+    starts, ends = scan.nan_runs
+    length = ends - starts
+    hit = length > rule.threshold
+    if not hit.any():
+        return None
+    start_time = pd.to_datetime(times[starts[hit]])
+    end_time = pd.to_datetime(times[ends[hit] - 1])
+    return pd.DataFrame({
+        "start_time": start_time,
+        "end_time": end_time,
+        "duration": end_time - start_time,
+        "length": length[hit],
+    })
+
+
+_KINDS = {
+    "span": _eval_span,
+    "gap": _eval_gap,
+    "nan_run": _eval_nan_run,
+    "zone": None,
+}
+
+
+def evaluate(scan: SessionScan, stage: str) -> dict[str, list]:
+    """
+    Run every registered raw-data rule of `stage` over one scan (a
+    SessionScan, or anything with its `details(rule)`, e.g. qc.online's
+    chunked OnlineScan).
+
+    Returns the error dict save_qc consumes: {rule name: [message, details]}
+    with details already in save_qc's start_time/end_time/duration/length
+    columns.
+    """
+    err: dict[str, list] = {}
+    for rule in RULES.values():
+        if rule.stage != stage or rule.kind == "zone":
+            continue
+        if any(name in err for name in rule.unless):
+            continue
+        details = scan.details(rule)
+        if details is not None:
+            err[rule.name] = [rule.message, details]
+    return err
+
+
+def skip_reasons(err: dict[str, list]) -> list[str]:
+    """Names of the rules that fired and drop the whole recording."""
+    return [name for name in err if name in RULES and RULES[name].skip_file]
+
+
+def skips_file(err: dict[str, list]) -> bool:
+    """True if any rule that fired drops the whole recording."""
+    return bool(skip_reasons(err))
+
+
+def zone_errors(metrics: dict[str, Any]) -> dict[str, list]:
+    """Evaluate the zone-stage rules against QC_Zone's metrics dict."""
+    err: dict[str, list] = {}
+    for rule in RULES.values():
+        if rule.kind != "zone":
+            continue
+        if any(name in err for name in rule.unless):
+            continue
+        if metrics.get(rule.metric) != rule.expect:
+            err[rule.name] = [rule.message, None]
+    return err
+
+
+register(Rule(
+    "duration",
+    kind="span",
+    threshold=4 * 3600,
+    message="recording longer than 4 hours; file ignored",
+    stage="file",
+    skip_file=True,
+))
+register(Rule(
+    "missing",
+    kind="gap",
+    threshold=30,
+    message="missing significant time",
+))
+register(Rule(
+    "nan",
+    kind="nan_run",
+    threshold=30,
+    message="more than 30 NaNs in a row",
+    unless=("missing",),
+))
+register(Rule(
+    "bounded_short",
+    kind="zone",
+    stage="zone",
+    metric="bounded_met",
+    expect=True,
+    message="bounded time target not met without dropping below zone floor",
+))
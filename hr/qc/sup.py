@@ -1,6 +1,6 @@
-import pandas as pd
 import logging
 
+from qc.rules import SessionScan, evaluate
 from qc.zone.zone_qc import QC_Zone
 
 logger = logging.getLogger(__name__)
@@ -23,18 +23,12 @@ class QC_Sup:
 
     def qc_data(self):
         """
-        QC the raw data itself
+        QC the raw data itself.
+        The checks are the "session" rules registered in qc/rules.py,
+        evaluated together over a single scan of the recording.
         """
-        
-        logger.debug("running missing check")
-        missing_check, missing_periods = self._missing_periods()
-        nan_runs = self._nan_check(self.hr.copy())
-        if missing_check == 1:
-            self.err['missing'] = ['missing significant time', missing_periods]
-        elif not nan_runs.empty:
-            self.err['nan'] = ['more than 30 NaNs in a row', nan_runs]
-        else: 
-            return None
+        logger.debug("running raw data rules")
+        self.err.update(evaluate(SessionScan(self.hr), "session"))
 
     def qc_zones(self):
         """
@@ -52,72 +46,3 @@ class QC_Sup:
         # Merge any zone errors into the overall error dictionary
         self.err.update(qc_zone.err)
         return qc_zone.zone_metrics
-
-
-
-    def _missing_periods(self):
-
-        df = self.hr.copy()
-
-        # assume df has columns “time” and “hr”
-        df['time'] = pd.to_datetime(df['time'], format='%H:%M:%S')
-        df = df.sort_values('time')
-
-        # drop any NaNs so we only look at real measurements
-        valid = df.dropna(subset=['hr'])
-
-        # compute time‐diff between successive valid samples
-        delta = valid['time'].diff()
-
-        # mask where that gap exceeds 30 s
-        gaps = delta > pd.Timedelta(seconds=30)
-
-        # build a table of missing‐data intervals
-        prev_time = valid['time'].shift()
-        missing_periods = pd.DataFrame({
-            'gap_start': prev_time[gaps],    # end of last good sample
-            'gap_end':   valid['time'][gaps] # start of next good sample
-        })
-        missing_periods['duration'] = missing_periods['gap_end'] - missing_periods['gap_start']
-        if missing_periods.empty:
-            return 0, missing_periods
-        else:
-            return 1, missing_periods
-
-
-    def _nan_check(self, df: pd.DataFrame, min_run: int = 30) -> pd.DataFrame:
-        """
-        Detect runs of > min_run consecutive NaNs in df['hr'].
-        Returns a DataFrame with columns: [start_time, end_time, length].
-        """
-        # 1) Ensure time is datetime and sorted
-        df = df.copy()
-        df['time'] = pd.to_datetime(df['time'])
-        df = df.sort_values('time').reset_index(drop=True)
-
-        # 2) Boolean mask of where hr is NaN
-        is_nan = df['hr'].isna()
-
-        # 3) Build run‐IDs by marking where the mask changes
-        run_id = is_nan.ne(is_nan.shift()).cumsum()
-
-        # 4) Aggregate each run
-        summary = (
-            df
-            .assign(is_nan=is_nan, run=run_id)
-            .groupby('run')
-            .agg(
-                start_time=('time', 'first'),
-                end_time  =('time', 'last'),
-                length    =('is_nan', 'size'),
-                all_nan   =('is_nan', 'all')
-            )
-        )
-
-        # 5) Filter to runs that are all-NaN and longer than min_run
-        long_runs = summary[(summary['all_nan']) & (summary['length'] > min_run)]
-
-        # 6) Add duration and return start/end/length/duration
-        long_runs = long_runs.copy()
-        long_runs['duration'] = long_runs['end_time'] - long_runs['start_time']
-        return long_runs[['start_time', 'end_time', 'duration', 'length']]
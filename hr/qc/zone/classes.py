@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def classify(hr: np.ndarray, zone_bounds: dict[int, tuple[int, int]], allowed_zones: list[int]) -> dict[str, np.ndarray] | None:
+    """
+    Per-sample zone classification of HR values against {zone: (start, end)}
+    bounds, mirroring QC_Zone._run_zone_qc (in_allowed/above/below, bounded
+    `good`) and QC_Zone._calc_mazd (`zone` index, NaN where it has none,
+    `valid` and the `deviation` from the nearest allowed zone). NaN HR lands
+    in `below`, like the pandas path. NumPy only, for qc/quicklook.py.
+    """
+    if not zone_bounds or not allowed_zones:
+        return None
+
+    n = len(hr)
+    lowest_allowed = min(zone_bounds[z][0] for z in allowed_zones)
+    highest_allowed = max(zone_bounds[z][1] for z in allowed_zones)
+
+    in_allowed = np.zeros(n, dtype=bool)
+    for z in allowed_zones:
+        start, end = zone_bounds[z]
+        in_allowed |= (hr >= start) & (hr <= end)
+    above = (hr > highest_allowed) & ~in_allowed
+    below = ~in_allowed & ~above
+    good = hr >= lowest_allowed
+
+    zone_idx = np.full(n, np.nan)
+    for z, (start, end) in zone_bounds.items():
+        zone_idx[(hr >= start) & (hr <= end)] = float(z)
+    min_start = min(start for start, _ in zone_bounds.values())
+    max_end = max(end for _, end in zone_bounds.values())
+    zone_idx[hr < min_start] = 0.0
+    zone_idx[hr > max_end] = float(max(zone_bounds.keys()) + 1)
+    valid = ~np.isnan(zone_idx)
+    deviation = np.where(valid, zone_deviation(np.where(valid, zone_idx, 0.0), allowed_zones), 0.0)
+
+    return {
+        "in_allowed": in_allowed,
+        "above": above,
+        "below": below,
+        "good": good,
+        "zone": zone_idx,
+        "valid": valid,
+        "deviation": deviation,
+    }
+
+
+def zone_deviation(zone_idx: np.ndarray, allowed_zones: list[int]) -> np.ndarray:
+    """|zone - nearest allowed zone| for each (valid) zone index."""
+    targets = np.asarray(allowed_zones, dtype=float)
+    # argmin keeps the first target on ties, like min(allowed_zones, key=...)
+    return np.abs(np.asarray(zone_idx, dtype=float)[:, None] - targets[None, :]).min(axis=1)
@@ -0,0 +1,98 @@
+# Weekly plans and the session cap, kept free of pandas so qc/quicklook.py
+# can use them without importing QC_Zone (which re-exports them).
+
+# Minutes of a session that count towards the zone metrics: supervised
+# recordings are trimmed to this length, unsupervised MAZD is windowed to it.
+SESSION_CAP_MIN = 45
+
+# These define the weeks and their expected zones
+SUPERVISED_PLAN = {
+    1: {
+        "zones": [1, 2, 3],
+        "warmup_min": 5,
+        "bounded_min": 15,
+        "unbounded_min": 15,
+        "cooldown_min": 5,
+    },
+    2: {
+        "zones": [1, 2, 3],
+        "warmup_min": 5,
+        "bounded_min": 20,
+        "unbounded_min": 10,
+        "cooldown_min": 5,
+    },
+    3: {
+        "zones": [2, 3],
+        "warmup_min": 5,
+        "bounded_min": 25,
+        "unbounded_min": 5,
+        "cooldown_min": 5,
+    },
+    4: {
+        "zones": [2, 3, 4],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    5: {
+        "zones": [3, 4],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    6: {
+        "zones": [3, 4],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+}
+
+# Unsupervised weeks follow the home training plan
+UNSUPERVISED_PLAN = {
+    7: {
+        "zones": [3, 4],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    8: {
+        "zones": [3, 4],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    9: {
+        "zones": [3, 4],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    10: {
+        "zones": [3, 4, 5],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    11: {
+        "zones": [4, 5],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+    12: {
+        "zones": [4, 5],
+        "warmup_min": 5,
+        "bounded_min": 30,
+        "unbounded_min": 0,
+        "cooldown_min": 5,
+    },
+}
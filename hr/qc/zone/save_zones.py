@@ -1,13 +1,73 @@
 import os
-import re
 from pathlib import Path
 import logging
 from typing import Any
 
 import pandas as pd
 
+from util.parse_path import parse_path
+from util.spool import SortedSpool, sort_key
+
 log = logging.getLogger(__name__)
 
+# Row order of zone_out.csv; shared with the shard merge so both agree
+ZONE_SORT_KEYS = ["group", "subject", "week", "session"]
+ZONE_COLUMNS = [
+    "group",
+    "subject",
+    "week",
+    "session",
+    "time_in_allowed_s",
+    "time_above_s",
+    "time_below_s",
+    "longest_bounded_bout_s",
+    "bounded_met",
+    "mazd",
+]
+
+
+def zone_row(subject: str, file_path: str, metrics: dict[str, Any] | None) -> dict[str, Any]:
+    """One file's zone metrics as a zone_out.csv row."""
+    meta = parse_path(str(file_path))
+    metrics = metrics or {}
+    return {
+        "group": meta["group"],
+        "subject": meta["subject"] or subject,
+        "week": metrics.get("week", meta["week"]),
+        "session": meta["session"],
+        "time_in_allowed_s": metrics.get("time_in_allowed_s"),
+        "time_above_s": metrics.get("time_above_s"),
+        "time_below_s": metrics.get("time_below_s"),
+        "longest_bounded_bout_s": metrics.get("longest_bounded_bout_s"),
+        "bounded_met": metrics.get("bounded_met"),
+        "mazd": metrics.get("mazd"),
+    }
+
+
+def _zone_frame(rows: list[dict[str, Any]]) -> pd.DataFrame:
+    df_out = pd.DataFrame(rows, columns=ZONE_COLUMNS)
+
+    if not df_out.empty:
+        df_out["week"] = pd.array(df_out["week"], dtype="Int64")
+        numeric_cols = [
+            "time_in_allowed_s",
+            "time_above_s",
+            "time_below_s",
+            "longest_bounded_bout_s",
+            "mazd",
+        ]
+        for col in numeric_cols:
+            df_out[col] = pd.to_numeric(df_out[col], errors="coerce")
+        if "bounded_met" in df_out.columns:
+            df_out["bounded_met"] = df_out["bounded_met"].astype("boolean")
+
+        df_out.sort_values(
+            by=ZONE_SORT_KEYS,
+            inplace=True,
+            kind="mergesort",
+        )
+    return df_out
+
 
 def save_zones(zone_master: dict[str, list[list[Any]]], out_csv: str | os.PathLike) -> pd.DataFrame:
     """
@@ -39,28 +99,6 @@ def save_zones(zone_master: dict[str, list[list[Any]]], out_csv: str | os.PathLi
     """
     rows: list[dict[str, Any]] = []
 
-    def _parse_path(file_path: str) -> dict[str, Any]:
-        """Extract session metadata from the file path."""
-        group = None
-        if re.search(r"/Supervised/", file_path, re.IGNORECASE):
-            group = "Supervised"
-        elif re.search(r"/Unsupervised/", file_path, re.IGNORECASE):
-            group = "Unsupervised"
-
-        subject = None
-        match_subject = re.search(r"/(sub\d+)/", file_path, re.IGNORECASE)
-        if match_subject:
-            subject = match_subject.group(1).lower()
-
-        week = None
-        session = None
-        match_ws = re.search(r"_wk(\d+)_ses(\d+(?:\.\d+)?)", file_path, re.IGNORECASE)
-        if match_ws:
-            week = int(match_ws.group(1))
-            session = match_ws.group(2)
-
-        return {"group": group, "subject": subject, "week": week, "session": session}
-
     for subject, entries in (zone_master or {}).items():
         if not entries:
             continue
@@ -68,58 +106,32 @@ def save_zones(zone_master: dict[str, list[list[Any]]], out_csv: str | os.PathLi
             if not isinstance(entry, (list, tuple)) or len(entry) != 2:
                 continue
             file_path, metrics = entry
-            meta = _parse_path(str(file_path))
-            metrics = metrics or {}
-
-            row = {
-                "group": meta["group"],
-                "subject": meta["subject"] or subject,
-                "week": metrics.get("week", meta["week"]),
-                "session": meta["session"],
-                "time_in_allowed_s": metrics.get("time_in_allowed_s"),
-                "time_above_s": metrics.get("time_above_s"),
-                "time_below_s": metrics.get("time_below_s"),
-                "longest_bounded_bout_s": metrics.get("longest_bounded_bout_s"),
-                "bounded_met": metrics.get("bounded_met"),
-                "mazd": metrics.get("mazd"),
-            }
-            rows.append(row)
-
-    df_out = pd.DataFrame(rows, columns=[
-        "group",
-        "subject",
-        "week",
-        "session",
-        "time_in_allowed_s",
-        "time_above_s",
-        "time_below_s",
-        "longest_bounded_bout_s",
-        "bounded_met",
-        "mazd",
-    ])
+            rows.append(zone_row(subject, file_path, metrics))
 
-    if not df_out.empty:
-        df_out["week"] = pd.array(df_out["week"], dtype="Int64")
-        numeric_cols = [
-            "time_in_allowed_s",
-            "time_above_s",
-            "time_below_s",
-            "longest_bounded_bout_s",
-            "mazd",
-        ]
-        for col in numeric_cols:
-            df_out[col] = pd.to_numeric(df_out[col], errors="coerce")
-        if "bounded_met" in df_out.columns:
-            df_out["bounded_met"] = df_out["bounded_met"].astype("boolean")
-
-        df_out.sort_values(
-            by=["group", "subject", "week", "session"],
-            inplace=True,
-            kind="mergesort",
-        )
+    df_out = _zone_frame(rows)
 
     out_csv = Path(out_csv)
     out_csv.parent.mkdir(parents=True, exist_ok=True)
     df_out.to_csv(out_csv, index=False)
     log.info("Zone QC summary written: %s (%d rows)", out_csv, len(df_out))
     return df_out
+
+
+class ZoneWriter:
+    """
+    Streaming counterpart of save_zones; see qc.save_qc.QCWriter.
+    """
+
+    def __init__(self, out_csv: str | os.PathLike, **spool_kwargs):
+        header = pd.DataFrame(columns=ZONE_COLUMNS).to_csv(index=False)
+        self.spool = SortedSpool(out_csv, header, **spool_kwargs)
+
+    def add(self, subject: str, file_path: str, metrics: dict[str, Any]) -> None:
+        df_out = _zone_frame([zone_row(subject, file_path, metrics)])
+        keys = [sort_key(values) for values in df_out[ZONE_SORT_KEYS].itertuples(index=False)]
+        self.spool.add(keys, df_out.to_csv(index=False, header=False).splitlines(keepends=True))
+
+    def close(self) -> int:
+        rows = self.spool.close()
+        log.info("Zone QC summary written: %s (%d rows)", self.spool.out_csv, rows)
+        return rows
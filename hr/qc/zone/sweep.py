@@ -0,0 +1,290 @@
+import os
+from pathlib import Path
+import logging
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from qc.zone.classes import classify
+from qc.zone.zone_qc import SESSION_CAP_MIN, SUPERVISED_PLAN, UNSUPERVISED_PLAN
+from util.zone.midpoint import midpoint_snap
+
+log = logging.getLogger(__name__)
+
+# Default grid reproduces the numbers QC_Zone writes to zone_out.csv.
+# bounded_min=None means "use the weekly plan's bounded_min".
+DEFAULT_GRID = {
+    "cap_min": [SESSION_CAP_MIN],
+    "snap_to": [5],
+    "bounded_min": [None],
+}
+
+SWEEP_METRICS = [
+    "time_in_allowed_s",
+    "time_above_s",
+    "time_below_s",
+    "longest_bounded_bout_s",
+    "bounded_met",
+    "zone_compliance",
+    "mazd",
+]
+
+
+class SessionTimeline:
+    """
+    One preprocessed recording, ready to be evaluated under many parameter
+    combinations without touching pandas again.
+
+    The per-sample durations follow QC_Zone._zone_context exactly: samples are
+    sorted by time, each one lasts until the next sample, and the final sample
+    gets the median delta. Every metric is then a masked sum of those
+    durations, so prefix sums over the timeline answer any time cap in
+    O(1) per mask instead of re-slicing the frame.
+    """
+
+    def __init__(self, hr: pd.DataFrame):
+        hr_df = hr.copy()
+        hr_df["time"] = pd.to_datetime(hr_df["time"])
+        hr_df = hr_df.sort_values("time").reset_index(drop=True)
+
+        ns = hr_df["time"].to_numpy(dtype="datetime64[ns]").astype("int64")
+        self.hr = hr_df["hr"].to_numpy(dtype=float)
+        self.n = len(self.hr)
+        # raw next-sample deltas, kept so capped timelines can recompute the median fill
+        self.raw = np.diff(ns) / 1e9
+        self.deltas = _fill_deltas(self.raw, self.n)
+        self.cum_end = np.cumsum(self.deltas)
+        self.start = self.cum_end - self.deltas
+        self._prefix_dur = _prefix(self.deltas)
+
+    def zone_masks(self, zones: pd.DataFrame, allowed_zones: list[int]) -> dict[str, Any] | None:
+        """
+        Per-sample category masks for one set of (snapped) zone bounds,
+        mirroring the classification in QC_Zone._run_zone_qc and _calc_mazd.
+        """
+        classes = zone_classes(self.hr, zones, allowed_zones)
+        if classes is None:
+            return None
+        in_allowed = classes["in_allowed"]
+        above = classes["above"]
+        below = classes["below"]
+        good = classes["good"]
+        valid = classes["valid"]
+        deviation = classes["deviation"]
+
+        # run-length structure of the bounded (never below the floor) mask
+        run_id = np.concatenate(([0], np.cumsum(good[1:] != good[:-1])))
+        run_start = np.flatnonzero(np.concatenate(([True], good[1:] != good[:-1])))
+        run_good = good[run_start]
+        run_dur = np.diff(np.concatenate((self._prefix_dur[run_start], [self._prefix_dur[-1]])))
+        good_dur = np.where(run_good, run_dur, 0.0)
+        # best completed bounded bout strictly before run r
+        best_before = np.concatenate(([0.0], np.maximum.accumulate(good_dur)))
+
+        return {
+            "masks": {
+                "in_allowed": in_allowed,
+                "above": above,
+                "below": below,
+                "valid": valid,
+            },
+            "prefix": {
+                "in_allowed": _prefix(in_allowed * self.deltas),
+                "above": _prefix(above * self.deltas),
+                "below": _prefix(below * self.deltas),
+                "valid": _prefix(valid * self.deltas),
+                "dev": _prefix(deviation * self.deltas),
+            },
+            "deviation": deviation,
+            "good": good,
+            "run_id": run_id,
+            "run_start": run_start,
+            "best_before": best_before,
+        }
+
+    def metrics(self, zm: dict[str, Any], cap_min: float, supervised: bool) -> dict[str, float] | None:
+        """
+        Zone metrics for one cap. Supervised sessions are trimmed to the cap
+        (QC_Zone._cap_hr_to_minutes); unsupervised sessions keep their full
+        length and only the MAZD window is capped (QC_Zone._calc_mazd).
+        """
+        max_seconds = cap_min * 60
+        prefix = zm["prefix"]
+        masks = zm["masks"]
+        if supervised:
+            if max_seconds <= 0:
+                return None
+            # last sample whose start lies inside the cap
+            last = int(np.searchsorted(self.start, max_seconds, side="left")) - 1
+            if self.cum_end[last] > max_seconds:
+                # the trimmed frame gets a synthetic row at the cap; it is the
+                # new final sample, so it carries the median delta
+                tail = max_seconds - self.start[last]
+                kept = np.append(self.raw[:last], tail)
+                tail += float(np.median(kept))
+            else:
+                # the cut sample becomes the final one and takes the median delta
+                tail = float(np.median(self.raw[:last])) if last > 0 else 0.0
+            tail = max(tail, 0.0)
+
+            def total(name: str) -> float:
+                return float(prefix[name][last] + masks[name][last] * tail)
+
+            time_in = total("in_allowed")
+            time_above = total("above")
+            time_below = total("below")
+            mazd_time = total("valid")
+            mazd_dev = float(prefix["dev"][last] + masks["valid"][last] * zm["deviation"][last] * tail)
+
+            r = zm["run_id"][last]
+            longest = float(zm["best_before"][r])
+            if zm["good"][last]:
+                current = self._prefix_dur[last] - self._prefix_dur[zm["run_start"][r]] + tail
+                longest = max(longest, float(current))
+        else:
+            time_in = float(prefix["in_allowed"][-1])
+            time_above = float(prefix["above"][-1])
+            time_below = float(prefix["below"][-1])
+            longest = float(zm["best_before"][-1])
+
+            # first sample that runs past the cap only counts up to the cap
+            k = int(np.searchsorted(self.cum_end, max_seconds, side="right"))
+            mazd_time = float(prefix["valid"][k])
+            mazd_dev = float(prefix["dev"][k])
+            if k < self.n and masks["valid"][k]:
+                part = max(max_seconds - self.start[k], 0.0)
+                mazd_time += part
+                mazd_dev += zm["deviation"][k] * part
+
+        total_time = time_in + time_above + time_below
+        return {
+            "time_in_allowed_s": time_in,
+            "time_above_s": time_above,
+            "time_below_s": time_below,
+            "longest_bounded_bout_s": longest,
+            "zone_compliance": time_in / total_time if total_time > 0 else None,
+            "mazd": mazd_dev / mazd_time if mazd_time > 0 else None,
+        }
+
+
+def zone_classes(hr: np.ndarray, zones: pd.DataFrame, allowed_zones: list[int]) -> dict[str, np.ndarray] | None:
+    """
+    Per-sample zone classification for one set of (snapped) zone bounds,
+    mirroring QC_Zone._run_zone_qc (in_allowed/above/below, bounded `good`)
+    and QC_Zone._calc_mazd (`valid` zone index and its `deviation` from the
+    nearest allowed zone). NaN HR lands in `below`, like the pandas path.
+    """
+    zone_bounds = {}
+    for i in range(1, 6):
+        start_col = f"z{i}_start"
+        end_col = f"z{i}_end"
+        if start_col in zones.columns and end_col in zones.columns:
+            zone_bounds[i] = (int(zones[start_col].iat[0]), int(zones[end_col].iat[0]))
+    return classify(hr, zone_bounds, allowed_zones)
+
+
+def _fill_deltas(raw: np.ndarray, n: int) -> np.ndarray:
+    if n == 0:
+        return np.zeros(0)
+    median_delta = float(np.median(raw)) if len(raw) else 0.0
+    return np.clip(np.append(raw, median_delta), 0, None)
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+
+
+def sweep_session(
+    hr: pd.DataFrame,
+    zones: pd.DataFrame,
+    week: int,
+    session_type: str,
+    grid: dict[str, list] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Evaluate every combination in `grid` for one recording.
+
+    Parameters
+    ----------
+    hr : pd.DataFrame
+        Output of extract_hr (columns time, hr).
+    zones : pd.DataFrame
+        Unsnapped zone row (see util.zone.extract_zones.raw_zones); each
+        snap_to in the grid is applied here.
+    week : int
+    session_type : str
+        "Supervised" or "Unsupervised".
+    grid : dict
+        Keys cap_min, snap_to, bounded_min (lists). Missing keys fall back
+        to DEFAULT_GRID.
+
+    Returns
+    -------
+    list[dict]
+        Long-format rows: cap_min, snap_to, bounded_min, metric, value.
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    supervised = session_type.lower().startswith("super")
+    plan = (SUPERVISED_PLAN if supervised else UNSUPERVISED_PLAN).get(int(week))
+    if plan is None or hr is None or hr.empty:
+        return []
+
+    timeline = SessionTimeline(hr)
+    rows: list[dict[str, Any]] = []
+    for snap_to in grid["snap_to"]:
+        zm = timeline.zone_masks(midpoint_snap(zones, snap_to=snap_to), plan["zones"])
+        if zm is None:
+            continue
+        for cap_min in grid["cap_min"]:
+            metrics = timeline.metrics(zm, cap_min, supervised)
+            if metrics is None:
+                continue
+            for bounded_min in grid["bounded_min"]:
+                target = plan["bounded_min"] if bounded_min is None else bounded_min
+                values = dict(metrics)
+                values["bounded_met"] = float(values["longest_bounded_bout_s"] >= target * 60)
+                for metric in SWEEP_METRICS:
+                    rows.append({
+                        "cap_min": cap_min,
+                        "snap_to": snap_to,
+                        "bounded_min": target,
+                        "metric": metric,
+                        "value": values[metric],
+                    })
+    return rows
+
+
+def save_sweep(rows: list[dict[str, Any]], out_csv: str | os.PathLike) -> pd.DataFrame:
+    """
+    Persist sweep rows as a long-format CSV.
+
+    Columns: group, subject, week, session, cap_min, snap_to, bounded_min,
+    metric, value. bounded_met is written as 1.0/0.0 so `value` stays numeric.
+    """
+    df_out = pd.DataFrame(rows, columns=[
+        "group",
+        "subject",
+        "week",
+        "session",
+        "cap_min",
+        "snap_to",
+        "bounded_min",
+        "metric",
+        "value",
+    ])
+
+    if not df_out.empty:
+        df_out["week"] = pd.array(df_out["week"], dtype="Int64")
+        df_out["value"] = pd.to_numeric(df_out["value"], errors="coerce")
+        df_out.sort_values(
+            by=["group", "subject", "week", "session", "cap_min", "snap_to", "bounded_min", "metric"],
+            inplace=True,
+            kind="mergesort",
+        )
+
+    out_csv = Path(out_csv)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    df_out.to_csv(out_csv, index=False)
+    log.info("Zone sweep written: %s (%d rows)", out_csv, len(df_out))
+    return df_out
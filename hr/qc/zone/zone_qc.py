@@ -2,6 +2,9 @@ import logging
 
 import pandas as pd
 
+from qc.rules import zone_errors
+from qc.zone.plan import SESSION_CAP_MIN, SUPERVISED_PLAN, UNSUPERVISED_PLAN  # noqa: F401
+
 logging = logging.getLogger(__name__)
 
 
@@ -20,109 +23,18 @@ class QC_Zone:
         Run the supervised zone QC
         """
         self._is_supervised = True
-        # These define the weeks and their expected zones
-        zone_info = {
-            1: {
-                "zones": [1, 2, 3],
-                "warmup_min": 5,
-                "bounded_min": 15,
-                "unbounded_min": 15,
-                "cooldown_min": 5,
-            },
-            2: {
-                "zones": [1, 2, 3],
-                "warmup_min": 5,
-                "bounded_min": 20,
-                "unbounded_min": 10,
-                "cooldown_min": 5,
-            },
-            3: {
-                "zones": [2, 3],
-                "warmup_min": 5,
-                "bounded_min": 25,
-                "unbounded_min": 5,
-                "cooldown_min": 5,
-            },
-            4: {
-                "zones": [2, 3, 4],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            5: {
-                "zones": [3, 4],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            6: {
-                "zones": [3, 4],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-        }
-
-        weekly_plan = zone_info.get(self.week)
+        weekly_plan = SUPERVISED_PLAN.get(self.week)
         if weekly_plan is None:
             self.err["zone_summary"] = [f"no supervised plan for week {self.week}", None]
             return None
 
-        self._cap_hr_to_minutes(45)
+        self._cap_hr_to_minutes(SESSION_CAP_MIN)
         return self._run_zone_qc(weekly_plan)
 
     def unsupervised(self):
         self._is_supervised = False
 
-        training_plan = {
-            7: {
-                "zones": [3, 4],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            8: {
-                "zones": [3, 4],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            9: {
-                "zones": [3, 4],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            10: {
-                "zones": [3, 4, 5],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            11: {
-                "zones": [4, 5],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-            12: {
-                "zones": [4, 5],
-                "warmup_min": 5,
-                "bounded_min": 30,
-                "unbounded_min": 0,
-                "cooldown_min": 5,
-            },
-        }
-
-        weekly_plan = training_plan.get(self.week)
+        weekly_plan = UNSUPERVISED_PLAN.get(self.week)
         if weekly_plan is None:
             self.err["zone_summary"] = [f"no unsupervised plan for week {self.week}", None]
             return None
@@ -212,11 +124,7 @@ class QC_Zone:
             f"bounded_met={bounded_met}"
         )
         self.err["zone_summary"] = [summary_msg, None]
-        if not bounded_met:
-            self.err["bounded_short"] = [
-                "bounded time target not met without dropping below zone floor",
-                None,
-            ]
+        self.err.update(zone_errors(self.zone_metrics))
 
         return self.zone_metrics
 
@@ -302,7 +210,12 @@ class QC_Zone:
 
         self.hr = capped.reset_index(drop=True)
 
-    def _calc_mazd(self, weekly_plan: dict | None = None, apply_cap: bool = True):
+    def _calc_mazd(
+        self,
+        weekly_plan: dict | None = None,
+        apply_cap: bool = True,
+        cap_minutes: int = SESSION_CAP_MIN,
+    ):
         """
         Calculate the Mean Absolute Zone Deviation (MAZD):
         Formula:
@@ -318,7 +231,7 @@ class QC_Zone:
 
         hr_df, hr_vals, deltas, zone_bounds, allowed_zones, _, _ = ctx
         if apply_cap:
-            max_seconds = 45 * 60
+            max_seconds = cap_minutes * 60
             cum_end = deltas.cumsum()
             in_window = (cum_end - deltas) < max_seconds
             window_deltas = deltas.where(in_window, 0)
@@ -0,0 +1,135 @@
+import io
+import os
+import re
+import zlib
+import logging
+import tarfile
+import zipfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# An archive member is addressed as if the archive were a directory:
+#   .../Supervised/sub8000/export.zip/8000_wk1_ses1.CSV
+# so parse_path and _get_week_from_path read it like a loose file.
+_MEMBER_RE = re.compile(r"^(.*?\.(?:zip|tar|tar\.gz|tgz))/(.+)$", re.IGNORECASE)
+
+# The archive each thread most recently opened; members are read in archive
+# order, so keeping it open avoids re-reading a tar.gz from the start for each
+# member. Per thread: DeadlineReader reads in worker threads, and a read it
+# gave up on may still be using its handle when a retry opens the archive.
+_local = threading.local()
+
+
+def is_archive(path: str) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def split_member(path: str) -> tuple[str, str] | None:
+    """(archive path, member name) if `path` points inside an archive."""
+    match = _MEMBER_RE.match(str(path))
+    if match is None or not os.path.isfile(match.group(1)):
+        return None
+    return match.group(1), match.group(2)
+
+
+def _handle(archive: str):
+    st = os.stat(archive)
+    stat = (st.st_size, st.st_mtime_ns)
+    cached = getattr(_local, "open", None)
+    if cached is not None and cached[:2] == (archive, stat):
+        return cached[2]
+    release()
+    if archive.lower().endswith(".zip"):
+        handle = zipfile.ZipFile(archive)
+    else:
+        handle = tarfile.open(archive, mode="r:*")
+    _local.open = (archive, stat, handle)
+    return handle
+
+
+def release() -> None:
+    """Close the calling thread's archive handle, if it has one."""
+    cached = getattr(_local, "open", None)
+    _local.open = None
+    if cached is not None:
+        cached[2].close()
+
+
+def archive_members(archive: str, suffix: str = ".csv") -> list[str]:
+    """
+    Member paths (archive path + "/" + member name) of every non-hidden file
+    ending in `suffix`, in archive order.
+    """
+    try:
+        handle = _handle(archive)
+        if isinstance(handle, zipfile.ZipFile):
+            names = [info.filename for info in handle.infolist() if not info.is_dir()]
+        else:
+            names = [info.name for info in handle.getmembers() if info.isfile()]
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        logger.warning("Could not list archive %s: %s", archive, e)
+        return []
+    return [
+        f"{archive}/{name}"
+        for name in names
+        if name.lower().endswith(suffix) and not os.path.basename(name).startswith(".")
+    ]
+
+
+@contextmanager
+def open_member(path: str):
+    """Binary stream of one archive member; the member is never unpacked to disk."""
+    archive, name = split_member(path)
+    handle = _handle(archive)
+    if isinstance(handle, zipfile.ZipFile):
+        fh = handle.open(name)
+    else:
+        fh = handle.extractfile(name)
+        if fh is None:
+            raise FileNotFoundError(f"Not a regular file in {archive}: {name}")
+    try:
+        yield fh
+    finally:
+        fh.close()
+
+
+def open_source(path: str):
+    """Binary stream of a loose file or an archive member."""
+    if split_member(path) is None:
+        return open(path, "rb")
+    return open_member(path)
+
+
+def source_size(path: str) -> int:
+    """Uncompressed size of a loose file or an archive member."""
+    member = split_member(path)
+    if member is None:
+        return os.path.getsize(path)
+    archive, name = member
+    handle = _handle(archive)
+    if isinstance(handle, zipfile.ZipFile):
+        return handle.getinfo(name).file_size
+    return handle.getmember(name).size
+
+
+def member_stat(path: str) -> tuple[int, int]:
+    """
+    (size, crc32) of an archive member's content. Zip stores the CRC in its
+    directory; tar has none, so the member is streamed once to compute it.
+    """
+    archive, name = split_member(path)
+    handle = _handle(archive)
+    if isinstance(handle, zipfile.ZipFile):
+        info = handle.getinfo(name)
+        return info.file_size, info.CRC
+    crc = 0
+    size = 0
+    with open_member(path) as fh:
+        for chunk in iter(lambda: fh.read(io.DEFAULT_BUFFER_SIZE * 16), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return size, crc
@@ -0,0 +1,88 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Bump when QC or zone logic changes so stale entries are never reused
+CACHE_VERSION = 1
+CACHE_DIR = "./.hr_cache"
+
+
+def file_stat(path: str) -> tuple[int, int]:
+    """
+    (size, mtime_ns) - cheap identity used to tell if a recording changed.
+    Archive members use (size, crc32) of their content instead.
+    """
+    from util.archive import member_stat, split_member
+    if split_member(path) is not None:
+        return member_stat(path)
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def zone_hash(zones: pd.DataFrame) -> str:
+    """
+    Hash of a subject's zone bounds after midpoint_snap. Only a change here
+    can move that subject's zone metrics; other workbook edits are ignored.
+    """
+    row = {col: int(zones[col].iat[0]) for col in sorted(zones.columns)}
+    return hashlib.sha1(json.dumps(row, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SessionCache:
+    """
+    Per-session results from earlier runs, one pickle per recording.
+
+    Each entry holds:
+      - stat:         (size, mtime_ns) of the file when it was processed
+      - week:         week parsed from the filename
+      - skip:         True if the file was ignored (e.g. > 4 h); qc holds the reason
+      - qc:           QC-only error dict (missing gaps / NaN runs), zone independent
+      - zone_hash:    zone_hash() of the bounds used for the zone results
+      - zone_err:     zone error dict (zone_summary, bounded_short, ...)
+      - zone_metrics: metrics dict passed to save_zones, or None
+
+    `rules` (qc.rules.rules_hash()) is stored with every entry; an entry
+    written under a different rule registry is ignored.
+    """
+
+    def __init__(self, root: str | os.PathLike = CACHE_DIR, rules: str | None = None):
+        self.root = Path(root) / "sessions"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.rules = rules
+
+    def _path(self, file: str) -> Path:
+        key = hashlib.sha1(os.path.abspath(file).encode("utf-8")).hexdigest()
+        return self.root / f"{key}.pkl"
+
+    def get(self, file: str, stat: tuple[int, int]) -> dict | None:
+        """Return the entry for `file` if it was stored for the same `stat`."""
+        path = self._path(file)
+        if not path.is_file():
+            return None
+        try:
+            with open(path, "rb") as fh:
+                entry = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError) as exc:
+            log.warning("Ignoring unreadable cache entry %s: %s", path, exc)
+            return None
+        if entry.get("version") != CACHE_VERSION or entry.get("stat") != tuple(stat):
+            return None
+        if entry.get("rules") != self.rules:
+            return None
+        return entry
+
+    def put(self, file: str, stat: tuple[int, int], entry: dict) -> None:
+        """Store `entry`; `stat` must be taken before the file was read."""
+        entry = {**entry, "version": CACHE_VERSION, "stat": tuple(stat), "rules": self.rules}
+        path = self._path(file)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(entry, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
@@ -0,0 +1,239 @@
+import io
+import time
+import queue
+import logging
+import threading
+from contextlib import ExitStack
+
+from util.archive import open_source, release, source_size, split_member
+
+log = logging.getLogger(__name__)
+
+# Defaults for one file's read on /mnt/nfs/lss; see DeadlineReader
+READ_TIMEOUT_S = 120.0
+HEDGE_AFTER_S = 15.0
+RETRIES = 2
+BACKOFF_S = 2.0
+
+# Errors that won't go away by reading again
+_PERMANENT = (FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError)
+
+
+class ReadTimeout(TimeoutError):
+    """A file could not be read within its deadline on any attempt."""
+
+
+class _Worker:
+    """
+    A thread running one stream's calls in order on its own handle. A
+    worker the reader gave up on is stopped: it closes its handle and exits
+    once its stuck call returns, if it ever does.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fh = None
+        self.stack = ExitStack()
+        self.tasks: queue.Queue = queue.Queue()
+        threading.Thread(target=self._run, name=f"read:{path}", daemon=True).start()
+
+    def _run(self):
+        try:
+            while (task := self.tasks.get()) is not None:
+                op, pos, results = task
+                try:
+                    results.put((self, True, op(self._at(pos))))
+                except BaseException as e:  # handed to the waiting thread
+                    results.put((self, False, e))
+        finally:
+            try:
+                self.stack.close()
+            except OSError:
+                pass
+            # the archive handle this thread opened, if any, is its own
+            release()
+
+    def _at(self, pos: int):
+        if self.fh is None:
+            self.fh = self.stack.enter_context(open_source(self.path))
+        if self.fh.tell() != pos:
+            self.fh.seek(pos)
+        return self.fh
+
+    def submit(self, op, pos: int, results: queue.Queue) -> None:
+        self.tasks.put((op, pos, results))
+
+    def stop(self) -> None:
+        self.tasks.put(None)
+
+
+class _DeadlineStream(io.RawIOBase):
+    """One file as a raw stream whose every read runs under the reader's deadline."""
+
+    def __init__(self, reader: "DeadlineReader", path: str):
+        super().__init__()
+        self.reader = reader
+        self.path = path
+        self.pos = 0
+        self.worker = None
+        self.waited = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.reader._call(self, lambda fh: fh.read(len(buffer)))
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def readall(self) -> bytes:
+        # the rest of the file in one call, not one call per buffer
+        data = self.reader._call(self, lambda fh: fh.read())
+        self.pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        # the worker's handle follows on its next read
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += source_size(self.path)
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.pos = offset
+        return offset
+
+    def tell(self) -> int:
+        return self.pos
+
+    def close(self):
+        if not self.closed:
+            if self.worker is not None:
+                self.worker.stop()
+                self.worker = None
+            if self.waited is not None:
+                self.reader.latencies.append(self.waited)
+        super().close()
+
+
+class DeadlineReader:
+    """
+    Opens files whose reads run under a deadline, so one stalled NFS read
+    can't hold up a run.
+
+    A stream's reads run in order in a worker thread that holds the open
+    handle, so the file is never held in memory whole. If a read has not
+    finished after `hedge_after` seconds a second worker opens the file,
+    seeks to the same offset and reads too; whichever finishes first wins
+    and serves the rest of the stream. A read that hits `timeout` (or fails
+    with a transient OSError) is abandoned and retried on a fresh handle
+    after an exponential backoff, up to `retries` more times; then
+    ReadTimeout is raised. A thread stuck in the kernel can't be cancelled,
+    it is simply left behind.
+
+    The time each file spent in reads (all attempts included) is kept for
+    `summary()`.
+    """
+
+    def __init__(
+        self,
+        timeout: float = READ_TIMEOUT_S,
+        retries: int = RETRIES,
+        hedge_after: float | None = HEDGE_AFTER_S,
+        backoff: float = BACKOFF_S,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_after = hedge_after or None
+        self.backoff = backoff
+        self.latencies: list[float] = []
+        self.hedged = 0
+        self.retried = 0
+        self.timeouts = 0
+
+    def _attempt(self, stream: _DeadlineStream, op):
+        results: queue.Queue = queue.Queue()
+        deadline = time.monotonic() + self.timeout
+        running = {stream.worker or _Worker(stream.path)}
+        # set again to whichever worker answers
+        stream.worker = None
+        for worker in running:
+            worker.submit(op, stream.pos, results)
+        # a second read of an archive member re-opens (and for tar.gz re-inflates) the archive
+        hedge_at = None
+        if self.hedge_after is not None and self.hedge_after < self.timeout and split_member(stream.path) is None:
+            hedge_at = time.monotonic() + self.hedge_after
+        error = None
+        try:
+            while running:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wait_until = min(deadline, hedge_at) if hedge_at is not None else deadline
+                try:
+                    worker, ok, value = results.get(timeout=max(wait_until - now, 0))
+                except queue.Empty:
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        log.info("Read slower than %gs, hedging: %s", self.hedge_after, stream.path)
+                        hedge = _Worker(stream.path)
+                        hedge.submit(op, stream.pos, results)
+                        self.hedged += 1
+                        running.add(hedge)
+                        hedge_at = None
+                    continue
+                running.discard(worker)
+                if ok:
+                    stream.worker = worker
+                    return value
+                worker.stop()
+                if isinstance(value, _PERMANENT):
+                    raise value
+                error = value
+        finally:
+            for worker in running:
+                worker.stop()
+        if error is not None and not running:
+            raise error
+        raise TimeoutError(f"read did not finish within {self.timeout:g}s")
+
+    def _call(self, stream: _DeadlineStream, op):
+        start = time.monotonic()
+        for attempt in range(self.retries + 1):
+            try:
+                data = self._attempt(stream, op)
+            except _PERMANENT:
+                raise
+            except (TimeoutError, OSError) as e:
+                if attempt == self.retries:
+                    self.timeouts += 1
+                    raise ReadTimeout(
+                        f"{e} (gave up after {attempt + 1} attempts, {time.monotonic() - start:.0f}s)"
+                    ) from e
+                delay = self.backoff * 2 ** attempt
+                log.warning("Read attempt %d failed (%s), retrying in %gs: %s", attempt + 1, e, delay, stream.path)
+                self.retried += 1
+                time.sleep(delay)
+                continue
+            stream.waited = (stream.waited or 0.0) + time.monotonic() - start
+            return data
+
+    def open(self, path: str) -> io.BufferedReader:
+        """Drop-in for archive.open_source: a buffered stream of the file, each read under the deadline."""
+        return io.BufferedReader(_DeadlineStream(self, str(path)))
+
+    def read(self, path: str) -> bytes:
+        with self.open(path) as fh:
+            return fh.read()
+
+    def summary(self) -> dict[str, float]:
+        """Read latency percentiles in seconds (p50, p90, p99, max) plus counts."""
+        out = {"reads": len(self.latencies), "hedged": self.hedged, "retried": self.retried, "timeouts": self.timeouts}
+        if self.latencies:
+            import numpy as np
+            p50, p90, p99, p100 = np.percentile(self.latencies, [50, 90, 99, 100])
+            out.update(p50=float(p50), p90=float(p90), p99=float(p99), max=float(p100))
+        return out
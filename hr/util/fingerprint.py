@@ -0,0 +1,95 @@
+import os
+import re
+import hashlib
+import logging
+
+from util.archive import open_source, source_size
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the start of the file (Polar metadata + column header)
+HEAD_BYTES = 4096
+# Rows sampled at evenly spaced offsets through the rest of the file
+SAMPLE_ROWS = 8
+CHUNK = 1 << 20
+
+# Re-upload suffix save_zones already understands: `_ses3.1.CSV`
+_COPY_RE = re.compile(r"\.\d+\.csv$", re.IGNORECASE)
+
+
+def quick_signature(path: str, samples: int = SAMPLE_ROWS, opener=open_source) -> str:
+    """
+    Cheap content signature: file size, the leading header block and
+    `samples` rows read at fixed fractions of the file. Two different
+    recordings almost never agree on all of these (the Polar header carries
+    the start date and time), so only signature collisions need a full hash.
+    Archive members are read the same way, so a loose file and its zipped
+    copy share a signature.
+    """
+    size = source_size(path)
+    h = hashlib.sha1(str(size).encode("ascii"))
+    with opener(path) as fh:
+        h.update(fh.read(HEAD_BYTES))
+        if size > HEAD_BYTES:
+            for k in range(1, samples + 1):
+                fh.seek(HEAD_BYTES + (size - HEAD_BYTES) * k // (samples + 1))
+                fh.readline()  # realign to the next full row
+                h.update(fh.readline())
+    return h.hexdigest()
+
+
+def full_hash(path: str, opener=open_source) -> str:
+    h = hashlib.sha1()
+    with opener(path) as fh:
+        for chunk in iter(lambda: fh.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def find_duplicates(files: list[str], unread: list[str] | None = None, opener=open_source) -> dict[str, str]:
+    """
+    Map every byte-identical copy to the file it duplicates.
+
+    Within a set of identical files the original is the one without a
+    re-upload suffix (`_ses3.1.CSV`), then the first by path, so Supervised
+    wins over Unsupervised; the choice does not depend on listing order.
+    Files are only read in full when their quick signatures collide.
+    Unreadable files are left out (and added to `unread`, if given) and
+    surface later in the normal parse. Main passes a DeadlineReader's
+    `opener`, so a stalled read times out instead of holding up the scan.
+    """
+    by_signature: dict[str, list[str]] = {}
+    for file in files:
+        try:
+            sig = quick_signature(file, opener=opener)
+        except OSError as e:
+            logger.warning("Could not fingerprint %s: %s", file, e)
+            if unread is not None:
+                unread.append(file)
+            continue
+        by_signature.setdefault(sig, []).append(file)
+
+    duplicates: dict[str, str] = {}
+    hashed = 0
+    for group in by_signature.values():
+        if len(group) < 2:
+            continue
+        originals: dict[str, str] = {}
+        for file in sorted(group, key=lambda f: (_COPY_RE.search(f) is not None, f)):
+            try:
+                digest = full_hash(file, opener=opener)
+            except OSError as e:
+                logger.warning("Could not hash %s: %s", file, e)
+                if unread is not None:
+                    unread.append(file)
+                continue
+            hashed += 1
+            if digest in originals:
+                duplicates[file] = originals[digest]
+            else:
+                originals[digest] = file
+    logger.info(
+        "Fingerprinted %d files: %d fully hashed, %d duplicates",
+        len(files), hashed, len(duplicates),
+    )
+    return duplicates
@@ -1,17 +1,31 @@
 def get_files(directory):
     import os
+    from util.archive import archive_members, is_archive
     """
     creates a dictionary of files in the directory of each directory in the argument dir
+
+    zip/tar archives are listed by their CSV members instead of unpacking them:
+    an archive inside a subject folder adds its members to that subject, an
+    archive next to the subject folders (members under subXXXX/) adds each
+    member to the subject named by its first folder
     """
     files = {}
     for dir in os.listdir(directory):
         dir_path = os.path.join(directory, dir)
         if os.path.isdir(dir_path):
-            files[dir] = []
+            files.setdefault(dir, [])
             for file in os.listdir(dir_path):
                 if not file.startswith('.'):
                     # Check if the item is a file
                     file_path = os.path.join(dir_path, file)
-                    if os.path.isfile(file_path):
+                    if is_archive(file_path):
+                        files[dir].extend(archive_members(file_path))
+                    elif os.path.isfile(file_path):
                         files[dir].append(file_path)
+        elif not dir.startswith('.') and is_archive(dir_path):
+            for member in archive_members(dir_path):
+                parts = member[len(dir_path) + 1:].split("/")
+                if len(parts) < 2:
+                    continue
+                files.setdefault(parts[0], []).append(member)
     return files
@@ -1,10 +1,72 @@
 import logging
 import os
 import re
+import importlib.util
+from typing import Iterator
+
 import pandas as pd
 
+from util.archive import open_source
+
 logger = logging.getLogger(__name__)
 
+# CSV parse backends. "pyarrow" parses multithreaded into Arrow buffers and
+# is optional; every engine returns the same frame, and all QC after the
+# parse is shared, so outputs do not depend on the engine.
+ENGINES = ("pandas", "pyarrow")
+SAMPLE_COLUMNS = ["Time", "HR (bpm)"]
+
+
+def resolve_engine(engine: str | None) -> str:
+    """Validate `engine`, falling back to pandas when its package is missing."""
+    engine = engine or "pandas"
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine} (choose from {', '.join(ENGINES)})")
+    if engine != "pandas" and importlib.util.find_spec(engine) is None:
+        logger.warning("Engine %s is not installed; using pandas", engine)
+        return "pandas"
+    return engine
+
+
+def _arrow_times(column) -> pd.Series:
+    """
+    Parse an Arrow string column of Polar times without leaving Arrow.
+    Anything strptime rejects (hour >= 24, blanks) goes back to parse_times
+    as strings, so the frame matches the pandas engine either way.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    times = pc.strptime(pc.utf8_trim_whitespace(column), format="%H:%M:%S", unit="s", error_is_null=True)
+    if times.null_count:
+        return pd.Series(column.to_pandas(), dtype=object)
+    # the resolution parse_times gives (ns before pandas 3, us since)
+    unit = pd.to_datetime(pd.Series(["00:00:00"]), format="%H:%M:%S").dt.unit
+    return pd.Series(times.cast(pa.timestamp(unit)).to_numpy())
+
+
+def _read_samples(fh, engine: str) -> pd.DataFrame:
+    """Time and HR columns of a Polar export (after its 2 metadata lines)."""
+    if engine == "pyarrow":
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        table = pa_csv.read_csv(
+            fh,
+            read_options=pa_csv.ReadOptions(skip_rows=2),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=SAMPLE_COLUMNS,
+                column_types={"Time": pa.string()},
+            ),
+        )
+        hr = table.column("HR (bpm)")
+        # like pandas: integer HR stays int64 unless a sample is blank
+        if hr.null_count:
+            hr = hr.cast(pa.float64())
+        return pd.DataFrame({
+            "Time": _arrow_times(table.column("Time")),
+            "HR (bpm)": hr.to_numpy(),
+        })
+    return pd.read_csv(fh, skiprows=2)
+
 
 def _get_week_from_path(path: str) -> int | None:
     """
@@ -19,7 +81,32 @@ def _get_week_from_path(path: str) -> int | None:
     return int(match.group(1))
 
 
-def extract_hr(file):
+def parse_times(values: pd.Series) -> tuple[pd.Series, int, str | None]:
+    """
+    Parse Polar HH:MM:SS times, normalizing invalid >=24:MM:SS to HH%24.
+
+    Returns (times, number of values with hour >= 24, the first of them).
+    """
+    time_str = values.astype(str).str.strip()
+    bad, sample = 0, None
+    parts = time_str.str.split(":", n=2, expand=True)
+    if parts.shape[1] >= 3:
+        hours = pd.to_numeric(parts[0], errors="coerce")
+        bad_mask = hours >= 24
+        if bad_mask.any():
+            bad, sample = int(bad_mask.sum()), time_str[bad_mask].iloc[0]
+            hours = hours.where(~bad_mask, hours % 24)
+            parts[0] = hours.fillna(0).astype(int).astype(str).str.zfill(2)
+            time_str = parts[0] + ":" + parts[1].str.zfill(2) + ":" + parts[2].str.zfill(2)
+    return pd.to_datetime(time_str, format="%H:%M:%S"), bad, sample
+
+
+def extract_hr(file, engine: str = "pandas", opener=open_source):
+    """
+    (samples, week) of the first Polar CSV in `file` that has a week in its
+    name, or (None, None). `opener(path)` returns the binary stream to parse;
+    Main passes a DeadlineReader's so stalled NFS reads time out.
+    """
     if not file:
         raise ValueError("File must be a non-empty path or list of paths.")
 
@@ -32,30 +119,51 @@ def extract_hr(file):
             week = _get_week_from_path(path)
             if week is None:
                 continue
-            df = pd.read_csv(path, skiprows=2)
-            df = df[["Time", "HR (bpm)"]].rename(columns={"Time": "time", "HR (bpm)": "hr"})
-            # Normalize invalid >=24:MM:SS to HH%24:MM:SS before parsing, and log when it occurs
-            time_str = df["time"].astype(str).str.strip()
-            parts = time_str.str.split(":", n=2, expand=True)
-            if parts.shape[1] >= 3:
-                hours = pd.to_numeric(parts[0], errors="coerce")
-                bad_mask = hours >= 24
-                if bad_mask.any():
-                    sample = time_str[bad_mask].iloc[0]
-                    logger.warning(
-                        "Found %d time values with hour >= 24 in %s (sample %s); normalizing to HH%%24",
-                        int(bad_mask.sum()),
-                        path,
-                        sample,
-                    )
-                    hours = hours.where(~bad_mask, hours % 24)
-                    parts[0] = hours.fillna(0).astype(int).astype(str).str.zfill(2)
-                    time_str = parts[0] + ":" + parts[1].str.zfill(2) + ":" + parts[2].str.zfill(2)
-            df["time"] = pd.to_datetime(time_str, format="%H:%M:%S")
+            # loose file or a member of a zip/tar export, streamed without unpacking
+            with opener(path) as fh:
+                df = _read_samples(fh, engine)
+            df = df[SAMPLE_COLUMNS].rename(columns={"Time": "time", "HR (bpm)": "hr"})
+            bad = 0
+            if not pd.api.types.is_datetime64_dtype(df["time"]):
+                df["time"], bad, sample = parse_times(df["time"])
+            if bad:
+                logger.warning(
+                    "Found %d time values with hour >= 24 in %s (sample %s); normalizing to HH%%24",
+                    bad,
+                    path,
+                    sample,
+                )
             return df, week
     return None, None
 
 
+def iter_hr_chunks(path, chunk_rows: int, opener=open_source) -> Iterator[pd.DataFrame]:
+    """
+    extract_hr's (time, hr) frame for one Polar CSV, `chunk_rows` samples
+    at a time, so a recording of any length is read in constant memory.
+    Times are parsed chunk by chunk exactly as extract_hr parses them; the
+    hour >= 24 warning is logged once, after the last chunk.
+    """
+    if chunk_rows < 1:
+        raise ValueError(f"chunk_rows must be >= 1, got {chunk_rows}")
+    bad, sample = 0, None
+    with opener(path) as fh:
+        for chunk in pd.read_csv(fh, skiprows=2, usecols=SAMPLE_COLUMNS, chunksize=chunk_rows):
+            df = chunk[SAMPLE_COLUMNS].rename(columns={"Time": "time", "HR (bpm)": "hr"})
+            df["time"], n, first = parse_times(df["time"])
+            if n and sample is None:
+                sample = first
+            bad += n
+            yield df.reset_index(drop=True)
+    if bad:
+        logger.warning(
+            "Found %d time values with hour >= 24 in %s (sample %s); normalizing to HH%%24",
+            bad,
+            path,
+            sample,
+        )
+
+
 def recording_window(df: pd.DataFrame) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timedelta] | None:
     if df is None or df.empty or "time" not in df.columns:
         return None
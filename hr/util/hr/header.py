@@ -0,0 +1,146 @@
+import os
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from util.archive import open_source
+from util.parse_path import parse_path
+
+logger = logging.getLogger(__name__)
+
+# A Polar export's two metadata lines plus its column header fit in this;
+# a longer header is read in a second, larger pass
+HEADER_BYTES = 512
+MAX_HEADER_BYTES = 8192
+REQUIRED_COLUMNS = ("Time", "HR (bpm)")
+
+CATALOG_PATH = "./recording_catalog.csv"
+CATALOG_COLUMNS = [
+    "group", "subject", "week", "session",
+    "start", "end", "duration_s", "sport", "name", "rejected", "file",
+]
+CATALOG_SORT_KEYS = ["group", "subject", "week", "session", "file"]
+
+
+class SchemaError(ValueError):
+    """The file is not a Polar HR export extract_hr can read."""
+
+
+def _head_lines(path: str, opener=open_source) -> list[str]:
+    size = HEADER_BYTES
+    while True:
+        with opener(path) as fh:
+            head = fh.read(size)
+        text = head.decode("utf-8-sig", errors="replace")
+        lines = text.splitlines()
+        # the 3rd line is complete once a 4th line (or the end of a short file) follows it
+        if len(lines) > 3 or len(head) < size or size >= MAX_HEADER_BYTES:
+            return lines[:3]
+        size *= 4
+
+
+def _parse_duration(value: str) -> pd.Timedelta | None:
+    try:
+        return pd.to_timedelta(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_start(date: str | None, time: str | None) -> pd.Timestamp | None:
+    if not date or not time:
+        return None
+    # Polar Flow writes dd-mm-yyyy
+    for fmt in ("%d-%m-%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%d.%m.%Y %H:%M:%S"):
+        try:
+            return pd.to_datetime(f"{date} {time}", format=fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def read_header(path: str, opener=open_source) -> dict[str, Any]:
+    """
+    Session metadata and sample columns of a Polar CSV, from its first few
+    hundred bytes only.
+
+    Returns meta (every field of the metadata block), columns, start
+    (absolute Timestamp from Date + Start time, or None), duration
+    (Timedelta or None), sport and name. Raises SchemaError when the file
+    has no metadata block or lacks the Time / HR (bpm) columns, so it can be
+    rejected before a full parse.
+    """
+    lines = _head_lines(str(path), opener)
+    if len(lines) < 3:
+        raise SchemaError("fewer than 3 header lines (metadata block + column header)")
+    keys = [k.strip() for k in lines[0].split(",")]
+    values = [v.strip() for v in lines[1].split(",")]
+    columns = [c.strip() for c in lines[2].split(",")]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise SchemaError(f"missing column(s) {', '.join(missing)}")
+    meta = dict(zip(keys, values + [""] * (len(keys) - len(values))))
+    return {
+        "meta": meta,
+        "columns": columns,
+        "start": _parse_start(meta.get("Date"), meta.get("Start time")),
+        "duration": _parse_duration(meta.get("Duration")),
+        "sport": meta.get("Sport") or None,
+        "name": meta.get("Name") or None,
+    }
+
+
+def index_headers(files: list[str], opener=open_source) -> dict[str, dict[str, Any]]:
+    """
+    read_header for every file; a rejected file maps to {"error": reason},
+    one whose header could not be read (an I/O error or a ReadTimeout from
+    a DeadlineReader `opener`) to {"unread": reason}: that is no verdict on
+    the file, so callers retry it instead of rejecting it.
+    """
+    index = {}
+    for path in files:
+        try:
+            index[path] = read_header(path, opener)
+        except SchemaError as e:
+            logger.warning("Rejecting file with wrong schema (%s): %s", e, path)
+            index[path] = {"error": str(e)}
+        except OSError as e:
+            logger.warning("Could not read header (%s): %s", e, path)
+            index[path] = {"unread": str(e)}
+    return index
+
+
+def save_catalog(headers: dict[str, dict[str, Any]], out_csv: str | os.PathLike = CATALOG_PATH) -> pd.DataFrame:
+    """
+    One row per recording with its absolute start/end (header Date, Start
+    time and Duration), sport and name, or why it was rejected.
+    """
+    rows = []
+    for path, header in headers.items():
+        meta = parse_path(str(path))
+        start = header.get("start")
+        duration = header.get("duration")
+        rows.append({
+            "group": meta["group"],
+            "subject": meta["subject"],
+            "week": meta["week"],
+            "session": meta["session"],
+            "start": start,
+            "end": start + duration if start is not None and duration is not None else None,
+            "duration_s": duration.total_seconds() if duration is not None else None,
+            "sport": header.get("sport"),
+            "name": header.get("name"),
+            "rejected": header.get("error"),
+            "file": path,
+        })
+    df_out = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+    if not df_out.empty:
+        df_out["week"] = pd.array(df_out["week"], dtype="Int64")
+        df_out.sort_values(by=CATALOG_SORT_KEYS, inplace=True, kind="mergesort")
+
+    out_csv = Path(out_csv)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    df_out.to_csv(out_csv, index=False)
+    logger.info("Recording catalog written: %s (%d rows)", out_csv, len(df_out))
+    return df_out
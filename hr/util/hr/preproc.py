@@ -0,0 +1,59 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class Grid1Hz:
+    """
+    A recording placed on a uniform 1 Hz integer grid.
+
+    Index i is `start + i` seconds. `hr` is NaN wherever no usable value
+    exists; `observed` marks seconds that had a row in the file (even if its
+    HR was blank), so `missing` separates dropouts from gaps in the export.
+    """
+
+    def __init__(self, start: pd.Timestamp, hr: np.ndarray, observed: np.ndarray):
+        self.start = start
+        self.hr = hr
+        self.observed = observed
+
+    def __len__(self):
+        return len(self.hr)
+
+    @property
+    def missing(self) -> np.ndarray:
+        return ~self.observed | np.isnan(self.hr)
+
+    def time_at(self, index) -> pd.Timestamp | pd.DatetimeIndex:
+        """Wall-clock time of grid index (or array of indices)."""
+        return self.start + pd.to_timedelta(index, unit="s")
+
+
+def resample_1hz(hr: pd.DataFrame) -> Grid1Hz | None:
+    """
+    Put an extract_hr frame on a 1 Hz grid.
+
+    Times are taken in file order with the same day-rollover handling as
+    recording_window, then rounded to the nearest second. When several rows
+    land on one second the last non-NaN value wins.
+    """
+    if hr is None or hr.empty:
+        return None
+    times = pd.to_datetime(hr["time"]).reset_index(drop=True)
+    day_offsets = (times.diff() < pd.Timedelta(0)).cumsum()
+    adjusted = times + pd.to_timedelta(day_offsets, unit="D")
+
+    start = adjusted.min()
+    offsets = np.rint((adjusted - start).dt.total_seconds().to_numpy()).astype(np.int64)
+    values = hr["hr"].to_numpy(dtype=float)
+
+    n = int(offsets.max()) + 1
+    grid_hr = np.full(n, np.nan)
+    observed = np.zeros(n, dtype=bool)
+    observed[offsets] = True
+    has_value = ~np.isnan(values)
+    grid_hr[offsets[has_value]] = values[has_value]
+    return Grid1Hz(start, grid_hr, observed)
@@ -0,0 +1,225 @@
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+HR_STORE_DIR = "./hr_store"
+INDEX = "index.json"
+
+
+class HRStore:
+    """
+    Append-only columnar store of parsed recordings, one directory per
+    subject:
+
+      <root>/<subject>/time.<gen>.i8  sample times, int64 in each entry's time unit
+      <root>/<subject>/hr.<gen>.f8    HR, float64 (NaN for blank samples)
+      <root>/<subject>/index.json     current generation plus one entry per
+                                      recording: file, stat, group, week,
+                                      session, offset, length, start_time,
+                                      time_unit, hr_int
+
+    Samples are kept in file order, exactly as extract_hr returned them.
+    A changed recording is appended again and its index entry repointed;
+    `compact()` writes the live segments to a new generation. The index is
+    rewritten atomically after the data is on disk, so an interrupted append
+    or compaction is simply invisible. Reads are memory-mapped slices; no
+    text is parsed.
+    """
+
+    def __init__(self, root: str | os.PathLike = HR_STORE_DIR):
+        self.root = Path(root)
+        self._index: dict[str, dict[str, dict[str, Any]]] = {}
+        self._gen: dict[str, int] = {}
+
+    def _dir(self, subject: str) -> Path:
+        return self.root / subject
+
+    def _entries(self, subject: str) -> dict[str, dict[str, Any]]:
+        if subject not in self._index:
+            path = self._dir(subject) / INDEX
+            entries, gen = {}, 0
+            if path.is_file():
+                index = json.loads(path.read_text(encoding="utf-8"))
+                entries = {e["file"]: e for e in index["entries"]}
+                gen = index["generation"]
+            self._index[subject] = entries
+            self._gen[subject] = gen
+        return self._index[subject]
+
+    def _files(self, subject: str, gen: int | None = None) -> tuple[Path, Path]:
+        self._entries(subject)
+        gen = self._gen[subject] if gen is None else gen
+        folder = self._dir(subject)
+        return folder / f"time.{gen}.i8", folder / f"hr.{gen}.f8"
+
+    def _write_index(self, subject: str) -> None:
+        path = self._dir(subject) / INDEX
+        tmp = path.with_suffix(".tmp")
+        entries = sorted(self._entries(subject).values(), key=lambda e: e["offset"])
+        index = {"generation": self._gen[subject], "entries": entries}
+        tmp.write_text(json.dumps(index, indent=1), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _columns(self, subject: str, unit: str) -> tuple[np.ndarray, np.ndarray]:
+        time_file, hr_file = self._files(subject)
+        if not hr_file.is_file() or hr_file.stat().st_size == 0:
+            return np.zeros(0, dtype=f"datetime64[{unit}]"), np.zeros(0)
+        times = np.memmap(time_file, dtype=np.int64, mode="r")
+        hr = np.memmap(hr_file, dtype=np.float64, mode="r")
+        return times.view(f"datetime64[{unit}]"), hr
+
+    def has(self, subject: str, file: str, stat: tuple[int, int]) -> bool:
+        entry = self._entries(subject).get(str(file))
+        return entry is not None and tuple(entry["stat"]) == tuple(stat)
+
+    def add(
+        self,
+        subject: str,
+        file: str,
+        stat: tuple[int, int],
+        hr: pd.DataFrame,
+        week: int,
+        group: str | None,
+        session: str | None,
+    ) -> bool:
+        """Append one extract_hr frame unless the same (file, stat) is stored."""
+        if self.has(subject, file, stat):
+            return False
+        self._dir(subject).mkdir(parents=True, exist_ok=True)
+        time_file, hr_file = self._files(subject)
+
+        times = hr["time"].to_numpy()
+        unit = np.datetime_data(times.dtype)[0]
+        values = hr["hr"].to_numpy(dtype=np.float64)
+        offset = hr_file.stat().st_size // 8 if hr_file.is_file() else 0
+        # times first: a torn write leaves the hr column (which defines the next offset) untouched
+        for path, arr in ((time_file, times.view(np.int64)), (hr_file, values)):
+            with open(path, "r+b" if path.is_file() else "wb") as fh:
+                fh.seek(offset * 8)
+                fh.write(np.ascontiguousarray(arr).tobytes())
+                fh.truncate()
+                fh.flush()
+                os.fsync(fh.fileno())
+
+        self._entries(subject)[str(file)] = {
+            "file": str(file),
+            "stat": list(stat),
+            "group": group,
+            "week": int(week),
+            "session": session,
+            "offset": int(offset),
+            "length": int(len(values)),
+            "start_time": str(times[0]) if len(times) else None,
+            "time_unit": unit,
+            "hr_int": bool(np.issubdtype(hr["hr"].dtype, np.integer)),
+        }
+        self._write_index(subject)
+        return True
+
+    def sessions(self, subject: str) -> pd.DataFrame:
+        """The subject's session index as a DataFrame (one row per recording)."""
+        return pd.DataFrame(
+            list(self._entries(subject).values()),
+            columns=["file", "group", "week", "session", "offset", "length", "start_time"],
+        )
+
+    def slice(self, subject: str, file: str, start_min: float | None = None, end_min: float | None = None):
+        """
+        (times, hr) views of one recording, optionally limited to
+        [start_min, end_min) minutes after its first sample. Day rollovers
+        are handled like recording_window.
+        """
+        entry = self._entries(subject)[str(file)]
+        times, hr = self._columns(subject, entry["time_unit"])
+        lo, hi = entry["offset"], entry["offset"] + entry["length"]
+        times, hr = times[lo:hi], hr[lo:hi]
+        if (start_min is None and end_min is None) or len(times) == 0:
+            return times, hr
+        rollover = np.concatenate(([0], np.cumsum(np.diff(times) < np.timedelta64(0))))
+        elapsed = (times - times[0]) + rollover * np.timedelta64(1, "D")
+        left = 0 if start_min is None else np.searchsorted(elapsed, np.timedelta64(int(start_min * 60e6), "us"), "left")
+        right = len(times) if end_min is None else np.searchsorted(elapsed, np.timedelta64(int(end_min * 60e6), "us"), "left")
+        return times[left:right], hr[left:right]
+
+    def load(self, subject: str, file: str, stat: tuple[int, int] | None = None) -> tuple[pd.DataFrame | None, int | None]:
+        """
+        The (hr, week) extract_hr would return for `file`, or (None, None) if
+        it is not stored (or was stored for a different stat).
+        """
+        entry = self._entries(subject).get(str(file))
+        if entry is None or (stat is not None and tuple(entry["stat"]) != tuple(stat)):
+            return None, None
+        times, hr = self.slice(subject, file)
+        values = np.array(hr)
+        if entry["hr_int"]:
+            values = values.astype(np.int64)
+        return pd.DataFrame({"time": np.array(times), "hr": values}), entry["week"]
+
+    def query(
+        self,
+        subject: str,
+        week: int | None = None,
+        session: str | None = None,
+        group: str | None = None,
+        start_min: float | None = None,
+        end_min: float | None = None,
+    ) -> pd.DataFrame:
+        """
+        Long-format samples for every stored recording of `subject` that
+        matches week/session/group, cut to [start_min, end_min). Columns:
+        group, week, session, time, hr.
+        """
+        frames = []
+        for entry in sorted(self._entries(subject).values(), key=lambda e: (e["group"] or "", e["week"], e["session"] or "")):
+            if week is not None and entry["week"] != int(week):
+                continue
+            if session is not None and entry["session"] != str(session):
+                continue
+            if group is not None and entry["group"] != group:
+                continue
+            times, hr = self.slice(subject, entry["file"], start_min, end_min)
+            frames.append(pd.DataFrame({
+                "group": entry["group"],
+                "week": entry["week"],
+                "session": entry["session"],
+                "time": times,
+                "hr": hr,
+            }))
+        if not frames:
+            return pd.DataFrame(columns=["group", "week", "session", "time", "hr"])
+        return pd.concat(frames, ignore_index=True)
+
+    def compact(self, subject: str) -> int:
+        """Copy the live segments into a new generation; returns samples dropped."""
+        entries = sorted(self._entries(subject).values(), key=lambda e: e["offset"])
+        if not entries:
+            return 0
+        old_time, old_hr = self._files(subject)
+        new_time, new_hr = self._files(subject, self._gen[subject] + 1)
+        total = old_hr.stat().st_size // 8
+        times = np.memmap(old_time, dtype=np.int64, mode="r")
+        hr = np.memmap(old_hr, dtype=np.float64, mode="r")
+        offset = 0
+        with open(new_time, "wb") as ft, open(new_hr, "wb") as fh:
+            for e in entries:
+                lo, hi = e["offset"], e["offset"] + e["length"]
+                ft.write(np.asarray(times[lo:hi]).tobytes())
+                fh.write(np.asarray(hr[lo:hi]).tobytes())
+                e["offset"] = offset
+                offset += e["length"]
+            for f in (ft, fh):
+                f.flush()
+                os.fsync(f.fileno())
+        del times, hr
+        self._gen[subject] += 1
+        self._write_index(subject)
+        old_time.unlink()
+        old_hr.unlink()
+        return total - offset
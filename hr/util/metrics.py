@@ -0,0 +1,118 @@
+import os
+import re
+import time
+import logging
+import resource
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+PREFIX = "boost_hr"
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process and its finished children."""
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class RunMetrics:
+    """
+    Counters and timings of one pipeline run, written as a node_exporter
+    textfile (Prometheus exposition format) so unattended cron runs can be
+    alerted on.
+
+    Every value describes the run that wrote the file, so all metrics are
+    gauges. Stages are timed as laps: `lap("process")` records the time since
+    the previous lap (or the start) under that stage.
+    """
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self.started = time.time()
+        self._mark = time.perf_counter()
+        self._t0 = self._mark
+        # name -> (help, {labels tuple: value})
+        self._metrics: dict[str, tuple[str, dict[tuple, float]]] = {}
+
+    def _series(self, name: str, help_text: str) -> dict[tuple, float]:
+        if name not in self._metrics:
+            self._metrics[name] = (help_text, {})
+        return self._metrics[name][1]
+
+    def set(self, name: str, value: float, help_text: str = "", **labels) -> None:
+        self._series(name, help_text)[tuple(sorted(labels.items()))] = value
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels) -> None:
+        series = self._series(name, help_text)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def lap(self, stage: str | None = None) -> float:
+        """Close the current stage as `stage` (None just restarts the clock)."""
+        now = time.perf_counter()
+        elapsed = now - self._mark
+        self._mark = now
+        if stage is not None:
+            self.inc("stage_duration_seconds", elapsed, "Wall time per pipeline stage.", stage=stage)
+        return elapsed
+
+    def render(self, success: bool, previous_success: float | None = None) -> str:
+        self.set("run_duration_seconds", time.perf_counter() - self._t0, "Wall time of the whole run.")
+        self.set("run_success", int(success), "1 if the last run finished, 0 if it failed.")
+        self.set("last_run_timestamp_seconds", self.started, "Start time of the last run (unix).")
+        last_success = self.started if success else previous_success
+        if last_success is not None:
+            self.set("last_success_timestamp_seconds", last_success, "Start time of the last successful run (unix).")
+        self.set("peak_rss_bytes", peak_rss_bytes(), "Peak resident memory of the run.")
+
+        lines = []
+        for name in sorted(self._metrics):
+            help_text, series = self._metrics[name]
+            full = f"{self.prefix}_{name}"
+            if help_text:
+                lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} gauge")
+            for key, value in sorted(series.items()):
+                lines.append(f"{full}{_labels(dict(key))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _previous_success(self, path: Path) -> float | None:
+        """Carry last_success_timestamp_seconds over from the file a failed run replaces."""
+        if not path.is_file():
+            return None
+        pattern = re.compile(rf"^{self.prefix}_last_success_timestamp_seconds\s+(\S+)$", re.MULTILINE)
+        match = pattern.search(path.read_text(encoding="utf-8"))
+        return float(match.group(1)) if match else None
+
+    def write(self, path: str | os.PathLike, success: bool = True) -> None:
+        """
+        Atomically replace `path` (should end in .prom, inside the
+        node_exporter textfile directory). Failing to write is logged, never
+        raised, so metrics can't break a run.
+        """
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            text = self.render(success, None if success else self._previous_success(path))
+            tmp = path.with_name(f".{path.name}.tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", path, e)
+            return
+        log.info("Metrics written: %s", path)
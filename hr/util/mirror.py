@@ -0,0 +1,139 @@
+import os
+import shutil
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+# Written last by a successful sync, removed first by every sync
+COMPLETE_MARKER = ".mirror-complete"
+
+
+class Mirror:
+    """
+    Local copy of selected parts of a network tree, kept in sync by size and
+    mtime.
+
+    `sync()` only copies files that are new or whose (size, mtime_ns) differ
+    from the mirrored copy (copies keep the source mtime), removes files
+    that disappeared from the source and copies in parallel, since on NFS the
+    per-file latency dominates. Each copy goes to a temp name and is renamed
+    into place. The completion marker is dropped before any change and only
+    rewritten once every file has been verified, so `ready()` is False after
+    an interrupted or failed sync.
+    """
+
+    def __init__(self, src_root: str | os.PathLike, dst_root: str | os.PathLike, workers: int = 8):
+        self.src_root = Path(src_root)
+        self.dst_root = Path(dst_root)
+        self.workers = workers
+
+    @property
+    def marker(self) -> Path:
+        return self.dst_root / COMPLETE_MARKER
+
+    def ready(self) -> bool:
+        return self.marker.is_file()
+
+    def path(self, rel: str | os.PathLike) -> str:
+        return str(self.dst_root / rel)
+
+    def _plan(self, rel: Path, seen: dict[str, Path], todo: list, keep: set) -> None:
+        src = self.src_root / rel
+        dst = self.dst_root / rel
+        if not src.exists():
+            log.warning("Mirror source does not exist, skipping: %s", src)
+            return
+        real = os.path.realpath(src)
+        if src.is_dir() and real in seen:
+            # another spelling of a tree we already mirror (e.g. 3-Experiment -> 3-experiment)
+            target = os.path.relpath(self.dst_root / seen[real], dst.parent)
+            if not (dst.is_symlink() and os.readlink(dst) == target):
+                if dst.is_symlink() or dst.is_file():
+                    dst.unlink()
+                elif dst.is_dir():
+                    shutil.rmtree(dst)
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                os.symlink(target, dst)
+            return
+        if src.is_file():
+            entries = [(rel, src.stat())]
+        else:
+            seen[real] = rel
+            entries = []
+            for dirpath, dirnames, filenames in os.walk(src):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for name in filenames:
+                    if name.startswith("."):
+                        continue
+                    full = Path(dirpath) / name
+                    entries.append((full.relative_to(self.src_root), full.stat()))
+        for file_rel, st in entries:
+            keep.add(file_rel)
+            target = self.dst_root / file_rel
+            try:
+                dst_st = target.stat()
+                if (dst_st.st_size, dst_st.st_mtime_ns) == (st.st_size, st.st_mtime_ns):
+                    continue
+            except FileNotFoundError:
+                pass
+            todo.append((file_rel, st.st_size, st.st_mtime_ns))
+
+    def _copy(self, item: tuple[Path, int, int]) -> None:
+        file_rel, size, mtime_ns = item
+        src = self.src_root / file_rel
+        dst = self.dst_root / file_rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.part")
+        shutil.copyfile(src, tmp)
+        os.utime(tmp, ns=(mtime_ns, mtime_ns))
+        if tmp.stat().st_size != size:
+            tmp.unlink()
+            raise OSError(f"Short copy (source changed during sync?): {src}")
+        os.replace(tmp, dst)
+
+    def _prune(self, roots: list[Path], keep: set) -> int:
+        removed = 0
+        for rel in roots:
+            root = self.dst_root / rel
+            if root.is_symlink() or not root.is_dir():
+                continue
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    full = Path(dirpath) / name
+                    if full.relative_to(self.dst_root) not in keep:
+                        full.unlink()
+                        removed += 1
+        return removed
+
+    def sync(self, rel_paths: list[str | os.PathLike]) -> dict[str, int]:
+        """
+        Bring the mirror of every path in `rel_paths` (files or directories,
+        relative to src_root) up to date. Raises if any copy fails; the
+        mirror is then left not ready.
+        """
+        self.dst_root.mkdir(parents=True, exist_ok=True)
+        self.marker.unlink(missing_ok=True)
+
+        rels = [Path(rel) for rel in rel_paths]
+        seen: dict[str, Path] = {}
+        todo: list[tuple[Path, int, int]] = []
+        keep: set = set()
+        for rel in rels:
+            self._plan(rel, seen, todo, keep)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # list() re-raises the first failed copy
+            list(pool.map(self._copy, todo))
+        removed = self._prune(rels, keep)
+
+        for rel in keep:
+            if not (self.dst_root / rel).exists():
+                raise FileNotFoundError(f"Mirror is missing {rel} after sync")
+        self.marker.write_text(f"{len(keep)} files\n", encoding="utf-8")
+        log.info(
+            "Mirror %s: %d copied, %d removed, %d up to date",
+            self.dst_root, len(todo), removed, len(keep) - len(todo),
+        )
+        return {"copied": len(todo), "removed": removed, "total": len(keep)}
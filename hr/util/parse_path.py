@@ -0,0 +1,29 @@
+import re
+
+
+def parse_path(file_path: str) -> dict:
+    """Extract group, subject, week, and session from file path."""
+    group = None
+    if re.search(r"/Supervised/", file_path, re.IGNORECASE):
+        group = "Supervised"
+    elif re.search(r"/Unsupervised/", file_path, re.IGNORECASE):
+        group = "Unsupervised"
+
+    subject = None
+    match_subject = re.search(r"/(sub\d+)/", file_path, re.IGNORECASE)
+    if match_subject:
+        subject = match_subject.group(1).lower()
+
+    week = None
+    session = None
+    match_ws = re.search(r"_wk(\d+)_ses(\d+(?:\.\d+)?)", file_path, re.IGNORECASE)
+    if match_ws:
+        week = int(match_ws.group(1))
+        session = match_ws.group(2)
+
+    return {
+        "group": group,
+        "subject": subject,
+        "week": week,
+        "session": session,
+    }
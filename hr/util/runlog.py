@@ -0,0 +1,183 @@
+import json
+import time
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+from collections import Counter
+
+LOG_PATH = "main.log"
+JSON_LOG_PATH = "main.jsonl"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+# a warning whose message template repeats is shown this many times, then only counted
+SHOW_REPEATS = 3
+# suppressed messages kept per template for the end-of-run summary
+SAMPLES = 3
+
+_active = None
+
+
+class _TemplateQueueHandler(logging.handlers.QueueHandler):
+    # prepare() merges args into msg; keep the unformatted template as the repeat category
+    def prepare(self, record):
+        record.category = f"{record.name}: {record.msg}"
+        return super().prepare(record)
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "category": getattr(record, "category", None),
+            "message": record.getMessage(),
+        })
+
+
+class AggregatingHandler(logging.Handler):
+    """
+    The run log's single writer. Every record goes to the JSON lines log;
+    the human-readable handlers get each warning template's first
+    SHOW_REPEATS occurrences, and close() adds one line per template with
+    how many more there were and a few of them.
+    """
+
+    def __init__(self, human: list[logging.Handler], structured: logging.Handler):
+        super().__init__()
+        self.human = human
+        self.structured = structured
+        self.counts = Counter()
+        self.samples = {}
+        self.closed = False
+
+    def emit(self, record):
+        category = getattr(record, "category", None) or f"{record.name}: {record.msg}"
+        record.category = category
+        self.structured.handle(record)
+        if record.levelno == logging.WARNING:
+            self.counts[category] += 1
+            if self.counts[category] > SHOW_REPEATS:
+                samples = self.samples.setdefault(category, [])
+                if len(samples) < SAMPLES:
+                    samples.append(record.getMessage())
+                return
+        for handler in self.human:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def summary(self) -> list[dict]:
+        """Per-template warning counts, most frequent first."""
+        return [
+            {
+                "category": category,
+                "count": count,
+                "suppressed": max(count - SHOW_REPEATS, 0),
+                "samples": self.samples.get(category, []),
+            }
+            for category, count in self.counts.most_common()
+        ]
+
+    def close(self):
+        # RunLog.stop closes this first; logging.shutdown() calls again at exit
+        if self.closed:
+            return
+        self.closed = True
+        rows = self.summary()
+        for row in rows:
+            if not row["suppressed"]:
+                continue
+            record = logging.LogRecord(
+                "runlog", logging.WARNING, __file__, 0,
+                "%d more warnings like the above (%s), e.g. %s",
+                (row["suppressed"], row["category"], "; ".join(row["samples"])), None,
+            )
+            for handler in self.human:
+                handler.handle(record)
+        self.structured.stream.write(json.dumps({"summary": rows}) + "\n")
+        for handler in [*self.human, self.structured]:
+            handler.close()
+        super().close()
+
+
+class RunLog:
+    """
+    Queue-based logging for a run: the root logger only enqueues, and one
+    listener thread writes main.log, the console and main.jsonl. Worker
+    processes send their records to the same queue (see worker_options),
+    so lines never interleave and nobody blocks on file I/O.
+    """
+
+    def __init__(self, log_path=LOG_PATH, json_path=JSON_LOG_PATH, level=logging.INFO, mode="w"):
+        formatter = logging.Formatter(LOG_FORMAT)
+        # mode="w" starts a fresh log; "a" appends this run after the earlier ones
+        log_file = logging.FileHandler(log_path, mode=mode, encoding="utf-8")
+        if mode == "a" and log_file.stream.tell():
+            # main.jsonl-style logs already end each run with their summary line
+            log_file.stream.write(f"\n===== {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n")
+        human = [log_file, logging.StreamHandler()]
+        for handler in human:
+            handler.setFormatter(formatter)
+        structured = logging.FileHandler(json_path, mode=mode, encoding="utf-8")
+        structured.setFormatter(_JsonFormatter())
+        self.writer = AggregatingHandler(human, structured)
+
+        self.level = level
+        # a multiprocessing queue: forked workers inherit the root handler and still reach the listener
+        self.queue = multiprocessing.Queue(-1)
+        self.listener = logging.handlers.QueueListener(self.queue, self.writer)
+        root = logging.getLogger()
+        root.handlers = [_TemplateQueueHandler(self.queue)]
+        root.setLevel(level)
+        self.listener.start()
+
+    def stop(self):
+        """Drain the queue and write the repeat summary; safe to call twice."""
+        global _active
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        self.writer.close()
+        logging.getLogger().handlers = []
+        if _active is self:
+            _active = None
+
+
+def command_log(command: str) -> dict:
+    """
+    setup_logging arguments for a CLI command: `run` starts main.log and
+    main.jsonl afresh, every other command appends to its own
+    <command>.log / <command>.jsonl, so a `report` or `merge` after the
+    nightly run leaves that run's log alone.
+    """
+    if command == "run":
+        return {"log_path": LOG_PATH, "json_path": JSON_LOG_PATH, "mode": "w"}
+    return {"log_path": f"{command}.log", "json_path": f"{command}.jsonl", "mode": "a"}
+
+
+def setup_logging(log_path=LOG_PATH, json_path=JSON_LOG_PATH, level=logging.INFO, mode="w") -> RunLog:
+    """Start the run log (once per process) and stop it at exit."""
+    global _active
+    if _active is None:
+        _active = RunLog(log_path, json_path, level, mode)
+        atexit.register(_active.stop)
+    return _active
+
+
+def _attach(queue, level):
+    root = logging.getLogger()
+    root.handlers = [_TemplateQueueHandler(queue)]
+    root.setLevel(level)
+
+
+def worker_options() -> dict:
+    """
+    ProcessPoolExecutor arguments that send a worker's log records to the
+    active run log (needed where workers are spawned rather than forked);
+    empty when no run log is active, so library callers keep their own setup.
+    """
+    if _active is None:
+        return {}
+    return {"initializer": _attach, "initargs": (_active.queue, _active.level)}
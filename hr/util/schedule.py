@@ -0,0 +1,108 @@
+import os
+import json
+import re
+import logging
+from pathlib import Path
+
+from util.parse_path import parse_path
+
+log = logging.getLogger(__name__)
+
+SCHEDULE_PATH = "./.hr_schedule.json"
+# with no earlier run on record, recordings changed within this window count as recent
+RECENT_S = 2 * 24 * 3600
+# each subject's latest weeks with data, which coordinators are still following
+ACTIVE_WEEKS = 2
+TIERS = ("recent", "active", "backfill")
+
+
+def parse_budget(value: str) -> float:
+    """`3600`, `90m`, `1.5h` or `45s` -> seconds."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*", str(value).lower())
+    if not match:
+        raise ValueError(f"Time budget must look like 3600, 45s, 90m or 2h, got: {value}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def _mtime(file: str) -> float:
+    # an archive member changes with its archive
+    from util.archive import split_member
+    member = split_member(file)
+    try:
+        return os.stat(member[0] if member is not None else file).st_mtime
+    except OSError:
+        return 0.0
+
+
+class Schedule:
+    """
+    The order a time-budgeted run scores files in, and the checkpoint that
+    lets the next run pick up what this one left.
+
+    The checkpoint holds when the last run started and the files it did not
+    get to. Finished files need no record: the session cache serves them.
+    """
+
+    def __init__(self, path: str | os.PathLike = SCHEDULE_PATH):
+        self.path = Path(path)
+        self.started = None
+        self.pending = []
+        if self.path.is_file():
+            try:
+                state = json.loads(self.path.read_text(encoding="utf-8"))
+                self.started = state.get("started")
+                self.pending = list(state.get("pending", []))
+            except (OSError, ValueError) as exc:
+                log.warning("Ignoring unreadable schedule checkpoint %s: %s", self.path, exc)
+
+    def order(self, files: list[tuple[str, str, str]], now: float) -> list[tuple[str, str, str, str]]:
+        """
+        `files` ((session, subject, file) as Main._iter_files yields them)
+        as (session, subject, file, tier), highest priority first:
+
+          recent    every file of a subject with a recording changed since
+                    the last run started, newest subject first
+          active    the remaining subjects' files in their latest
+                    ACTIVE_WEEKS weeks
+          backfill  everything else, starting with what the last run left
+                    pending
+
+        The original order is kept within a tier.
+        """
+        since = self.started if self.started is not None else now - RECENT_S
+        newest = {}
+        for _, subject, file in files:
+            newest[subject] = max(newest.get(subject, 0.0), _mtime(file))
+        recent = {subject for subject, mtime in newest.items() if mtime >= since}
+
+        weeks = {}
+        for _, subject, file in files:
+            week = parse_path(str(file))["week"]
+            if week is not None:
+                weeks.setdefault(subject, set()).add(week)
+        active_weeks = {subject: set(sorted(w)[-ACTIVE_WEEKS:]) for subject, w in weeks.items()}
+
+        pending = {file: i for i, file in enumerate(self.pending)}
+        ranked = []
+        for position, (session, subject, file) in enumerate(files):
+            if subject in recent:
+                tier, key = 0, (-newest[subject], subject)
+            elif parse_path(str(file))["week"] in active_weeks.get(subject, ()):
+                tier, key = 1, ()
+            else:
+                tier, key = 2, (file not in pending, pending.get(file, 0))
+            ranked.append(((tier, *key, position), (session, subject, file, TIERS[tier])))
+        ranked.sort(key=lambda item: item[0])
+        return [item for _, item in ranked]
+
+    def save(self, started: float, pending: list[str]) -> None:
+        """Record this run's start and the files it left unscored, in order."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"started": started, "pending": pending}, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.started, self.pending = started, list(pending)
+        if pending:
+            log.info("Schedule checkpoint written: %s (%d files pending)", self.path, len(pending))
+        else:
+            log.info("Schedule checkpoint written: %s (backlog clear)", self.path)
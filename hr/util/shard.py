@@ -0,0 +1,75 @@
+import os
+import zlib
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+SHARD_DIR = "shards"
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """
+    Parse an `i/N` shard spec (1-based, to line up with array task ids).
+    """
+    try:
+        index, count = (int(v) for v in str(spec).split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got: {spec}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index must be in 1..N, got: {spec}")
+    return index, count
+
+
+def in_shard(subject: str, index: int, count: int) -> bool:
+    """
+    Deterministically assign a subject to one shard. crc32 is stable across
+    processes and machines, unlike hash(), so every array task agrees.
+    """
+    return zlib.crc32(subject.lower().encode("utf-8")) % count == index - 1
+
+
+def shard_path(out_csv: str | os.PathLike, index: int, count: int) -> Path:
+    """Where shard `index` of `count` writes its partial copy of `out_csv`."""
+    out_csv = Path(out_csv)
+    return out_csv.parent / SHARD_DIR / f"{out_csv.stem}.{index}-of-{count}{out_csv.suffix}"
+
+
+def merge_shards(
+    out_csv: str | os.PathLike,
+    count: int,
+    sort_by: list[str],
+    numeric: tuple[str, ...] = ("week",),
+) -> pd.DataFrame:
+    """
+    Combine every shard of `out_csv` into the file a single run would write.
+
+    Cells are kept as the exact text each shard wrote and only re-sorted, so
+    the merged CSV matches the unsharded output byte for byte. A subject never
+    spans shards, so a stable sort on the writer's keys restores the original
+    row order.
+    """
+    parts = []
+    for index in range(1, count + 1):
+        path = shard_path(out_csv, index, count)
+        if not path.is_file():
+            raise FileNotFoundError(f"Missing shard output: {path}")
+        parts.append(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+    df_out = pd.concat(parts, ignore_index=True)
+    if not df_out.empty:
+        # blank cells were NaN/NaT in the writer and sorted last there
+        keys = df_out[sort_by].replace("", np.nan)
+        for col in numeric:
+            keys[col] = pd.to_numeric(keys[col], errors="coerce")
+        order = keys.sort_values(by=sort_by, kind="mergesort").index
+        df_out = df_out.loc[order]
+
+    out_csv = Path(out_csv)
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    df_out.to_csv(out_csv, index=False)
+    log.info("Merged %d shards into %s (%d rows)", count, out_csv, len(df_out))
+    return df_out
@@ -0,0 +1,98 @@
+import os
+import heapq
+import pickle
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Rows held in memory before a sorted run is spilled to disk
+RUN_ROWS = 20000
+
+
+def sort_key(values) -> tuple:
+    """
+    Sortable form of one row's sort-column values, ordered like
+    DataFrame.sort_values: missing values (None/NaN/NaT/NA) go last.
+    """
+    return tuple((1, 0) if pd.isna(v) else (0, v) for v in values)
+
+
+class SortedSpool:
+    """
+    Append-only CSV writer whose final output is globally sorted.
+
+    Callers add already formatted CSV lines together with their sort keys.
+    Lines are buffered up to `run_rows`, spilled as sorted runs to a temp
+    directory and k-way merged into `out_csv` on close(), so memory stays at
+    one run regardless of how many rows are written. Equal keys keep their
+    insertion order, matching a stable (mergesort) sort of the whole table.
+    """
+
+    def __init__(
+        self,
+        out_csv: str | os.PathLike,
+        header: str,
+        run_rows: int = RUN_ROWS,
+        tmp_dir: str | os.PathLike | None = None,
+    ):
+        self.out_csv = Path(out_csv)
+        self.header = header
+        self.run_rows = run_rows
+        self._tmp = tempfile.TemporaryDirectory(prefix="spool-", dir=tmp_dir)
+        self._buffer: list[tuple[tuple, int, str]] = []
+        self._runs: list[Path] = []
+        self._seq = 0
+
+    def add(self, keys: list[tuple], lines: list[str]) -> None:
+        for key, line in zip(keys, lines):
+            self._buffer.append((key, self._seq, line))
+            self._seq += 1
+        if len(self._buffer) >= self.run_rows:
+            self._spill()
+
+    def _spill(self) -> None:
+        if not self._buffer:
+            return
+        self._buffer.sort()
+        path = Path(self._tmp.name) / f"run{len(self._runs):05d}.pkl"
+        with open(path, "wb") as fh:
+            for record in self._buffer:
+                pickle.dump(record, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        self._buffer = []
+
+    @staticmethod
+    def _read_run(path: Path) -> Iterator[tuple[tuple, int, str]]:
+        with open(path, "rb") as fh:
+            while True:
+                try:
+                    yield pickle.load(fh)
+                except EOFError:
+                    return
+
+    def close(self) -> int:
+        """Merge all runs into `out_csv`; returns the number of data rows."""
+        self._buffer.sort()
+        sources: list[Any] = [self._read_run(path) for path in self._runs]
+        sources.append(iter(self._buffer))
+
+        self.out_csv.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.out_csv.with_name(self.out_csv.name + ".tmp")
+        rows = 0
+        try:
+            with open(tmp, "w", encoding="utf-8", newline="") as fh:
+                fh.write(self.header)
+                for _, _, line in heapq.merge(*sources):
+                    fh.write(line)
+                    rows += 1
+            os.replace(tmp, self.out_csv)
+        finally:
+            self._buffer = []
+            self._tmp.cleanup()
+        log.debug("Merged %d sorted runs into %s", len(self._runs) + 1, self.out_csv)
+        return rows
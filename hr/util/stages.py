@@ -0,0 +1,235 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+log = logging.getLogger(__name__)
+
+# Bump when a stage's value format changes so old intermediates are ignored
+STAGE_VERSION = 4
+STAGE_DIR = "./.hr_stages"
+
+
+def _stat(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Stage:
+    """
+    One named step of the pipeline.
+
+    run
+      called with the values of `inputs` (in order); returns this stage's value
+    inputs
+      names of earlier stages whose values `run` needs
+    outputs
+      files the stage writes; a cached result is only reused while they are
+      unchanged since it was recorded
+    key
+      optional callable returning anything JSON-serializable that, besides
+      the inputs, decides whether the stage must rerun (a file's stat, a
+      config value, ...)
+    cacheable
+      False to always rerun and never persist the value
+    keep
+      optional callable on the value; False means this result is partial
+      (e.g. a file could not be read) and must not be reused
+    inline
+      keep the (small, JSON-serializable) value in the record itself, so it
+      is available even when the stage is reused
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[..., Any],
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        key: Callable[[], Any] | None = None,
+        cacheable: bool = True,
+        inline: bool = False,
+        keep: Callable[[Any], bool] | None = None,
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.outputs = [str(p) for p in outputs]
+        self.key = key
+        self.cacheable = cacheable
+        self.inline = inline
+        self.keep = keep
+
+
+class StageGraph:
+    """
+    Stages in dependency order, each result persisted under `cache_dir` as
+    <name>.json (key, output stats, inline value) plus <name>.pkl (value).
+
+    `run()` works out which of the requested stages (and their upstream
+    stages) have a record matching their current key and outputs; only the
+    others are executed, and a reused upstream value is unpickled only if a
+    stage that does run needs it. Keys chain through inputs, so a change
+    anywhere upstream reruns everything after it. A stage computed from an
+    uncached (or partial) input is not cached either.
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike | None = STAGE_DIR, metrics=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.metrics = metrics
+        self.stages: dict[str, Stage] = {}
+
+    def add(self, stage: Stage) -> Stage:
+        for name in stage.inputs:
+            if name not in self.stages:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage {name}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def _check(self, names: Iterable[str]) -> None:
+        unknown = [name for name in names if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(unknown)} (choose from {', '.join(self.stages)})")
+
+    def downstream(self, name: str) -> list[str]:
+        """`name` and every stage that (transitively) consumes it."""
+        found = {name}
+        for stage in self.stages.values():
+            if found.intersection(stage.inputs):
+                found.add(stage.name)
+        return [n for n in self.stages if n in found]
+
+    def upstream(self, names: Iterable[str]) -> list[str]:
+        """`names` and every stage they (transitively) read from."""
+        found = set(names)
+        for stage in reversed(list(self.stages.values())):
+            if stage.name in found:
+                found.update(stage.inputs)
+        return [n for n in self.stages if n in found]
+
+    def select(self, stages: Iterable[str] | None = None, start: str | None = None) -> list[str]:
+        """Stages to run: `stages` as given, everything from `start` on, or all."""
+        if stages:
+            stages = list(stages)
+            self._check(stages)
+            return [n for n in self.stages if n in stages]
+        if start:
+            self._check([start])
+            return self.downstream(start)
+        return list(self.stages)
+
+    def _paths(self, name: str) -> tuple[Path, Path]:
+        return self.cache_dir / f"{name}.json", self.cache_dir / f"{name}.pkl"
+
+    def _record(self, name: str) -> dict | None:
+        if self.cache_dir is None:
+            return None
+        meta_path, _ = self._paths(name)
+        if not meta_path.is_file():
+            return None
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _valid(self, stage: Stage, key: str) -> dict | None:
+        if self.cache_dir is None or not stage.cacheable:
+            return None
+        record = self._record(stage.name)
+        if record is None or record.get("key") != key:
+            return None
+        if any(_stat(path) != stat for path, stat in record.get("outputs", {}).items()):
+            return None
+        if not stage.inline and not self._paths(stage.name)[1].is_file():
+            return None
+        return record
+
+    def _load(self, stage: Stage, record: dict) -> Any:
+        if stage.inline:
+            return record.get("value")
+        with open(self._paths(stage.name)[1], "rb") as fh:
+            return pickle.load(fh)
+
+    def _save(self, stage: Stage, key: str, value: Any, volatile: bool) -> None:
+        if self.cache_dir is None:
+            return
+        meta_path, value_path = self._paths(stage.name)
+        # drop the old record first so a crash mid-write can't pair a new key with an old value
+        meta_path.unlink(missing_ok=True)
+        if volatile:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        record = {"key": key, "outputs": {path: _stat(path) for path in stage.outputs}}
+        if stage.inline:
+            record["value"] = value
+        else:
+            tmp = value_path.with_suffix(".tmp")
+            with open(tmp, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, value_path)
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, indent=1), encoding="utf-8")
+        os.replace(tmp, meta_path)
+
+    def run(self, selected: Iterable[str] | None = None) -> dict[str, Any]:
+        """
+        Bring the `selected` stages (default: all) up to date.
+
+        Returns the value of every stage that ran or was loaded; reused
+        stages whose value nobody needed are absent unless inline.
+        """
+        selected = self.select() if selected is None else list(selected)
+        order = self.upstream(selected)
+
+        keys: dict[str, str] = {}
+        records: dict[str, dict | None] = {}
+        for name in order:
+            stage = self.stages[name]
+            extra = stage.key() if stage.key else None
+            payload = [STAGE_VERSION, name, [keys[i] for i in stage.inputs], extra]
+            keys[name] = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            records[name] = self._valid(stage, keys[name])
+
+        # an upstream stage only runs if a stage that runs needs its value and it has none cached
+        todo, needed = set(), set()
+        for name in reversed(order):
+            if (name in selected or name in needed) and records[name] is None:
+                todo.add(name)
+                needed.update(self.stages[name].inputs)
+
+        values: dict[str, Any] = {}
+        volatile: set[str] = set()
+        for name in order:
+            stage = self.stages[name]
+            if name in todo:
+                if name not in selected:
+                    log.info("Stage %s: out of date, running (needed upstream)", name)
+                args = []
+                for i in stage.inputs:
+                    if i not in values:
+                        values[i] = self._load(self.stages[i], records[i])
+                    args.append(values[i])
+                values[name] = stage.run(*args)
+                if (
+                    not stage.cacheable
+                    or (stage.keep is not None and not stage.keep(values[name]))
+                    or volatile.intersection(stage.inputs)
+                ):
+                    volatile.add(name)
+                self._save(stage, keys[name], values[name], name in volatile)
+                log.info("Stage %s: done", name)
+            else:
+                if stage.inline and records[name] is not None:
+                    values[name] = records[name].get("value")
+                if name in selected:
+                    log.info("Stage %s: up to date, reused", name)
+            if self.metrics is not None:
+                self.metrics.lap(name)
+                self.metrics.set("stage_reused", int(name not in todo), "1 if the stage was served from its cached intermediate.", stage=name)
+        return values
@@ -0,0 +1,155 @@
+import os
+import csv
+import json
+import time
+from collections import Counter
+from typing import Any, Iterable
+
+# Standard library only: `main.py status` must answer without pandas or the
+# study mounts, from what the last run left in the working directory.
+
+
+def _stat(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _age(mtime: float) -> str:
+    seconds = max(time.time() - mtime, 0)
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.1f}{unit} ago"
+    return f"{seconds:.0f}s ago"
+
+
+def _rows(path: str) -> int:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return max(sum(1 for _ in csv.reader(fh)) - 1, 0)
+
+
+def stage_status(stage_dir: str | os.PathLike, names: Iterable[str]) -> list[dict[str, Any]]:
+    """
+    What .hr_stages/ holds for each stage: whether a record exists, when it
+    was written and whether the files it wrote are still the ones recorded.
+    Whether its inputs changed is only known once `run` lists the CSVs again.
+    """
+    out = []
+    for name in names:
+        meta_path = os.path.join(stage_dir, f"{name}.json")
+        row = {"stage": name, "state": "no record", "written": None, "value": None}
+        try:
+            with open(meta_path, encoding="utf-8") as fh:
+                record = json.load(fh)
+        except (OSError, ValueError):
+            out.append(row)
+            continue
+        row["written"] = os.path.getmtime(meta_path)
+        changed = [p for p, st in record.get("outputs", {}).items() if _stat(p) != st]
+        row["state"] = f"outputs changed: {', '.join(changed)}" if changed else "recorded"
+        row["value"] = record.get("value")
+        out.append(row)
+    return out
+
+
+def output_status(paths: Iterable[str]) -> list[dict[str, Any]]:
+    """Row count and age of each output CSV (None when missing)."""
+    out = []
+    for path in paths:
+        if not os.path.isfile(path):
+            out.append({"file": path, "rows": None, "written": None})
+            continue
+        out.append({"file": path, "rows": _rows(path), "written": os.path.getmtime(path)})
+    return out
+
+
+def catalog_summary(catalog_path: str | os.PathLike, subject: str | None = None) -> dict[str, Any] | None:
+    """
+    Recordings, subjects, rejected files and hours per group from
+    recording_catalog.csv; with `subject`, also that subject's rows.
+    """
+    if not os.path.isfile(catalog_path):
+        return None
+    recordings, rejected, hours = Counter(), Counter(), Counter()
+    subjects: dict[str, set] = {}
+    rows = []
+    with open(catalog_path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            group = row.get("group") or "?"
+            recordings[group] += 1
+            subjects.setdefault(group, set()).add(row.get("subject"))
+            if row.get("rejected"):
+                rejected[group] += 1
+            try:
+                hours[group] += float(row.get("duration_s") or 0) / 3600
+            except ValueError:
+                pass
+            if subject is not None and row.get("subject") == subject:
+                rows.append(row)
+    groups = {
+        group: {
+            "recordings": recordings[group],
+            "subjects": len(subjects[group]),
+            "rejected": rejected[group],
+            "hours": round(hours[group], 1),
+        }
+        for group in sorted(recordings)
+    }
+    return {"groups": groups, "rows": rows}
+
+
+def metrics_status(path: str | os.PathLike, prefix: str = "boost_hr") -> dict[str, float] | None:
+    """run_success / last_success_timestamp_seconds / duration from a --metrics textfile."""
+    if not path or not os.path.isfile(path):
+        return None
+    wanted = {f"{prefix}_{k}": k for k in ("run_success", "last_success_timestamp_seconds", "run_duration_seconds")}
+    found = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            name, _, value = line.strip().partition(" ")
+            if name in wanted:
+                try:
+                    found[wanted[name]] = float(value)
+                except ValueError:
+                    pass
+    return found
+
+
+def render(stages, outputs, catalog=None, metrics=None) -> str:
+    """Plain-text status report."""
+    lines = ["Stages:"]
+    for row in stages:
+        when = f" ({_age(row['written'])})" if row["written"] else ""
+        value = f" -> {row['value']}" if isinstance(row["value"], (int, float)) else ""
+        lines.append(f"  {row['stage']:<8} {row['state']}{when}{value}")
+    lines.append("Outputs:")
+    for row in outputs:
+        if row["rows"] is None:
+            lines.append(f"  {row['file']}: missing")
+        else:
+            lines.append(f"  {row['file']}: {row['rows']} rows ({_age(row['written'])})")
+    if metrics:
+        success = "ok" if metrics.get("run_success") == 1 else "FAILED"
+        last = metrics.get("last_success_timestamp_seconds")
+        took = metrics.get("run_duration_seconds")
+        lines.append(
+            f"Last run: {success}"
+            + (f" in {took:.0f}s" if took is not None else "")
+            + (f", last success {_age(last)}" if last else "")
+        )
+    if catalog is not None:
+        lines.append("Catalog:")
+        for group, row in catalog["groups"].items():
+            lines.append(
+                f"  {group:<13} {row['recordings']} recordings, {row['subjects']} subjects, "
+                f"{row['rejected']} rejected, {row['hours']} h"
+            )
+        for row in catalog["rows"]:
+            note = f"  REJECTED: {row['rejected']}" if row.get("rejected") else ""
+            lines.append(
+                f"  {row['group']} wk{row['week']} ses{row['session']} {row['start'] or '-'} "
+                f"{row['duration_s'] or '-'}s{note}"
+            )
+    return "\n".join(lines)
@@ -2,12 +2,26 @@ import pandas as pd
 from util.zone.midpoint import midpoint_snap
 import logging
 logger = logging.getLogger(__name__)
-def extract_zones(path, subject, snap_to=5):
+
+
+def read_zone_sheet(path):
+    """
+    Read the HR ranges workbook once so callers looping over many
+    subjects don't pay for `pd.read_excel` on every file.
+    """
+    return pd.read_excel(path, sheet_name='Sheet1')
+
+
+def raw_zones(sheet, subject):
+    """
+    Return the subject's unsnapped zone row from an already-read sheet.
+    Columns: boost_id, z1_start, z1_end, ..., z5_start, z5_end
+    """
     if subject.startswith('sub'):
         subject = subject.removeprefix('sub')
 
     # 1) Read in only the 5 zones for that subject
-    df = pd.read_excel(path, sheet_name='Sheet1')
+    df = sheet
     zone_cols = df.columns[5:15].tolist()   # this is ['Zone 1…', 'Unnamed: 6', … 'Unnamed: 14']
     all_cols  = ['BOOST ID'] + zone_cols     # length = 1 + 10 = 11
 
@@ -17,10 +31,7 @@ def extract_zones(path, subject, snap_to=5):
     if sub.empty:
         raise ValueError(f"No rows matching ID {subject}")
 
-    # 3) Now sub is a DataFrame with exactly 11 cols:
-    row = sub.iloc[0]  # a Series of length 11
-
-    # 4) If you really need a new DataFrame with renamed cols:
+    # 3) If you really need a new DataFrame with renamed cols:
     new_names = {
         'BOOST ID': 'boost_id',
         zone_cols[0]: 'z1_start',
@@ -35,5 +46,11 @@ def extract_zones(path, subject, snap_to=5):
         zone_cols[-1]: 'z5_end',
     }
 
-    zones = sub.rename(columns=new_names).reset_index(drop=True)
+    return sub.iloc[[0]].rename(columns=new_names).reset_index(drop=True)
+
+
+def extract_zones(path, subject, snap_to=5, sheet=None):
+    if sheet is None:
+        sheet = read_zone_sheet(path)
+    zones = raw_zones(sheet, subject)
     return midpoint_snap(zones, snap_to=snap_to)
@@ -1,14 +1,15 @@
-import pandas as pd
-def midpoint_snap(zones: pd.DataFrame, snap_to: int = 5) -> pd.DataFrame:
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def snap_bounds(starts: list[int], ends: list[int], snap_to: int = 5) -> tuple[list[int], list[int]]:
     """
-    zones: 1-row DataFrame with columns
-      z1_start, z1_end, z2_start, z2_end, …, z5_start, z5_end
-    snap_to: round each midpoint to nearest multiple of this.
+    The snapped (starts, ends) midpoint_snap builds, from plain lists of
+    zone starts and ends; no pandas, for qc/quicklook.py.
     """
-    n = zones.shape[1] // 2
-    # extract lists of ints
-    starts = [int(zones[f"z{i+1}_start"].iat[0]) for i in range(n)]
-    ends   = [int(zones[f"z{i+1}_end"].iat[0])   for i in range(n)]
+    n = len(starts)
 
     # compute snapped midpoints between each zone boundary
     mids = []
@@ -20,6 +21,23 @@ def midpoint_snap(zones: pd.DataFrame, snap_to: int = 5) -> pd.DataFrame:
     # build new starts/ends
     new_starts = [starts[0]] + [m + 1 for m in mids]
     new_ends   = mids + [ends[-1]]
+    return new_starts, new_ends
+
+
+def midpoint_snap(zones: "pd.DataFrame", snap_to: int = 5) -> "pd.DataFrame":
+    """
+    zones: 1-row DataFrame with columns
+      z1_start, z1_end, z2_start, z2_end, …, z5_start, z5_end
+    snap_to: round each midpoint to nearest multiple of this.
+    """
+    import pandas as pd
+
+    n = zones.shape[1] // 2
+    # extract lists of ints
+    starts = [int(zones[f"z{i+1}_start"].iat[0]) for i in range(n)]
+    ends   = [int(zones[f"z{i+1}_end"].iat[0])   for i in range(n)]
+
+    new_starts, new_ends = snap_bounds(starts, ends, snap_to)
 
     # assemble result
     out = {}
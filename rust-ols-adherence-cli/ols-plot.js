@@ -15,7 +15,7 @@ const sharp = require('sharp');
    CHANGE ME (paths/sizes)
    ======================= */
 const DATA_CSV   = path.resolve('./data.csv');       
-const MODEL_JSON = path.resolve('./model.json');      
+const MODEL_JSON = path.resolve('./model.json');       // or a fit-zones bundle (models.json)
 const OUTPUT_DIR = path.resolve('../docs/meta_plot');             // <-- CHANGE ME (where files go)
 
 const SVG_FILENAME = 'scatter_model.svg';
@@ -31,6 +31,31 @@ const PNG_SCALE = 2;
 (async function main() {
   await fs.mkdir(OUTPUT_DIR, { recursive: true });
 
+  const model = JSON.parse(await fs.readFile(MODEL_JSON, 'utf8'));
+
+  // ---- fit-zones bundle: one chart per model, from the points stored in it ----
+  if (Array.isArray(model.models)) {
+    for (const m of model.models) {
+      if (!m.params) {
+        console.log(`Skipping ${m.key}: ${m.error || 'not fitted'}`);
+        continue;
+      }
+      const [yName, xName] = m.spec.split('~');
+      const proportion = v => v === 'compliance' || v === 'bounded_met' || v.endsWith('_prop') || v === 'adherence';
+      await render({
+        data: m.points.map(p => ({ x: p.x, y: p.y, den: p.n })),
+        params: m.params,
+        xLabel: `${xName} (x)`,
+        yLabel: `${yName} (y)`,
+        title: m.group ? `${m.spec} — ${m.group}` : m.spec,
+        clampX: proportion(xName),
+        clampY: proportion(yName),
+        base: m.key.replace(/[^A-Za-z0-9]+/g, '_'),
+      });
+    }
+    return;
+  }
+
   // ---- Load data ----
   const csvText = await fs.readFile(DATA_CSV, 'utf8');
   const data = d3.csvParse(csvText, d => ({
@@ -39,8 +64,23 @@ const PNG_SCALE = 2;
     den: d.unsup_den == null || d.unsup_den === '' ? null : +d.unsup_den
   }));
 
-  const model = JSON.parse(await fs.readFile(MODEL_JSON, 'utf8'));
-  const { beta0, beta1 } = model.params;
+  await render({
+    data,
+    params: model.params,
+    xLabel: 'sup_prop (x)',
+    yLabel: 'unsup_prop (y)',
+    title: null,
+    clampX: true,
+    clampY: true,
+    base: null,
+  });
+})().catch(err => {
+  console.error(err);
+  process.exit(1);
+});
+
+async function render({ data, params, xLabel, yLabel, title, clampX, clampY, base }) {
+  const { beta0, beta1 } = params;
 
   // ---- Set up headless SVG via jsdom ----
   const dom = new JSDOM(`<!DOCTYPE html><svg id="chart" width="${WIDTH}" height="${HEIGHT}"></svg>`, {
@@ -61,18 +101,21 @@ const PNG_SCALE = 2;
   const yExtent = d3.extent(data, d => d.y);
   const pad = 0.05;
 
+  // proportions stay within [0,1]; other variables (week, MAZD) pad by 5% of their span
+  const domain = (extent, clamp) => {
+    const lo = extent[0] ?? 0;
+    const hi = extent[1] ?? 1;
+    if (clamp) return [Math.max(0, lo - pad), Math.min(1, hi + pad)];
+    const p = (hi - lo || 1) * pad;
+    return [lo - p, hi + p];
+  };
+
   const xScale = d3.scaleLinear()
-    .domain([
-      Math.max(0, (xExtent[0] ?? 0) - pad),
-      Math.min(1, (xExtent[1] ?? 1) + pad)
-    ])
+    .domain(domain(xExtent, clampX))
     .range([0, innerW]);
 
   const yScale = d3.scaleLinear()
-    .domain([
-      Math.max(0, (yExtent[0] ?? 0) - pad),
-      Math.min(1, (yExtent[1] ?? 1) + pad)
-    ])
+    .domain(domain(yExtent, clampY))
     .nice()
     .range([innerH, 0]);
 
@@ -105,7 +148,7 @@ const PNG_SCALE = 2;
       .attr('y', 36)
       .attr('fill', '#333')
       .attr('text-anchor', 'end')
-      .text('sup_prop (x)')
+      .text(xLabel)
     );
 
   g.append('g')
@@ -118,7 +161,7 @@ const PNG_SCALE = 2;
       .attr('dy', '0.71em')
       .attr('fill', '#333')
       .attr('text-anchor', 'end')
-      .text('unsup_prop (y)')
+      .text(yLabel)
     );
 
   // ---- Scatter ----
@@ -165,6 +208,15 @@ const PNG_SCALE = 2;
     .attr('font-size', '12px')
     .text(`ŷ = ${fmt(beta0)} + ${fmt(beta1)}·x`);
 
+  if (title) {
+    g.append('text')
+      .attr('x', 6)
+      .attr('y', 14)
+      .attr('fill', '#333')
+      .attr('font-size', '12px')
+      .text(title);
+  }
+
   // ---- Extract SVG string ----
   const svgNode = document.querySelector('svg');
   svgNode.setAttribute('role', 'img');
@@ -172,11 +224,11 @@ const PNG_SCALE = 2;
   const svgString = svgNode.outerHTML;
 
   // ---- Write SVG ----
-  const svgPath = path.join(OUTPUT_DIR, SVG_FILENAME);
+  const svgPath = path.join(OUTPUT_DIR, base ? `${base}.svg` : SVG_FILENAME);
   await fs.writeFile(svgPath, svgString, 'utf8');
 
   // ---- Write PNG (via sharp) ----
-  const pngPath = path.join(OUTPUT_DIR, PNG_FILENAME);
+  const pngPath = path.join(OUTPUT_DIR, base ? `${base}.png` : PNG_FILENAME);
   // Use density to scale rasterization resolution
   const density = Math.round(72 * PNG_SCALE); // base 72dpi * scale
   await sharp(Buffer.from(svgString), { density })
@@ -184,8 +236,5 @@ const PNG_SCALE = 2;
     .toFile(pngPath);
 
   console.log(`Saved:\n  SVG: ${svgPath}\n  PNG: ${pngPath}`);
-})().catch(err => {
-  console.error(err);
-  process.exit(1);
-});
+}
 
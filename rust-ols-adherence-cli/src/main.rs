@@ -1,11 +1,13 @@
 use clap::{Parser, Subcommand, ValueEnum};
-use anyhow::Result;
+use anyhow::{Context, Result};
 use serde::{Serialize, Deserialize};
 
 mod model;
 mod io;
+mod zones;
 
 use model::{fit_wls, make_weights, OlsParams, Weighting};
+use zones::{ModelBundle, ModelSpec, ZoneAggregate};
 
 #[derive(Parser)]
 #[command(name = "rust-ols-adherence-cli", version)]
@@ -18,6 +20,8 @@ struct Cli {
 enum Commands {
     /// Fit OLS/WLS model from CSV or inline pairs
     Fit(FitArgs),
+    /// Fit a family of models straight from the pipeline's zone_out.csv into one bundle
+    FitZones(FitZonesArgs),
     /// Predict using a saved model
     Predict(PredictArgs),
 }
@@ -25,6 +29,19 @@ enum Commands {
 #[derive(Copy, Clone, Debug, ValueEnum)]
 enum WeightsArg { None, N, Binomial }
 
+impl From<WeightsArg> for Weighting {
+    fn from(w: WeightsArg) -> Self {
+        match w {
+            WeightsArg::None => Weighting::None,
+            WeightsArg::N => Weighting::N,
+            WeightsArg::Binomial => Weighting::Binomial,
+        }
+    }
+}
+
+#[derive(Copy, Clone, Debug, PartialEq, Eq, ValueEnum)]
+enum ByArg { Group, All, Both }
+
 #[derive(Parser)]
 struct FitArgs {
     /// CSV path with columns: sup_prop, unsup_prop, (optional) unsup_den
@@ -48,13 +65,43 @@ struct FitArgs {
     out: String,
 }
 
+#[derive(Parser)]
+struct FitZonesArgs {
+    /// zone_out.csv written by hr/main.py ("-" reads stdin)
+    #[arg(long, default_value = "../zone_out.csv")]
+    zone_out: String,
+
+    /// Model as response~predictor; repeat for several. Responses: compliance, mazd,
+    /// bounded_met (per subject-week); predictors: week, adherence (sessions / 5).
+    /// unsup_prop~sup_prop is the per-subject model `fit` uses.
+    /// Default: compliance and mazd against week and adherence, plus unsup_prop~sup_prop
+    #[arg(long = "model", value_name = "SPEC")]
+    models: Vec<String>,
+
+    /// Fit subject-week models per group (Supervised, Unsupervised), on all rows, or both
+    #[arg(long, value_enum, default_value_t = ByArg::Group)]
+    by: ByArg,
+
+    /// Weighting strategy: none | n (sessions behind each point) | binomial (proportions only)
+    #[arg(long, value_enum, default_value_t = WeightsArg::None)]
+    weights: WeightsArg,
+
+    /// Output bundle JSON path
+    #[arg(long, default_value = "models.json")]
+    out: String,
+}
+
 #[derive(Parser)]
 struct PredictArgs {
-    /// Model JSON path
+    /// Model JSON path (a `fit` model or a `fit-zones` bundle)
     #[arg(long)]
     model: String,
 
-    /// x = supervised adherence proportion
+    /// Model key inside a bundle, e.g. "compliance~week|Supervised"
+    #[arg(long)]
+    key: Option<String>,
+
+    /// x = supervised adherence proportion (or the bundle model's predictor)
     #[arg(long)]
     x: f64,
 
@@ -72,6 +119,7 @@ fn main() -> Result<()> {
     let cli = Cli::parse();
     match cli.command {
         Commands::Fit(args) => cmd_fit(args),
+        Commands::FitZones(args) => cmd_fit_zones(args),
         Commands::Predict(args) => cmd_predict(args),
     }
 }
@@ -104,11 +152,7 @@ fn cmd_fit(args: FitArgs) -> Result<()> {
     };
 
     // Choose weighting
-    let strategy = match args.weights {
-        WeightsArg::None => Weighting::None,
-        WeightsArg::N => Weighting::N,
-        WeightsArg::Binomial => Weighting::Binomial,
-    };
+    let strategy: Weighting = args.weights.into();
 
     let w = make_weights(&y, m_opt.as_deref(), strategy)?;
     let params = fit_wls(&x, &y, w.as_deref())?;
@@ -126,10 +170,78 @@ fn cmd_fit(args: FitArgs) -> Result<()> {
     Ok(())
 }
 
+fn cmd_fit_zones(args: FitZonesArgs) -> Result<()> {
+    let specs: Vec<ModelSpec> = if args.models.is_empty() {
+        zones::default_specs()
+    } else {
+        args.models.iter().map(|s| ModelSpec::parse(s)).collect::<Result<_>>()?
+    };
+
+    // one pass over the file, however many models are fitted from it
+    let agg = if args.zone_out == "-" {
+        ZoneAggregate::from_reader(std::io::stdin().lock())?
+    } else {
+        let file = std::fs::File::open(&args.zone_out)
+            .with_context(|| format!("opening {}", args.zone_out))?;
+        ZoneAggregate::from_reader(std::io::BufReader::new(file))?
+    };
+
+    let mut groups: Vec<Option<&str>> = Vec::new();
+    if args.by != ByArg::All {
+        groups.extend([Some("Supervised"), Some("Unsupervised")]);
+    }
+    if args.by != ByArg::Group {
+        groups.push(None);
+    }
+
+    let strategy: Weighting = args.weights.into();
+    let mut models = Vec::new();
+    for spec in specs {
+        // the per-subject model pairs both groups, so it is fitted once
+        let spec_groups: &[Option<&str>] = if spec == ModelSpec::SubjectAdherence { &[None] } else { &groups };
+        for &group in spec_groups {
+            models.push(zones::fit_one(spec, group, agg.points(spec, group), strategy));
+        }
+    }
+
+    let bundle = ModelBundle { source: args.zone_out.clone(), rows: agg.rows, models };
+    std::fs::write(&args.out, serde_json::to_vec_pretty(&bundle)?)?;
+
+    println!("Read {} rows from {} ({} without a week skipped)", agg.rows, args.zone_out, agg.skipped);
+    for m in &bundle.models {
+        match (&m.params, &m.error) {
+            (Some(p), _) => println!(
+                "{:<40} n={:<4} beta0={:>10.6} beta1={:>10.6} sigma^2={:.6}",
+                m.key, p.n, p.beta0, p.beta1, p.sigma2
+            ),
+            (None, err) => println!(
+                "{:<40} not fitted: {}",
+                m.key,
+                err.as_deref().unwrap_or("unknown error")
+            ),
+        }
+    }
+    println!("Model bundle saved to {}", args.out);
+
+    Ok(())
+}
+
 fn cmd_predict(args: PredictArgs) -> Result<()> {
     let bytes = std::fs::read(&args.model)?;
-    let stored: StoredModel = serde_json::from_slice(&bytes)?;
-    let p = stored.params;
+    let p = if let Some(key) = &args.key {
+        let bundle: ModelBundle = serde_json::from_slice(&bytes)?;
+        let m = bundle.get(key).ok_or_else(|| {
+            let keys: Vec<&str> = bundle.models.iter().map(|m| m.key.as_str()).collect();
+            anyhow::anyhow!("no model {:?} in {} (have: {})", key, args.model, keys.join(", "))
+        })?;
+        m.params.ok_or_else(|| {
+            anyhow::anyhow!("model {:?} was not fitted: {}", key, m.error.as_deref().unwrap_or("unknown error"))
+        })?
+    } else {
+        let stored: StoredModel = serde_json::from_slice(&bytes)
+            .context("not a single-model file; pass --key to pick a model from a bundle")?;
+        stored.params
+    };
     let yhat = p.predict(args.x);
     let se_mean = p.se_mean(args.x);
     let se_pred = p.se_pred(args.x);
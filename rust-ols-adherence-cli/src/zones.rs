@@ -0,0 +1,350 @@
+use std::collections::{BTreeMap, BTreeSet};
+use std::io::Read;
+
+use anyhow::{Context, Result};
+use csv::{ReaderBuilder, Trim};
+use serde::{Deserialize, Serialize};
+
+use crate::model::{fit_wls, make_weights, OlsParams, Weighting};
+
+/// Planned sessions per week (SESSIONS_PER_WEEK in hr/plot/cube.py)
+pub const SESSIONS_PER_WEEK: f64 = 5.0;
+
+/// Subjects with fewer unsupervised sessions are left out of unsup_prop~sup_prop
+/// (same rule as AdherenceCube.save_for_rust; here only sessions with a zone_out row count)
+pub const MIN_UNSUP_SESSIONS: usize = 6;
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Response {
+    Compliance,
+    Mazd,
+    BoundedMet,
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Predictor {
+    Week,
+    Adherence,
+}
+
+/// One model family member, written as `response~predictor`.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum ModelSpec {
+    /// per subject-week cell: mean response vs week or observed adherence
+    Cell(Response, Predictor),
+    /// per subject: unsupervised vs supervised adherence proportion (the classic model)
+    SubjectAdherence,
+}
+
+impl ModelSpec {
+    pub fn parse(spec: &str) -> Result<Self> {
+        let (resp, pred) = spec
+            .split_once('~')
+            .ok_or_else(|| anyhow::anyhow!("model spec must look like response~predictor, got {:?}", spec))?;
+        let (resp, pred) = (resp.trim().to_ascii_lowercase(), pred.trim().to_ascii_lowercase());
+        if resp == "unsup_prop" && pred == "sup_prop" {
+            return Ok(ModelSpec::SubjectAdherence);
+        }
+        let response = match resp.as_str() {
+            "compliance" => Response::Compliance,
+            "mazd" => Response::Mazd,
+            "bounded_met" => Response::BoundedMet,
+            _ => anyhow::bail!("unknown response {:?} (compliance, mazd, bounded_met, unsup_prop)", resp),
+        };
+        let predictor = match pred.as_str() {
+            "week" => Predictor::Week,
+            "adherence" => Predictor::Adherence,
+            _ => anyhow::bail!("unknown predictor {:?} (week, adherence)", pred),
+        };
+        Ok(ModelSpec::Cell(response, predictor))
+    }
+
+    pub fn name(&self) -> String {
+        match self {
+            ModelSpec::SubjectAdherence => "unsup_prop~sup_prop".to_string(),
+            ModelSpec::Cell(r, p) => {
+                let r = match r {
+                    Response::Compliance => "compliance",
+                    Response::Mazd => "mazd",
+                    Response::BoundedMet => "bounded_met",
+                };
+                let p = match p {
+                    Predictor::Week => "week",
+                    Predictor::Adherence => "adherence",
+                };
+                format!("{}~{}", r, p)
+            }
+        }
+    }
+
+    /// Responses in [0, 1] that binomial weighting makes sense for
+    fn is_proportion(&self) -> bool {
+        !matches!(self, ModelSpec::Cell(Response::Mazd, _))
+    }
+}
+
+/// The family fitted when no --model is given.
+pub fn default_specs() -> Vec<ModelSpec> {
+    let mut specs = Vec::new();
+    for r in [Response::Compliance, Response::Mazd] {
+        for p in [Predictor::Week, Predictor::Adherence] {
+            specs.push(ModelSpec::Cell(r, p));
+        }
+    }
+    specs.push(ModelSpec::SubjectAdherence);
+    specs
+}
+
+#[derive(Debug, Default, Clone, Copy)]
+struct Mean {
+    sum: f64,
+    n: usize,
+}
+
+impl Mean {
+    fn add(&mut self, v: Option<f64>) {
+        if let Some(v) = v {
+            if v.is_finite() {
+                self.sum += v;
+                self.n += 1;
+            }
+        }
+    }
+
+    fn get(&self) -> Option<f64> {
+        if self.n > 0 { Some(self.sum / self.n as f64) } else { None }
+    }
+}
+
+/// Running totals for one (group, subject, week) cell.
+#[derive(Debug, Default)]
+struct Cell {
+    sessions: BTreeSet<u32>,
+    compliance: Mean,
+    mazd: Mean,
+    bounded_met: Mean,
+}
+
+/// Running totals for one (group, subject).
+#[derive(Debug, Default)]
+struct SubjectTotals {
+    rows: usize,
+    max_session: Option<u32>,
+}
+
+/// zone_out.csv folded into per-cell and per-subject totals as it streams;
+/// memory is bounded by subjects x weeks, not by rows.
+#[derive(Debug, Default)]
+pub struct ZoneAggregate {
+    cells: BTreeMap<(String, String, u32), Cell>,
+    subjects: BTreeMap<(String, String), SubjectTotals>,
+    pub rows: usize,
+    pub skipped: usize,
+}
+
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub struct Point {
+    pub subject: String,
+    pub week: Option<u32>,
+    pub x: f64,
+    pub y: f64,
+    /// observations behind y (scored sessions, or unsup_den for unsup_prop~sup_prop)
+    pub n: usize,
+}
+
+fn opt_f64(s: &str) -> Option<f64> {
+    let s = s.trim();
+    if s.is_empty() { None } else { s.parse().ok() }
+}
+
+fn opt_bool(s: &str) -> Option<f64> {
+    match s.trim().to_ascii_lowercase().as_str() {
+        "true" | "1" | "1.0" => Some(1.0),
+        "false" | "0" | "0.0" => Some(0.0),
+        _ => None,
+    }
+}
+
+impl ZoneAggregate {
+    /// Stream zone_out.csv (header row required; columns found by name).
+    pub fn from_reader<R: Read>(reader: R) -> Result<Self> {
+        let mut rdr = ReaderBuilder::new()
+            .has_headers(true)
+            .trim(Trim::All)
+            .flexible(true)
+            .from_reader(reader);
+
+        let headers = rdr.headers()?.clone();
+        let norm = |s: &str| s.trim().trim_start_matches('\u{feff}').to_ascii_lowercase();
+        let col = |name: &str| -> Result<usize> {
+            headers
+                .iter()
+                .position(|h| norm(h) == name)
+                .ok_or_else(|| anyhow::anyhow!("zone_out.csv has no {:?} column", name))
+        };
+        let gi = col("group")?;
+        let si = col("subject")?;
+        let wi = col("week")?;
+        let sess = col("session")?;
+        let t_in = col("time_in_allowed_s")?;
+        let t_above = col("time_above_s")?;
+        let t_below = col("time_below_s")?;
+        let met = col("bounded_met")?;
+        let mazd = col("mazd")?;
+
+        let mut agg = ZoneAggregate::default();
+        for (line, rec) in rdr.records().enumerate() {
+            let rec = rec.with_context(|| format!("reading zone_out.csv record {}", line + 1))?;
+            let get = |i: usize| rec.get(i).unwrap_or("");
+            agg.rows += 1;
+
+            let week: u32 = match get(wi).trim().parse() {
+                Ok(w) => w,
+                Err(_) => {
+                    agg.skipped += 1;
+                    continue;
+                }
+            };
+            let group = get(gi).to_string();
+            let subject = get(si).to_string();
+
+            // parts of a split upload ("3.1") count towards session 3 but not the denominator
+            let session = get(sess).trim();
+            let whole = opt_f64(session).filter(|s| *s >= 0.0).map(|s| s.trunc() as u32);
+            let is_whole = !session.is_empty() && session.chars().all(|c| c.is_ascii_digit());
+
+            let compliance = match (opt_f64(get(t_in)), opt_f64(get(t_above)), opt_f64(get(t_below))) {
+                (Some(a), Some(b), Some(c)) if a + b + c > 0.0 => Some(a / (a + b + c)),
+                _ => None,
+            };
+
+            let cell = agg.cells.entry((group.clone(), subject.clone(), week)).or_default();
+            if let Some(s) = whole {
+                cell.sessions.insert(s);
+            }
+            cell.compliance.add(compliance);
+            cell.mazd.add(opt_f64(get(mazd)));
+            cell.bounded_met.add(opt_bool(get(met)));
+
+            let totals = agg.subjects.entry((group, subject)).or_default();
+            totals.rows += 1;
+            if let (true, Some(s)) = (is_whole, whole) {
+                totals.max_session = Some(totals.max_session.map_or(s, |m| m.max(s)));
+            }
+        }
+        Ok(agg)
+    }
+
+    /// Points of one model; `group` None pools Supervised and Unsupervised.
+    pub fn points(&self, spec: ModelSpec, group: Option<&str>) -> Vec<Point> {
+        match spec {
+            ModelSpec::Cell(response, predictor) => self
+                .cells
+                .iter()
+                .filter(|((g, _, _), _)| group.map_or(true, |want| g == want))
+                .filter_map(|((_, subject, week), cell)| {
+                    let mean = match response {
+                        Response::Compliance => cell.compliance,
+                        Response::Mazd => cell.mazd,
+                        Response::BoundedMet => cell.bounded_met,
+                    };
+                    let y = mean.get()?;
+                    let x = match predictor {
+                        Predictor::Week => *week as f64,
+                        Predictor::Adherence => cell.sessions.len() as f64 / SESSIONS_PER_WEEK,
+                    };
+                    Some(Point { subject: subject.clone(), week: Some(*week), x, y, n: mean.n })
+                })
+                .collect(),
+            ModelSpec::SubjectAdherence => {
+                let subjects: BTreeSet<&String> = self.subjects.keys().map(|(_, s)| s).collect();
+                let empty = SubjectTotals::default();
+                subjects
+                    .into_iter()
+                    .filter_map(|subject| {
+                        let sup = self.subjects.get(&("Supervised".to_string(), subject.clone())).unwrap_or(&empty);
+                        let unsup = self.subjects.get(&("Unsupervised".to_string(), subject.clone())).unwrap_or(&empty);
+                        if unsup.rows < MIN_UNSUP_SESSIONS {
+                            return None;
+                        }
+                        let sup_den = sup.max_session.unwrap_or(0) as usize;
+                        let unsup_den = unsup.max_session.unwrap_or(0) as usize;
+                        let sup_den_eff = if sup_den > 0 { sup_den } else { sup.rows.max(1) };
+                        let unsup_den_eff = if unsup_den > 0 { unsup_den } else { unsup.rows.max(1) };
+                        Some(Point {
+                            subject: subject.clone(),
+                            week: None,
+                            x: sup.rows as f64 / sup_den_eff as f64,
+                            y: unsup.rows as f64 / unsup_den_eff as f64,
+                            n: unsup_den,
+                        })
+                    })
+                    .collect()
+            }
+        }
+    }
+}
+
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub struct FittedModel {
+    /// e.g. "compliance~week|Supervised"; what `predict --key` selects
+    pub key: String,
+    pub spec: String,
+    pub group: Option<String>,
+    pub weights: String,
+    /// None when the fit failed (too few points, no variation in x); see error
+    pub params: Option<OlsParams>,
+    pub error: Option<String>,
+    pub points: Vec<Point>,
+}
+
+#[derive(Debug, Clone, Serialize, Deserialize)]
+pub struct ModelBundle {
+    pub source: String,
+    pub rows: usize,
+    pub models: Vec<FittedModel>,
+}
+
+impl ModelBundle {
+    pub fn get(&self, key: &str) -> Option<&FittedModel> {
+        self.models.iter().find(|m| m.key == key)
+    }
+}
+
+fn weighting_name(w: Weighting) -> &'static str {
+    match w {
+        Weighting::None => "none",
+        Weighting::N => "n",
+        Weighting::Binomial => "binomial",
+    }
+}
+
+/// Fit one model; a failed fit is recorded in the bundle instead of aborting the family.
+pub fn fit_one(spec: ModelSpec, group: Option<&str>, points: Vec<Point>, strategy: Weighting) -> FittedModel {
+    // binomial weights assume a proportion; MAZD models fall back to n weights
+    let strategy = match strategy {
+        Weighting::Binomial if !spec.is_proportion() => Weighting::N,
+        s => s,
+    };
+    let x: Vec<f64> = points.iter().map(|p| p.x).collect();
+    let y: Vec<f64> = points.iter().map(|p| p.y).collect();
+    let m: Vec<usize> = points.iter().map(|p| p.n).collect();
+    let fit = make_weights(&y, Some(&m), strategy).and_then(|w| fit_wls(&x, &y, w.as_deref()));
+    let key = match group {
+        Some(g) => format!("{}|{}", spec.name(), g),
+        None => spec.name(),
+    };
+    let (params, error) = match fit {
+        Ok(p) => (Some(p), None),
+        Err(e) => (None, Some(e.to_string())),
+    };
+    FittedModel {
+        key,
+        spec: spec.name(),
+        group: group.map(str::to_string),
+        weights: weighting_name(strategy).to_string(),
+        params,
+        error,
+        points,
+    }
+}